@@ -10,9 +10,18 @@ import shlex
 import subprocess
 import tempfile
 import time
+from typing import TYPE_CHECKING
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
 
 import stamina
 
+from .models import BuildEvent
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
 logger = logging.getLogger(__name__)
 
 _DEFAULT_WAIT_TIMEOUT = 12 * 3600  # 12 hours
@@ -23,6 +32,10 @@ _FAILED = "failed"
 _CANCELED = "canceled"
 _TERMINAL_STATUSES = frozenset({_SUCCEEDED, _FAILED, _CANCELED})
 
+_COPR_API_URL = "https://copr.fedorainfracloud.org/api_3"
+# Page size for the build-list endpoint; Copr caps larger values server-side
+_BUILD_LIST_PAGE_SIZE = 100
+
 _SCRIPT_CHROOT = "fedora-rawhide-x86_64"
 _SCRIPT_BUILDDEPS = "curl rpm cpio python3"
 
@@ -94,13 +107,15 @@ class CoprCliError(Exception):
 class CoprClient:
     """Client for submitting and monitoring builds on Fedora Copr."""
 
-    def __init__(self, project: str) -> None:
+    def __init__(self, project: str, api_url: str = _COPR_API_URL) -> None:
         """Initialize with a Copr project identifier.
 
         Args:
             project: Copr project in owner/name format (e.g. 'opendatahub/rhelai-el9')
+            api_url: Base URL of the Copr APIv3, used for read-only bulk queries.
         """
         self.project = project
+        self.api_url = api_url.rstrip("/")
 
     _CLI_TIMEOUT_SECONDS = 300
 
@@ -280,6 +295,40 @@ class CoprClient:
         finally:
             os.unlink(script_path)
 
+    def submit_package(
+        self,
+        srpm_url: str,
+        *,
+        timeout: int | None = None,
+        skip_tests: bool = False,
+        spec_replacements: tuple[tuple[str, str], ...] = (),
+        with_build_id: int | None = None,
+        after_build_id: int | None = None,
+    ) -> int:
+        """Submit a package, using a custom build only when it needs spec adjustments.
+
+        Dispatches to ``submit_custom_build`` when ``skip_tests`` or
+        ``spec_replacements`` are requested, and to ``submit_build`` otherwise.
+
+        Returns:
+            The Copr build ID.
+        """
+        if skip_tests or spec_replacements:
+            return self.submit_custom_build(
+                srpm_url,
+                timeout=timeout,
+                skip_tests=skip_tests,
+                spec_replacements=spec_replacements,
+                with_build_id=with_build_id,
+                after_build_id=after_build_id,
+            )
+        return self.submit_build(
+            srpm_url,
+            timeout=timeout,
+            with_build_id=with_build_id,
+            after_build_id=after_build_id,
+        )
+
     @stamina.retry(on=CoprCliError, attempts=5, wait_initial=2.0, wait_max=60.0, wait_jitter=5.0)
     def get_build_status(self, build_id: int) -> str:
         """Query the status of a Copr build.
@@ -299,6 +348,58 @@ class CoprClient:
         cmd = ["copr-cli", "status", str(build_id)]
         return self._run_copr_cli(cmd).strip()
 
+    @stamina.retry(on=(URLError, TimeoutError, ConnectionError), attempts=5, wait_initial=2.0, wait_max=60.0)
+    def _get_build_list_page(self, offset: int) -> list[dict]:
+        """Fetch one page of the project's builds, newest first, from the Copr APIv3."""
+        owner, name = self.project.split("/", 1)
+        query = urlencode(
+            {
+                "ownername": owner,
+                "projectname": name,
+                "limit": _BUILD_LIST_PAGE_SIZE,
+                "offset": offset,
+                "order": "id",
+                "order_type": "DESC",
+            }
+        )
+        req = Request(f"{self.api_url}/build/list/?{query}", headers={"Accept": "application/json"})  # ruff: ignore[suspicious-url-open-usage]
+        with urlopen(req, timeout=self._CLI_TIMEOUT_SECONDS) as resp:  # ruff: ignore[suspicious-url-open-usage]
+            return json.load(resp)["items"]
+
+    def get_build_statuses(self, build_ids: set[int] | frozenset[int]) -> dict[int, str]:
+        """Query the status of many builds of this project with as few API calls as possible.
+
+        Pages through the project's build list (newest first) until every
+        requested build has been seen, so a poll of a whole rebuild costs a
+        single HTTP request instead of one ``copr-cli status`` per build.
+        Builds that are not found in the list (e.g. they belong to another
+        project) are queried individually via ``get_build_status``.
+
+        Args:
+            build_ids: The Copr build IDs to query.
+
+        Returns:
+            Build status string keyed by build ID.
+        """
+        statuses: dict[int, str] = {}
+        if not build_ids:
+            return statuses
+        oldest = min(build_ids)
+        offset = 0
+        while True:
+            items = self._get_build_list_page(offset)
+            for item in items:
+                if item["id"] in build_ids:
+                    statuses[item["id"]] = item["state"]
+            if len(statuses) == len(build_ids) or len(items) < _BUILD_LIST_PAGE_SIZE or items[-1]["id"] <= oldest:
+                break
+            offset += len(items)
+
+        for build_id in sorted(build_ids - statuses.keys()):
+            logger.debug("Build %d not in the project build list, querying it individually", build_id)
+            statuses[build_id] = self.get_build_status(build_id)
+        return statuses
+
     def wait_for_build(
         self,
         build_id: int,
@@ -383,7 +484,8 @@ class CoprClient:
         so Copr enforces the correct build order server-side.
 
         Packages whose names appear in ``skip_tests_names`` or
-        ``spec_replacements_by_name`` are submitted via ``submit_custom_build``.
+        ``spec_replacements_by_name`` are submitted as custom builds
+        (see ``submit_package``).
 
         Args:
             waves: List of waves, where each wave is a list of
@@ -407,41 +509,18 @@ class CoprClient:
             wave_anchor: int | None = None
 
             for i, (name, url) in enumerate(wave_items):
-                skip_tests = name in skip_tests_names
-                spec_replacements = spec_replacements_by_name.get(name, ())
-                use_custom_build = skip_tests or bool(spec_replacements)
+                # First build in the wave chains after the previous wave (if any);
+                # subsequent builds join the same batch as the first one.
+                build_id = self.submit_package(
+                    url,
+                    timeout=timeout,
+                    skip_tests=name in skip_tests_names,
+                    spec_replacements=spec_replacements_by_name.get(name, ()),
+                    with_build_id=None if i == 0 else wave_anchor,
+                    after_build_id=prev_wave_anchor if i == 0 else None,
+                )
                 if i == 0:
-                    # First build in the wave: chain after previous wave (if any)
-                    if use_custom_build:
-                        build_id = self.submit_custom_build(
-                            url,
-                            timeout=timeout,
-                            skip_tests=skip_tests,
-                            spec_replacements=spec_replacements,
-                            after_build_id=prev_wave_anchor,
-                        )
-                    else:
-                        build_id = self.submit_build(
-                            url,
-                            timeout=timeout,
-                            after_build_id=prev_wave_anchor,
-                        )
                     wave_anchor = build_id
-                # Subsequent builds: same batch as the first build in this wave
-                elif use_custom_build:
-                    build_id = self.submit_custom_build(
-                        url,
-                        timeout=timeout,
-                        skip_tests=skip_tests,
-                        spec_replacements=spec_replacements,
-                        with_build_id=wave_anchor,
-                    )
-                else:
-                    build_id = self.submit_build(
-                        url,
-                        timeout=timeout,
-                        with_build_id=wave_anchor,
-                    )
                 wave_ids.append(build_id)
 
             all_wave_ids.append(wave_ids)
@@ -455,28 +534,120 @@ class CoprClient:
         poll_interval: int = 30,
         timeout: int = _DEFAULT_WAIT_TIMEOUT,
     ) -> None:
-        """Wait for all builds to complete, polling round-robin for fast failure detection.
+        """Wait for all builds to complete, polling all of them in one bulk query per round.
 
         Args:
             build_ids: List of Copr build IDs to monitor.
-            poll_interval: Seconds between polling rounds.
+            poll_interval: Initial seconds between polling rounds; see ``BuildMonitor``.
             timeout: Maximum seconds to wait before raising TimeoutError.
 
         Raises:
             CoprBuildError: If any build fails or is canceled.
             TimeoutError: If builds do not finish within ``timeout`` seconds.
         """
-        deadline = time.monotonic() + timeout
-        pending = set(build_ids)
-        while pending:
-            for bid in list(pending):
-                status = self.get_build_status(bid)
-                logger.info("Build %d: %s", bid, status)
-                if status == _SUCCEEDED:
-                    pending.discard(bid)
-                elif status in (_FAILED, _CANCELED):
-                    raise CoprBuildError(bid, status)
-            if pending:
-                if time.monotonic() + poll_interval > deadline:
-                    raise TimeoutError(f"Timed out waiting for builds {sorted(pending)} after {timeout}s")
-                time.sleep(poll_interval)
+        monitor = BuildMonitor(self, build_ids, poll_interval=poll_interval, timeout=timeout)
+        for event in monitor.events():
+            if event.status in (_FAILED, _CANCELED):
+                raise CoprBuildError(event.build_id, event.status)
+
+
+class BuildMonitor:
+    """Watch a set of Copr builds with one bulk status query per poll.
+
+    All tracked builds share a single adaptive cadence: the interval resets
+    to ``poll_interval`` whenever any build changes state and backs off
+    (x1.5, capped at ``max_interval``) while nothing happens.  Every state
+    transition is emitted as a ``BuildEvent``, so a failure is noticed
+    within one poll interval regardless of how many builds are in flight.
+    """
+
+    def __init__(
+        self,
+        copr: CoprClient,
+        build_ids: Iterable[int] = (),
+        *,
+        poll_interval: float = 30,
+        max_interval: float = 300,
+        timeout: float = _DEFAULT_WAIT_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Start monitoring the given builds.
+
+        Args:
+            copr: Client used for the bulk status queries.
+            build_ids: Copr build IDs to monitor; more can be added with ``add``.
+            poll_interval: Seconds between polls right after a state change.
+            max_interval: Upper bound for the idle back-off between polls.
+            timeout: Maximum seconds ``events`` waits before raising TimeoutError.
+            clock: Monotonic clock, injectable for testing.
+            sleep: Sleep function, injectable for testing.
+        """
+        self.copr = copr
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self._clock = clock
+        self._sleep = sleep
+        self._statuses: dict[int, str | None] = dict.fromkeys(build_ids)
+        self._interval = poll_interval
+        self.polls = 0
+
+    def add(self, build_id: int) -> None:
+        """Start tracking another build; it is included in the next poll."""
+        self._statuses.setdefault(build_id, None)
+        self._interval = self.poll_interval
+
+    @property
+    def pending(self) -> set[int]:
+        """Tracked builds that have not reached a terminal state."""
+        return {bid for bid, status in self._statuses.items() if status not in _TERMINAL_STATUSES}
+
+    def poll(self) -> list[BuildEvent]:
+        """Query all pending builds once and return their state transitions."""
+        pending = self.pending
+        if not pending:
+            return []
+        self.polls += 1
+        events: list[BuildEvent] = []
+        for build_id, status in sorted(self.copr.get_build_statuses(pending).items()):
+            previous = self._statuses[build_id]
+            if status != previous:
+                self._statuses[build_id] = status
+                events.append(BuildEvent(build_id=build_id, previous=previous, status=status))
+                logger.info("Build %d: %s -> %s", build_id, previous or "submitted", status)
+        if events:
+            self._interval = self.poll_interval
+        else:
+            self._interval = min(self._interval * 1.5, self.max_interval)
+            if self.polls % 10 == 0:
+                logger.info(
+                    "Still waiting for %d builds (poll #%d, next check in %.0fs)",
+                    len(pending),
+                    self.polls,
+                    self._interval,
+                )
+        return events
+
+    def wait(self, deadline: float) -> None:
+        """Sleep until the next poll is due.
+
+        Raises:
+            TimeoutError: If the next poll would happen after ``deadline``.
+        """
+        if self._clock() + self._interval > deadline:
+            msg = f"Timed out waiting for builds {sorted(self.pending)} after {self.timeout}s"
+            raise TimeoutError(msg)
+        self._sleep(self._interval)
+
+    def events(self) -> Iterator[BuildEvent]:
+        """Yield state transitions until every tracked build has reached a terminal state.
+
+        Raises:
+            TimeoutError: If builds do not finish within ``timeout`` seconds.
+        """
+        deadline = self._clock() + self.timeout
+        while self.pending:
+            yield from self.poll()
+            if self.pending:
+                self.wait(deadline)
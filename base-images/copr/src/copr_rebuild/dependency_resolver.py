@@ -5,38 +5,31 @@ from __future__ import annotations
 
 import logging
 from collections import defaultdict
+from typing import TYPE_CHECKING
 
 from .models import BuildWave, PackageMetadata
 
-logger = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    from collections.abc import Mapping
 
+logger = logging.getLogger(__name__)
 
-def compute_build_waves(packages: dict[str, PackageMetadata]) -> list[BuildWave]:
-    """Compute build waves via topological sort (Kahn's algorithm).
 
-    Given a set of packages with their provides and build_requires,
-    determine which packages can be built in parallel (same wave) and
-    which must wait for earlier waves to complete.
+def compute_dependency_graph(packages: dict[str, PackageMetadata]) -> dict[str, frozenset[str]]:
+    """Map each package to the in-project packages it BuildRequires.
 
     Algorithm:
         1. Build a global provides map: capability -> source package name
         2. For each package, intersect its BuildRequires with the provides map
            to find in-project dependency edges
-        3. Topological sort (Kahn's algorithm) into waves
 
     Args:
         packages: Mapping of source package name to its metadata.
 
     Returns:
-        Ordered list of BuildWave objects. Packages within a wave have
-        no inter-dependencies and can be built in parallel.
-
-    Raises:
-        ValueError: If a dependency cycle is detected among the packages.
+        Mapping of source package name to the names of the manifest packages
+        that must be built before it.  Self-dependencies are dropped.
     """
-    if not packages:
-        return []
-
     # Step 1: provides map (only for packages in our set)
     provides_map: dict[str, str] = {}
     for pkg in packages.values():
@@ -51,24 +44,55 @@ def compute_build_waves(packages: dict[str, PackageMetadata]) -> list[BuildWave]
                 )
             provides_map[cap] = pkg.name
 
-    # Step 2: build adjacency list
-    # in_degree[pkg] = number of in-project packages it depends on
-    in_degree: dict[str, int] = dict.fromkeys(packages, 0)
-    dependents: dict[str, list[str]] = defaultdict(list)
-
+    # Step 2: in-project BuildRequires providers of each package
+    graph: dict[str, frozenset[str]] = {}
     for pkg in packages.values():
         deps_in_project: set[str] = set()
         for req in pkg.build_requires:
             provider = provides_map.get(req)
             if provider is not None and provider != pkg.name:
                 deps_in_project.add(provider)
-        in_degree[pkg.name] = len(deps_in_project)
-        for dep in deps_in_project:
-            dependents[dep].append(pkg.name)
+        graph[pkg.name] = frozenset(deps_in_project)
+
+    return graph
+
+
+def compute_build_waves(packages: dict[str, PackageMetadata]) -> list[BuildWave]:
+    """Compute build waves via topological sort (Kahn's algorithm).
+
+    Given a set of packages with their provides and build_requires,
+    determine which packages can be built in parallel (same wave) and
+    which must wait for earlier waves to complete.
+
+    Algorithm:
+        1. Compute the in-project dependency edges (``compute_dependency_graph``)
+        2. Topological sort (Kahn's algorithm) into waves
+
+    Args:
+        packages: Mapping of source package name to its metadata.
+
+    Returns:
+        Ordered list of BuildWave objects. Packages within a wave have
+        no inter-dependencies and can be built in parallel.
+
+    Raises:
+        ValueError: If a dependency cycle is detected among the packages.
+    """
+    if not packages:
+        return []
+
+    graph = compute_dependency_graph(packages)
+
+    # in_degree[pkg] = number of in-project packages it depends on
+    in_degree: dict[str, int] = {name: len(deps) for name, deps in graph.items()}
+    dependents: dict[str, list[str]] = defaultdict(list)
+    for name, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(name)
 
     logger.debug("Dependency edges: %s", dict(dependents))
 
-    # Step 3: Kahn's algorithm, collecting by wave
+    # Kahn's algorithm, collecting by wave
     waves: list[BuildWave] = []
     queue = sorted(name for name, deg in in_degree.items() if deg == 0)
     wave_idx = 0
@@ -92,3 +116,58 @@ def compute_build_waves(packages: dict[str, PackageMetadata]) -> list[BuildWave]
         raise ValueError(msg)
 
     return waves
+
+
+def compute_critical_paths(
+    graph: dict[str, frozenset[str]],
+    durations: Mapping[str, float],
+    default_duration: float,
+) -> dict[str, float]:
+    """Compute the critical-path length of every package in a dependency graph.
+
+    The critical-path length of a package is its own expected duration plus
+    the longest chain of expected durations among the packages that
+    (transitively) wait for it.  Submitting packages in decreasing order of
+    this value keeps the longest dependency chain moving first.
+
+    Args:
+        graph: Mapping of package name to its in-project dependencies, as
+            returned by ``compute_dependency_graph``.
+        durations: Historical build durations in seconds keyed by package name.
+        default_duration: Duration assumed for packages without history.
+
+    Returns:
+        Mapping of package name to its critical-path length in seconds.
+
+    Raises:
+        ValueError: If a dependency cycle is detected among the packages.
+    """
+    dependents: dict[str, list[str]] = defaultdict(list)
+    for name, deps in graph.items():
+        for dep in deps:
+            dependents[dep].append(name)
+
+    critical: dict[str, float] = {}
+    # Resolve leaves first: a package's value needs all its dependents' values.
+    remaining = {name: len(dependents.get(name, ())) for name in graph}
+    queue = [name for name, count in remaining.items() if count == 0]
+    while queue:
+        name = queue.pop()
+        tail = max((critical[d] for d in dependents.get(name, ())), default=0.0)
+        critical[name] = durations.get(name, default_duration) + tail
+        for dep in graph[name]:
+            remaining[dep] -= 1
+            if remaining[dep] == 0:
+                queue.append(dep)
+
+    if len(critical) != len(graph):
+        cyclic = sorted(name for name in graph if name not in critical)
+        msg = f"Dependency cycle detected among: {cyclic}"
+        raise ValueError(msg)
+
+    return critical
+
+
+def estimate_wave_makespan(waves: list[BuildWave], durations: Mapping[str, float], default_duration: float) -> float:
+    """Estimate the makespan of strict wave scheduling: the sum of each wave's slowest build."""
+    return sum(max((durations.get(name, default_duration) for name in wave.packages), default=0.0) for wave in waves)
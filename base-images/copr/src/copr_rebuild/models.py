@@ -88,6 +88,27 @@ class BuildResult(BaseModel):
     srpm_url: str
 
 
+class BuildEvent(BaseModel):
+    """A state transition of a monitored Copr build."""
+
+    build_id: int
+    previous: str | None = Field(description="Previously observed status, or None for the first observation")
+    status: str = Field(description="Newly observed status (e.g. 'running', 'succeeded', 'failed')")
+
+    model_config = {"frozen": True}
+
+
+class ScheduleReport(BaseModel):
+    """Outcome of a dependency-driven (DAG) rebuild."""
+
+    build_ids: dict[str, int] = Field(description="Copr build ID keyed by package name")
+    durations: dict[str, float] = Field(
+        description="Observed seconds from submission to success, keyed by package name",
+    )
+    expected_makespan: float = Field(description="Critical-path estimate of the total wall-clock time in seconds")
+    actual_makespan: float = Field(description="Measured wall-clock time from first submission to last success")
+
+
 def main():
     """Generate the JSON schema for the Manifest model."""
     import json  # ruff: ignore[import-outside-top-level]
@@ -12,12 +12,26 @@ from pathlib import Path
 import yaml
 
 from copr_rebuild.copr_client import CoprBuildError, CoprClient, CoprCliError
-from copr_rebuild.dependency_resolver import compute_build_waves
+from copr_rebuild.dependency_resolver import (
+    compute_build_waves,
+    compute_critical_paths,
+    compute_dependency_graph,
+    estimate_wave_makespan,
+)
 from copr_rebuild.koji_client import KojiClient
 from copr_rebuild.models import Manifest, PackageMetadata
+from copr_rebuild.scheduler import (
+    DEFAULT_DURATIONS_PATH,
+    DagScheduler,
+    default_build_duration,
+    load_build_durations,
+    save_build_durations,
+)
 
 logger = logging.getLogger(__name__)
 
+SCHEDULERS = ("dag", "waves")
+
 
 def load_manifest(path: Path) -> Manifest:
     """Load and validate a packages.yaml manifest file.
@@ -76,15 +90,19 @@ def configure_chroots(manifest: Manifest, copr: CoprClient) -> None:
         copr.configure_chroot(chroot, packages=manifest.chroot_packages)
 
 
-def run_dry_run(manifest: Manifest, koji_client: KojiClient) -> None:
+def run_dry_run(manifest: Manifest, koji_client: KojiClient, durations: dict[str, float] | None = None) -> None:
     """Compute and display the build plan without submitting builds.
 
     Args:
         manifest: The validated manifest.
         koji_client: Client for querying Koji metadata.
+        durations: Historical build durations used to estimate the makespan.
     """
     packages, _, _ = resolve_package_metadata(manifest, koji_client)
     waves = compute_build_waves(packages)
+    durations = durations or {}
+    default_duration = default_build_duration(durations)
+    critical_paths = compute_critical_paths(compute_dependency_graph(packages), durations, default_duration)
 
     print("Build plan:")
     print(f"  Copr project: {manifest.copr_project}")
@@ -96,13 +114,17 @@ def run_dry_run(manifest: Manifest, koji_client: KojiClient) -> None:
         print(f"  Build timeout: {manifest.build_timeout}s ({manifest.build_timeout / 3600:.1f}h)")
     print(f"  Total packages: {len(packages)}")
     print(f"  Total waves: {len(waves)}")
+    print(
+        f"  Expected makespan: {max(critical_paths.values(), default=0.0) / 3600:.1f}h with dag scheduling, "
+        f"{estimate_wave_makespan(waves, durations, default_duration) / 3600:.1f}h with strict waves"
+    )
     entries_by_name = {e.name: e for e in manifest.packages}
     print()
     for wave in waves:
         print(f"  Wave {wave.index}:")
         for pkg_name in wave.packages:
             meta = packages[pkg_name]
-            print(f"    - {meta.nvr}")
+            print(f"    - {meta.nvr} (critical path {critical_paths[pkg_name] / 3600:.1f}h)")
             print(f"      SRPM: {meta.srpm_url}")
             if entries_by_name[pkg_name].skip_tests:
                 print("      [skip_tests: %check disabled]")
@@ -111,7 +133,7 @@ def run_dry_run(manifest: Manifest, koji_client: KojiClient) -> None:
 
 
 def run_rebuild(manifest: Manifest, koji_client: KojiClient) -> None:
-    """Execute the full rebuild: resolve dependencies, submit builds, wait for completion.
+    """Execute the full rebuild in strict waves: resolve dependencies, submit builds, wait for completion.
 
     All waves are submitted upfront using Copr's batch ordering
     (``--with-build-id`` / ``--after-build-id``), so Copr enforces the
@@ -154,6 +176,51 @@ def run_rebuild(manifest: Manifest, koji_client: KojiClient) -> None:
     print("All builds complete.")
 
 
+def run_dag_rebuild(manifest: Manifest, koji_client: KojiClient, durations_path: Path) -> None:
+    """Execute the full rebuild, submitting each package as soon as its dependencies succeed.
+
+    Unlike ``run_rebuild``, the tool stays running for the whole rebuild:
+    packages are prioritised by critical-path length computed from the
+    historical durations in ``durations_path``, and the observed durations
+    are merged back into that file once every build has succeeded.
+
+    Args:
+        manifest: The validated manifest.
+        koji_client: Client for querying Koji metadata.
+        durations_path: JSON file with historical build durations.
+    """
+    packages, skip_tests_names, spec_replacements_by_name = resolve_package_metadata(manifest, koji_client)
+    # Validates the graph (cycle detection) before anything is submitted.
+    compute_build_waves(packages)
+    graph = compute_dependency_graph(packages)
+
+    copr = CoprClient(project=manifest.copr_project)
+    configure_chroots(manifest, copr)
+
+    scheduler = DagScheduler(
+        copr,
+        graph,
+        {name: meta.srpm_url for name, meta in packages.items()},
+        durations=load_build_durations(durations_path),
+        timeout=manifest.build_timeout,
+        skip_tests_names=skip_tests_names,
+        spec_replacements_by_name=spec_replacements_by_name,
+    )
+    print(
+        f"Scheduling {len(packages)} packages by critical path "
+        f"(expected makespan {scheduler.expected_makespan / 3600:.1f}h) ..."
+    )
+    report = scheduler.run()
+
+    for name, build_id in report.build_ids.items():
+        print(f"  {name}: build ID {build_id} ({report.durations[name] / 60:.0f}min)")
+    print(
+        f"All builds complete: actual makespan {report.actual_makespan / 3600:.1f}h, "
+        f"expected {report.expected_makespan / 3600:.1f}h."
+    )
+    save_build_durations(durations_path, report.durations)
+
+
 def main(argv: list[str] | None = None) -> None:
     """CLI entry point."""
     parser = argparse.ArgumentParser(description=__doc__)
@@ -168,6 +235,19 @@ def main(argv: list[str] | None = None) -> None:
         action="store_true",
         help="Compute and display the build plan without submitting builds",
     )
+    parser.add_argument(
+        "--scheduler",
+        choices=SCHEDULERS,
+        default="dag",
+        help="'dag' submits each package once its dependencies succeed (the tool stays running); "
+        "'waves' submits everything upfront in strict Copr batches",
+    )
+    parser.add_argument(
+        "--durations",
+        type=Path,
+        default=DEFAULT_DURATIONS_PATH,
+        help="JSON file of historical build durations used for critical-path prioritisation (default: %(default)s)",
+    )
     parser.add_argument(
         "--verbose",
         "-v",
@@ -191,7 +271,9 @@ def main(argv: list[str] | None = None) -> None:
 
     try:
         if args.dry_run:
-            run_dry_run(manifest, koji_client)
+            run_dry_run(manifest, koji_client, load_build_durations(args.durations))
+        elif args.scheduler == "dag":
+            run_dag_rebuild(manifest, koji_client, args.durations)
         else:
             run_rebuild(manifest, koji_client)
     except CoprCliError as exc:
@@ -0,0 +1,200 @@
+# SPDX-License-Identifier: Apache-2.0
+"""Critical-path (DAG) scheduling of Copr builds.
+
+Copr batch ordering can only chain a batch after a single other batch, so
+strict waves make every package wait for the slowest build of the previous
+wave.  The ``DagScheduler`` instead keeps the tool running and submits each
+package as soon as all of its in-project BuildRequires providers have
+succeeded, highest critical-path length first.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import statistics
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .copr_client import _CANCELED, _DEFAULT_WAIT_TIMEOUT, _FAILED, _SUCCEEDED, BuildMonitor, CoprBuildError
+from .dependency_resolver import compute_critical_paths
+from .models import ScheduleReport
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
+    from .copr_client import CoprClient
+
+logger = logging.getLogger(__name__)
+
+# Assumed build duration for packages without history when nothing else is known
+_FALLBACK_DURATION = 3600.0
+
+# History of observed build durations; runtime state, so it lives outside the installed package
+DEFAULT_DURATIONS_PATH = Path.home() / ".cache" / "notebooks" / "copr-build-durations.json"
+
+
+def load_build_durations(path: Path) -> dict[str, float]:
+    """Load historical build durations (seconds, keyed by package name).
+
+    A missing file yields an empty mapping so the first run works without history.
+    """
+    if not path.is_file():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {str(name): float(seconds) for name, seconds in raw.items()}
+
+
+def save_build_durations(path: Path, durations: Mapping[str, float]) -> None:
+    """Merge observed build durations into the history file at ``path``."""
+    merged = load_build_durations(path)
+    merged.update({name: round(seconds, 1) for name, seconds in durations.items()})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(sorted(merged.items())), f, indent=2)
+        f.write("\n")
+
+
+def default_build_duration(durations: Mapping[str, float]) -> float:
+    """Estimate for packages without history: the 90th percentile of the known durations.
+
+    Over- rather than under-estimating an unknown package submits it, and the chain that
+    waits for it, ahead of packages known to be quick, instead of leaving it to become the
+    tail of the schedule.
+    """
+    if not durations:
+        return _FALLBACK_DURATION
+    if len(durations) == 1:
+        return next(iter(durations.values()))
+    return statistics.quantiles(durations.values(), n=10, method="inclusive")[-1]
+
+
+class DagScheduler:
+    """Submit and monitor Copr builds following the package dependency graph."""
+
+    def __init__(
+        self,
+        copr: CoprClient,
+        graph: dict[str, frozenset[str]],
+        srpm_urls: Mapping[str, str],
+        *,
+        durations: Mapping[str, float],
+        timeout: int | None = None,
+        skip_tests_names: frozenset[str] = frozenset(),
+        spec_replacements_by_name: Mapping[str, tuple[tuple[str, str], ...]] | None = None,
+        poll_interval: int = 30,
+        wait_timeout: int = _DEFAULT_WAIT_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Prepare a schedule for the given dependency graph.
+
+        Args:
+            copr: Client used to submit and poll builds.
+            graph: Mapping of package name to its in-project dependencies.
+            srpm_urls: SRPM URL keyed by package name.
+            durations: Historical build durations used for prioritisation.
+            timeout: Build timeout in seconds passed to Copr per build.
+            skip_tests_names: Package names that should skip ``%check``.
+            spec_replacements_by_name: Literal spec-file replacements keyed by package name.
+            poll_interval: Seconds between polling rounds.
+            wait_timeout: Maximum seconds to wait for the whole schedule.
+            clock: Monotonic clock, injectable for testing.
+            sleep: Sleep function, injectable for testing.
+
+        Raises:
+            ValueError: If a dependency cycle is detected among the packages.
+        """
+        self.copr = copr
+        self.graph = graph
+        self.srpm_urls = srpm_urls
+        self.timeout = timeout
+        self.skip_tests_names = skip_tests_names
+        self.spec_replacements_by_name = spec_replacements_by_name or {}
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self._clock = clock
+        self._sleep = sleep
+
+        self.default_duration = default_build_duration(durations)
+        self.critical_paths = compute_critical_paths(graph, durations, self.default_duration)
+
+    @property
+    def expected_makespan(self) -> float:
+        """Critical-path estimate of the total wall-clock time in seconds."""
+        return max(self.critical_paths.values(), default=0.0)
+
+    def _ready(self, submitted: Mapping[str, int], succeeded: set[str]) -> list[str]:
+        """Unsubmitted packages whose dependencies have all succeeded, longest critical path first."""
+        ready = [name for name, deps in self.graph.items() if name not in submitted and deps <= succeeded]
+        return sorted(ready, key=lambda name: (-self.critical_paths[name], name))
+
+    def run(self) -> ScheduleReport:
+        """Submit builds as their dependencies succeed and wait until all have finished.
+
+        Returns:
+            Report with build IDs, observed durations, and expected vs actual makespan.
+
+        Raises:
+            CoprBuildError: If any build fails or is canceled.
+            TimeoutError: If the schedule does not finish within ``wait_timeout`` seconds.
+        """
+        start = self._clock()
+        deadline = start + self.wait_timeout
+        build_ids: dict[str, int] = {}
+        submitted_at: dict[str, float] = {}
+        durations: dict[str, float] = {}
+        succeeded: set[str] = set()
+        running: dict[int, str] = {}
+        monitor = BuildMonitor(
+            self.copr,
+            poll_interval=self.poll_interval,
+            timeout=self.wait_timeout,
+            clock=self._clock,
+            sleep=self._sleep,
+        )
+
+        while len(succeeded) < len(self.graph):
+            for name in self._ready(build_ids, succeeded):
+                build_id = self.copr.submit_package(
+                    self.srpm_urls[name],
+                    timeout=self.timeout,
+                    skip_tests=name in self.skip_tests_names,
+                    spec_replacements=self.spec_replacements_by_name.get(name, ()),
+                )
+                logger.info(
+                    "Submitted %s as build %d (critical path %.0fs)",
+                    name,
+                    build_id,
+                    self.critical_paths[name],
+                )
+                build_ids[name] = build_id
+                submitted_at[name] = self._clock()
+                running[build_id] = name
+                monitor.add(build_id)
+
+            released = False
+            for event in monitor.poll():
+                name = running[event.build_id]
+                if event.status == _SUCCEEDED:
+                    del running[event.build_id]
+                    succeeded.add(name)
+                    durations[name] = self._clock() - submitted_at[name]
+                    logger.info("Build %d (%s): succeeded after %.0fs", event.build_id, name, durations[name])
+                    released = True
+                elif event.status in (_FAILED, _CANCELED):
+                    raise CoprBuildError(event.build_id, event.status)
+
+            # Newly unblocked packages are submitted straight away, without sleeping.
+            if released or len(succeeded) == len(self.graph):
+                continue
+            monitor.wait(deadline)
+
+        return ScheduleReport(
+            build_ids=build_ids,
+            durations=durations,
+            expected_makespan=self.expected_makespan,
+            actual_makespan=self._clock() - start,
+        )
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import pytest
+from copr_rebuild import copr_client
+from copr_rebuild.copr_client import BuildMonitor, CoprBuildError, CoprClient
+from copr_rebuild.models import BuildEvent
+
+PAGE_SIZE = copr_client._BUILD_LIST_PAGE_SIZE
+
+# the project's builds, newest first, as the Copr build list returns them; Copr build ids are global,
+# so 875 and 700 belong to other projects and are missing from this one's list
+PROJECT_BUILDS = {build_id: "succeeded" for build_id in range(1000, 750, -1) if build_id != 875}
+
+
+class StubCoprClient(CoprClient):
+    """Serves the build list from ``builds`` and ``copr-cli status`` from ``others``, recording every request."""
+
+    def __init__(self, builds: dict[int, str], others: dict[int, str] | None = None) -> None:
+        super().__init__("opendatahub/rhelai-el9")
+        self.builds = builds
+        self.others = others or {}
+        self.offsets: list[int] = []
+        self.queried: list[int] = []
+
+    def _get_build_list_page(self, offset: int) -> list[dict]:
+        self.offsets.append(offset)
+        ids = sorted(self.builds, reverse=True)[offset : offset + PAGE_SIZE]
+        return [{"id": build_id, "state": self.builds[build_id]} for build_id in ids]
+
+    def get_build_status(self, build_id: int) -> str:
+        self.queried.append(build_id)
+        return self.others[build_id]
+
+
+def test_build_list_is_paged_until_every_build_is_seen() -> None:
+    copr = StubCoprClient(PROJECT_BUILDS | {999: "running", 820: "failed"})
+
+    assert copr.get_build_statuses({999, 820}) == {999: "running", 820: "failed"}
+    assert copr.offsets == [0, PAGE_SIZE]
+    assert copr.queried == []
+
+
+def test_no_builds_need_no_requests() -> None:
+    copr = StubCoprClient(PROJECT_BUILDS)
+
+    assert copr.get_build_statuses(set()) == {}
+    assert copr.offsets == []
+
+
+def test_paging_stops_once_the_oldest_build_is_passed() -> None:
+    copr = StubCoprClient(PROJECT_BUILDS | {870: "pending"}, others={875: "running"})
+
+    assert copr.get_build_statuses({990, 875, 870}) == {990: "succeeded", 875: "running", 870: "pending"}
+    # the second page ends below 870, so 875 cannot be further down the list
+    assert copr.offsets == [0, PAGE_SIZE]
+    assert copr.queried == [875]
+
+
+def test_builds_missing_from_the_list_are_queried_individually() -> None:
+    copr = StubCoprClient(PROJECT_BUILDS, others={700: "failed", 1100: "importing"})
+
+    assert copr.get_build_statuses({1100, 900, 700}) == {1100: "importing", 900: "succeeded", 700: "failed"}
+    # the list ends with a short page before reaching 700
+    assert copr.offsets == [0, PAGE_SIZE, 2 * PAGE_SIZE]
+    assert copr.queried == [700, 1100]
+
+
+class ScriptedCopr:
+    """Answers each bulk status query with the next entry of ``rounds``, on a clock advanced by ``sleep``."""
+
+    def __init__(self, rounds: list[dict[int, str]]) -> None:
+        self.rounds = iter(rounds)
+        self.now = 0.0
+        self.sleeps: list[float] = []
+        self.queried: list[set[int]] = []
+
+    def clock(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def get_build_statuses(self, build_ids: set[int]) -> dict[int, str]:
+        self.queried.append(set(build_ids))
+        return {build_id: status for build_id, status in next(self.rounds).items() if build_id in build_ids}
+
+
+def monitor(copr: ScriptedCopr, build_ids: list[int], **kwargs: float) -> BuildMonitor:
+    return BuildMonitor(
+        copr,  # pyright: ignore[reportArgumentType]
+        build_ids,
+        poll_interval=10,
+        clock=copr.clock,
+        sleep=copr.sleep,
+        **kwargs,  # pyright: ignore[reportArgumentType]
+    )
+
+
+def test_idle_polls_back_off_and_a_change_resets_the_interval() -> None:
+    pending = {1: "pending", 2: "pending"}
+    copr = ScriptedCopr(
+        [
+            pending,
+            pending,
+            pending,
+            {1: "running", 2: "pending"},
+            {1: "running", 2: "pending"},
+            {1: "succeeded", 2: "failed"},
+        ]
+    )
+
+    events = list(monitor(copr, [1, 2]).events())
+
+    assert copr.sleeps == [10, 15, 22.5, 10, 15]
+    assert events == [
+        BuildEvent(build_id=1, previous=None, status="pending"),
+        BuildEvent(build_id=2, previous=None, status="pending"),
+        BuildEvent(build_id=1, previous="pending", status="running"),
+        BuildEvent(build_id=1, previous="running", status="succeeded"),
+        BuildEvent(build_id=2, previous="pending", status="failed"),
+    ]
+
+
+def test_back_off_is_capped_and_finished_builds_are_not_polled() -> None:
+    copr = ScriptedCopr([{1: "running", 2: "succeeded"}] + [{1: "running"}] * 4 + [{1: "succeeded"}])
+
+    list(monitor(copr, [1, 2], max_interval=20).events())
+
+    assert copr.sleeps == [10, 15, 20, 20, 20]
+    assert copr.queried == [{1, 2}] + [{1}] * 5
+
+
+def test_added_build_resets_the_interval() -> None:
+    copr = ScriptedCopr([{1: "running"}, {1: "running"}, {1: "running", 2: "pending"}])
+    build_monitor = monitor(copr, [1])
+    build_monitor.poll()
+    build_monitor.poll()
+    build_monitor.wait(deadline=float("inf"))
+
+    build_monitor.add(2)
+    build_monitor.wait(deadline=float("inf"))
+
+    assert copr.sleeps == [15, 10]
+    assert build_monitor.poll() == [BuildEvent(build_id=2, previous=None, status="pending")]
+
+
+def test_timeout_before_the_next_poll() -> None:
+    copr = ScriptedCopr([{1: "running"}] * 3)
+
+    with pytest.raises(TimeoutError, match=r"\[1\]"):
+        list(monitor(copr, [1], timeout=30).events())
+    # polled at 0s, 10s and 25s, the next poll at 47.5s would be after the deadline
+    assert copr.sleeps == [10, 15]
+
+
+def test_wait_for_wave_raises_on_the_first_failure() -> None:
+    copr = StubCoprClient({3: "running", 2: "failed", 1: "running"})
+
+    with pytest.raises(CoprBuildError) as excinfo:
+        copr.wait_for_wave([1, 2, 3])
+    assert excinfo.value.build_id == 2
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from copr_rebuild.copr_client import CoprBuildError
+from copr_rebuild.dependency_resolver import compute_critical_paths
+from copr_rebuild.scheduler import DagScheduler, default_build_duration, load_build_durations, save_build_durations
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+# a <- b <- c is a 3-package chain, d is a single long build, e depends on d
+GRAPH = {
+    "a": frozenset(),
+    "b": frozenset({"a"}),
+    "c": frozenset({"b"}),
+    "d": frozenset(),
+    "e": frozenset({"d"}),
+}
+DURATIONS = {"a": 100.0, "b": 100.0, "c": 100.0, "d": 250.0, "e": 10.0}
+
+
+class FakeCopr:
+    """Builds take their ``DURATIONS`` from submission, on a clock advanced by ``sleep``."""
+
+    def __init__(self, durations: dict[str, float], failing: frozenset[str] = frozenset()) -> None:
+        self.durations = durations
+        self.failing = failing
+        self.now = 0.0
+        self.builds: dict[int, tuple[str, float]] = {}
+        self.submitted: list[tuple[float, str]] = []
+
+    def clock(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+    def submit_package(self, srpm_url: str, **kwargs: object) -> int:
+        name = srpm_url.removesuffix(".src.rpm")
+        build_id = len(self.builds) + 1
+        self.builds[build_id] = (name, self.now + self.durations[name])
+        self.submitted.append((self.now, name))
+        return build_id
+
+    def get_build_statuses(self, build_ids: set[int]) -> dict[int, str]:
+        statuses = {}
+        for build_id in build_ids:
+            name, finished = self.builds[build_id]
+            if self.now < finished:
+                statuses[build_id] = "running"
+            else:
+                statuses[build_id] = "failed" if name in self.failing else "succeeded"
+        return statuses
+
+
+def scheduler(copr: FakeCopr, durations: dict[str, float]) -> DagScheduler:
+    return DagScheduler(
+        copr,  # pyright: ignore[reportArgumentType]
+        GRAPH,
+        {name: f"{name}.src.rpm" for name in GRAPH},
+        durations=durations,
+        poll_interval=1,
+        clock=copr.clock,
+        sleep=copr.sleep,
+    )
+
+
+def test_critical_path_includes_the_longest_chain_of_dependents() -> None:
+    assert compute_critical_paths(GRAPH, DURATIONS, default_duration=0) == {
+        "a": 300.0,
+        "b": 200.0,
+        "c": 100.0,
+        "d": 260.0,
+        "e": 10.0,
+    }
+
+
+def test_critical_paths_reject_cycles() -> None:
+    with pytest.raises(ValueError):
+        compute_critical_paths({"a": frozenset({"b"}), "b": frozenset({"a"})}, {}, default_duration=1)
+
+
+def test_ready_packages_are_submitted_longest_critical_path_first() -> None:
+    copr = FakeCopr(DURATIONS)
+    report = scheduler(copr, DURATIONS).run()
+
+    # a heads the longest chain, so it goes ahead of d although d is the longest single build
+    assert [name for at, name in copr.submitted if at == 0] == ["a", "d"]
+    assert report.expected_makespan == pytest.approx(300.0)
+
+
+def test_packages_are_submitted_as_soon_as_their_dependencies_succeed() -> None:
+    copr = FakeCopr(DURATIONS)
+    report = scheduler(copr, DURATIONS).run()
+
+    submitted_at = {name: at for at, name in copr.submitted}
+    # b does not wait for d, which was submitted alongside a but takes longer
+    assert submitted_at["b"] < submitted_at["e"]
+    assert all(submitted_at[name] >= submitted_at[dep] + DURATIONS[dep] for name in GRAPH for dep in GRAPH[name])
+    assert report.build_ids.keys() == GRAPH.keys()
+    # strict waves would take max(a, d) + max(b, e) + c = 450s
+    assert report.actual_makespan < 350
+
+
+def test_failed_build_stops_the_schedule() -> None:
+    copr = FakeCopr(DURATIONS, failing=frozenset({"b"}))
+
+    with pytest.raises(CoprBuildError):
+        scheduler(copr, DURATIONS).run()
+    assert "c" not in {name for _, name in copr.submitted}
+
+
+def test_unknown_packages_are_estimated_high() -> None:
+    durations = {name: float(seconds) for name, seconds in zip("abcdefghij", range(100, 1100, 100), strict=True)}
+
+    assert default_build_duration({}) == pytest.approx(3600.0)
+    assert default_build_duration({"a": 42.0}) == pytest.approx(42.0)
+    assert default_build_duration(durations) == pytest.approx(910.0)
+    # e has no history, so its critical path uses the estimate, above the median of 100s
+    known = {"a": 100.0, "b": 100.0, "c": 100.0, "d": 250.0}
+    paths = scheduler(FakeCopr(DURATIONS), known).critical_paths
+    assert paths["e"] == pytest.approx(default_build_duration(known))
+    assert paths["e"] == pytest.approx(205.0)
+    assert paths["d"] == pytest.approx(250.0 + paths["e"])
+
+
+def test_durations_history_is_merged(tmp_path: Path) -> None:
+    path = tmp_path / "cache" / "durations.json"
+    assert load_build_durations(path) == {}
+
+    save_build_durations(path, {"a": 100.04, "b": 20.0})
+    save_build_durations(path, {"b": 30.0})
+
+    assert load_build_durations(path) == {"a": 100.0, "b": 30.0}
@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 
 import argparse
+import dataclasses
 import enum
+import heapq
 import json
 import logging
 import os
 import pathlib
 import re
+import statistics
 import sys
+import tempfile
 import unittest
 
 import gha_pr_changed_files
@@ -49,6 +53,13 @@ SUBSCRIPTION_BACKED_TARGETS = {
 }
 
 
+# Estimate for jobs that are not in the duration history when the history is empty, too.
+# Jobs missing from a non-empty history are estimated as the slowest known job.
+DEFAULT_JOB_SECONDS = 3 * 60 * 60
+# Only the most recent records of each job are used for its estimate.
+HISTORY_SAMPLES = 10
+
+
 def target_needs_subscription(target: str) -> bool:
     return "rhel" in target or target in SUBSCRIPTION_BACKED_TARGETS
 
@@ -119,6 +130,71 @@ def filter_rhel_targets(targets: list[str], mode: RhelImages) -> list[str]:
     raise Exception(f"Unknown value for --rhel-images: {mode}")
 
 
+@dataclasses.dataclass
+class Shard:
+    index: int
+    jobs: list[tuple[str, str]] = dataclasses.field(default_factory=list)
+    seconds: float = 0.0
+
+
+def load_durations(history_file: pathlib.Path) -> dict[tuple[str, str], float]:
+    """Reads the duration history and returns the estimated seconds of each (target, platform) job.
+
+    The history has one JSON object per line, appended after each job, such as
+    `{"target": "jupyter-minimal-ubi9-python-3.12", "platform": "linux/amd64", "build_seconds": 1200, "test_seconds": 300}`.
+    The estimate is the median total of the last HISTORY_SAMPLES records of a job.
+    """
+    samples: dict[tuple[str, str], list[float]] = {}
+    with open(history_file) as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                job = (record["target"], record["platform"])
+                seconds = float(record.get("build_seconds", 0)) + float(record.get("test_seconds", 0))
+            except (ValueError, KeyError, TypeError) as e:
+                logging.warning(f"Ignoring malformed record at {history_file}:{line_no}: {e}")
+                continue
+            samples.setdefault(job, []).append(seconds)
+    return {job: statistics.median(values[-HISTORY_SAMPLES:]) for job, values in samples.items()}
+
+
+def estimate_durations(
+    jobs: list[tuple[str, str]], durations: dict[tuple[str, str], float]
+) -> dict[tuple[str, str], float]:
+    """Returns the estimated seconds of every job, a conservative estimate for jobs without history.
+
+    >>> estimate_durations([("a", "amd64"), ("b", "amd64")], {("a", "amd64"): 60.0, ("c", "arm64"): 90.0})
+    {('a', 'amd64'): 60.0, ('b', 'amd64'): 90.0}
+    """
+    unknown_seconds = max(durations.values(), default=DEFAULT_JOB_SECONDS)
+    return {job: durations.get(job, unknown_seconds) for job in jobs}
+
+
+def schedule_shards(estimates: dict[tuple[str, str], float], shards: int) -> list[Shard]:
+    """Bin-packs jobs into shards with longest-processing-time-first scheduling.
+
+    Jobs are taken from the longest to the shortest and each goes to the shard that
+    currently has the least work, which keeps the makespan (the slowest shard)
+    within 4/3 of the optimum.
+
+    >>> result = schedule_shards({("a", "p"): 7, ("b", "p"): 5, ("c", "p"): 4, ("d", "p"): 3, ("e", "p"): 1}, 2)
+    >>> [([target for target, _ in shard.jobs], shard.seconds) for shard in result]
+    [(['a', 'd'], 10.0), (['b', 'c', 'e'], 10.0)]
+    """
+    if shards < 1:
+        raise ValueError(f"Number of shards must be at least 1, got {shards}")
+    result = [Shard(index) for index in range(shards)]
+    heap = [(0.0, shard.index) for shard in result]
+    for job, seconds in sorted(estimates.items(), key=lambda item: (-item[1], item[0])):
+        load, index = heapq.heappop(heap)
+        result[index].jobs.append(job)
+        result[index].seconds = load + seconds
+        heapq.heappush(heap, (result[index].seconds, index))
+    return result
+
+
 def main() -> None:
     logging.basicConfig(level=logging.DEBUG, stream=sys.stderr)
 
@@ -165,6 +241,19 @@ def main() -> None:
         nargs="?",
         help="Whether to include, exclude, or only include s390x images",
     )
+    argparser.add_argument(
+        "--durations",
+        type=pathlib.Path,
+        required=False,
+        help="History of past job durations (JSON lines, see `load_durations`) used to schedule the jobs",
+    )
+    argparser.add_argument(
+        "--shards",
+        type=int,
+        required=False,
+        default=1,
+        help="Number of shards to bin-pack the jobs into, based on their estimated durations",
+    )
     args = argparser.parse_args()
 
     targets = extract_image_targets(env={"RELEASE_PYTHON_VERSION": "3.12"})
@@ -191,6 +280,14 @@ def main() -> None:
             if target in S390X_COMPATIBLE:
                 targets_with_platform.append((target, "linux/s390x"))
 
+    durations = load_durations(args.durations) if args.durations else {}
+    estimates = estimate_durations(targets_with_platform, durations)
+    shards = schedule_shards(estimates, args.shards)
+    shard_of = {job: shard.index for shard in shards for job in shard.jobs}
+    # longest jobs first, so that they start first when the matrix is throttled
+    targets_with_platform.sort(key=lambda job: -estimates[job])
+    makespan = max(shard.seconds for shard in shards)
+
     # https://stackoverflow.com/questions/66025220/paired-values-in-github-actions-matrix
     output = [
         "matrix="
@@ -202,6 +299,7 @@ def main() -> None:
                         "python": "3.12",
                         "platform": platform,
                         "subscription": target_needs_subscription(target),
+                        "shard": shard_of[target, platform],
                     }
                     for (target, platform) in targets_with_platform
                 ],
@@ -209,8 +307,24 @@ def main() -> None:
             separators=(",", ":"),
         ),
         "has_jobs=" + json.dumps(len(targets_with_platform) > 0, separators=(",", ":")),
+        "shards="
+        + json.dumps(
+            [
+                {
+                    "shard": shard.index,
+                    "predicted_seconds": round(shard.seconds),
+                    "jobs": [{"target": target, "platform": platform} for (target, platform) in shard.jobs],
+                }
+                for shard in shards
+            ],
+            separators=(",", ":"),
+        ),
+        "predicted_makespan_seconds=" + json.dumps(round(makespan)),
     ]
 
+    for shard in shards:
+        logging.info(f"Shard {shard.index}: {len(shard.jobs)} jobs, predicted {shard.seconds / 60:.0f} min")
+    logging.info(f"Predicted makespan: {makespan / 60:.0f} min")
     print("targets", targets_with_platform)
     print(*output, sep="\n")
 
@@ -288,3 +402,30 @@ class TestSelf(unittest.TestCase):
             "rocm-jupyter-pytorch-ubi9-python-3.12",
             "rocm-jupyter-tensorflow-ubi9-python-3.12",
         }
+
+    def test_load_durations_uses_median_of_recent_records(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            history = pathlib.Path(tmpdir) / "durations.jsonl"
+            records = [
+                {"target": "a", "platform": "linux/amd64", "build_seconds": seconds, "test_seconds": 10}
+                for seconds in [1000, *range(HISTORY_SAMPLES)]
+            ]
+            records.append({"target": "a", "platform": "linux/arm64", "build_seconds": 50})
+            history.write_text("\n".join(json.dumps(record) for record in records) + "\nnot json\n")
+
+            assert load_durations(history) == {
+                ("a", "linux/amd64"): 10 + statistics.median(range(HISTORY_SAMPLES)),
+                ("a", "linux/arm64"): 50,
+            }
+
+    def test_schedule_shards_flattens_long_tail(self):
+        estimates = estimate_durations(
+            [("big", "amd64"), ("new", "amd64")] + [(f"small{i}", "amd64") for i in range(6)],
+            {("big", "amd64"): 60.0} | {(f"small{i}", "amd64"): 10.0 for i in range(6)},
+        )
+        shards = schedule_shards(estimates, 3)
+
+        # the unknown target is estimated like the slowest known one and gets a shard of its own
+        assert [shard.jobs[0][0] for shard in shards] == ["big", "new", "small0"]
+        assert [shard.seconds for shard in shards] == [60.0, 60.0, 60.0]
+        assert sorted(job for shard in shards for job in shard.jobs) == sorted(estimates)
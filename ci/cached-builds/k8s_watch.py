@@ -0,0 +1,216 @@
+"""Wait for a condition on a set of Kubernetes objects using the watch API.
+
+The waiter lists the objects once, then follows a watch from the list's
+``resourceVersion`` and re-evaluates the condition on every event, so it returns as
+soon as the condition flips instead of on the next tick of a fixed poll interval.
+When a watch stream ends (server-side timeout) it is resumed from the last seen
+``resourceVersion``; a ``410 Gone`` answer triggers a fresh list. Any other watch
+error switches the waiter to plain polling for the rest of the wait.
+
+This module only uses the standard library. It is shared by ``make_test.py``, which
+runs on the bare CI host and talks to the cluster through ``kubectl``, and by
+``tests/containers/kubernetes_utils.py``, which uses the Python kubernetes client.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import subprocess
+import time
+import urllib.parse
+from typing import TYPE_CHECKING, Any, Protocol
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator, Mapping
+
+LOGGER = logging.getLogger(__name__)
+
+# Upper bound for a single watch request, the API server may end it earlier
+WATCH_TIMEOUT_SECONDS = 60
+
+type Object = dict[str, Any]
+
+
+class WatchSource(Protocol):
+    """The two API calls the waiter needs, for one collection of objects."""
+
+    def list(self) -> tuple[list[Object], str]:
+        """Return the current objects and the collection ``resourceVersion``."""
+        ...
+
+    def watch(self, resource_version: str, timeout_seconds: int) -> Generator[Object]:
+        """Yield watch events (``{"type": ..., "object": ...}``) newer than ``resource_version``."""
+        ...
+
+
+class ResourceVersionExpiredError(Exception):
+    """The API server no longer has the requested ``resourceVersion`` (HTTP 410 Gone)."""
+
+
+def _key(obj: Object) -> str:
+    metadata = obj.get("metadata") or {}
+    return metadata.get("uid") or f"{metadata.get('namespace')}/{metadata.get('name')}"
+
+
+def wait_for(
+    description: str,
+    source: WatchSource,
+    condition: Callable[[Mapping[str, Object]], bool],
+    timeout: float,
+    *,
+    stable_for: float = 0.0,
+    poll_interval: float = 5.0,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Mapping[str, Object]:
+    """Wait until ``condition`` holds for the objects of ``source``.
+
+    Args:
+        description: What is being waited for, used in log and error messages.
+        source: Lists and watches the objects.
+        condition: Called with the current objects keyed by uid after the list and after every event.
+        timeout: Maximum seconds to wait.
+        stable_for: Seconds the condition must keep holding before the wait succeeds.
+        poll_interval: Seconds between lists once the waiter has fallen back to polling.
+        clock: Monotonic clock, injectable for testing.
+        sleep: Sleep function, injectable for testing.
+
+    Returns:
+        The objects for which the condition held.
+
+    Raises:
+        TimeoutError: If the condition does not (stably) hold within ``timeout`` seconds.
+    """
+    LOGGER.info("Waiting for: %s", description)
+    deadline = clock() + timeout
+    objects: dict[str, Object] = {}
+    satisfied_since: float | None = None
+
+    def evaluate() -> bool:
+        nonlocal satisfied_since
+        if not condition(objects):
+            satisfied_since = None
+            return False
+        now = clock()
+        if satisfied_since is None:
+            satisfied_since = now
+        return now - satisfied_since >= stable_for
+
+    def relist() -> str:
+        items, resource_version = source.list()
+        objects.clear()
+        objects.update((_key(obj), obj) for obj in items)
+        return resource_version
+
+    resource_version = relist()
+    if evaluate():
+        return objects
+
+    try:
+        while (remaining := deadline - clock()) > 0:
+            # while the condition holds, only watch until the stability window closes
+            if satisfied_since is not None:
+                remaining = min(remaining, satisfied_since + stable_for - clock())
+            watch_timeout = max(1, min(WATCH_TIMEOUT_SECONDS, int(remaining) + 1))
+            try:
+                with contextlib.closing(source.watch(resource_version, watch_timeout)) as events:
+                    for event in events:
+                        obj = event.get("object") or {}
+                        match event.get("type"):
+                            case "ADDED" | "MODIFIED":
+                                objects[_key(obj)] = obj
+                            case "DELETED":
+                                objects.pop(_key(obj), None)
+                            case "ERROR":
+                                if obj.get("code") == 410:
+                                    raise ResourceVersionExpiredError(obj.get("message"))
+                                raise RuntimeError(f"watch error: {obj.get('message') or obj}")
+                        resource_version = (obj.get("metadata") or {}).get("resourceVersion") or resource_version
+                        if evaluate():
+                            return objects
+                        if clock() >= deadline:
+                            break
+                        if satisfied_since is not None and watch_timeout > stable_for + 1:
+                            # re-issue the watch so that it ends when the stability window closes
+                            break
+            except ResourceVersionExpiredError:
+                LOGGER.debug("resourceVersion %s expired, listing again", resource_version)
+                resource_version = relist()
+            # stream ended: the stability window may have closed without further events
+            if evaluate():
+                return objects
+    except Exception as e:
+        LOGGER.warning("Watch failed while waiting for %s, falling back to polling: %s", description, e)
+        while clock() < deadline:
+            try:
+                relist()
+            except Exception as list_error:
+                LOGGER.debug("List failed while waiting for %s: %s", description, list_error)
+            else:
+                if evaluate():
+                    return objects
+            sleep(max(0.0, min(poll_interval, deadline - clock())))
+
+    raise TimeoutError(f"Timeout after {timeout} s waiting for {description}")
+
+
+def pods_ready(pods: Mapping[str, Object], expect_pods_count: int | None = None) -> bool:
+    """True if there are pods (exactly ``expect_pods_count`` if given) and each is Ready or has Succeeded.
+
+    >>> ready = {"status": {"phase": "Running", "conditions": [{"type": "Ready", "status": "True"}]}}
+    >>> pods_ready({"a": ready})
+    True
+    >>> pods_ready({}), pods_ready({}, expect_pods_count=0), pods_ready({"a": ready}, expect_pods_count=2)
+    (False, True, False)
+    """
+    if expect_pods_count is not None and len(pods) != expect_pods_count:
+        return False
+    if not pods:
+        return expect_pods_count == 0
+    for pod in pods.values():
+        status = pod.get("status") or {}
+        if status.get("phase") == "Succeeded":
+            continue
+        if not any(c.get("type") == "Ready" and c.get("status") == "True" for c in status.get("conditions") or []):
+            return False
+    return True
+
+
+class KubectlPodSource:
+    """Lists and watches pods through ``kubectl``, for hosts without the Python kubernetes client."""
+
+    def __init__(self, namespace: str, label_selector: str | None = None, kubectl: str = "kubectl") -> None:
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.kubectl = kubectl
+
+    def _path(self, **params: str) -> str:
+        if self.label_selector:
+            params["labelSelector"] = self.label_selector
+        query = f"?{urllib.parse.urlencode(params)}" if params else ""
+        return f"/api/v1/namespaces/{urllib.parse.quote(self.namespace)}/pods{query}"
+
+    def list(self) -> tuple[list[Object], str]:
+        output = subprocess.check_output([self.kubectl, "get", "--raw", self._path()], text=True)
+        pod_list = json.loads(output)
+        return pod_list.get("items") or [], pod_list["metadata"]["resourceVersion"]
+
+    def watch(self, resource_version: str, timeout_seconds: int) -> Generator[Object]:
+        path = self._path(
+            watch="1",
+            resourceVersion=resource_version,
+            allowWatchBookmarks="true",
+            timeoutSeconds=str(timeout_seconds),
+        )
+        with subprocess.Popen([self.kubectl, "get", "--raw", path], stdout=subprocess.PIPE, text=True) as process:
+            assert process.stdout is not None
+            try:
+                for line in process.stdout:
+                    if line.strip():
+                        yield json.loads(line)
+            finally:
+                process.kill()
+        if process.returncode not in (0, -9):
+            raise subprocess.CalledProcessError(process.returncode, process.args)
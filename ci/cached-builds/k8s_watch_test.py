@@ -0,0 +1,195 @@
+"""Tests for k8s_watch against an in-memory stand-in for the Kubernetes API server."""
+
+from __future__ import annotations
+
+import json
+import stat
+from typing import TYPE_CHECKING, Any
+
+import k8s_watch
+import pytest
+
+if TYPE_CHECKING:
+    import pathlib
+    from collections.abc import Generator
+
+
+def pod(name: str, *, ready: bool = False, phase: str = "Running", rv: int = 1) -> dict[str, Any]:
+    return {
+        "metadata": {"name": name, "namespace": "ns", "uid": f"uid-{name}", "resourceVersion": str(rv)},
+        "status": {"phase": phase, "conditions": [{"type": "Ready", "status": "True" if ready else "False"}]},
+    }
+
+
+class FakeApiServer:
+    """Serves one list and a scripted sequence of watch streams, advancing a fake clock.
+
+    Each stream is a list of events; the string ``"gone"`` yields a 410 ERROR event and an
+    ``Exception`` instance is raised from the stream. A stream that runs out of events ends
+    like a server-side watch timeout, after ``timeout_seconds`` of fake time.
+    """
+
+    def __init__(self, items: list[dict[str, Any]], streams: list[list[Any]]) -> None:
+        self.items = items
+        self.streams = streams
+        self.now = 0.0
+        self.lists = 0
+        self.watch_calls: list[str] = []
+
+    def clock(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+    def list(self) -> tuple[list[dict[str, Any]], str]:
+        self.lists += 1
+        return list(self.items), str(100 * self.lists)
+
+    def watch(self, resource_version: str, timeout_seconds: int) -> Generator[dict[str, Any]]:
+        self.watch_calls.append(resource_version)
+        events = self.streams.pop(0) if self.streams else []
+        for event in events:
+            self.now += 1
+            if event == "gone":
+                yield {"type": "ERROR", "object": {"kind": "Status", "code": 410, "message": "too old"}}
+            elif isinstance(event, Exception):
+                raise event
+            else:
+                yield event
+        self.now += timeout_seconds
+
+
+def wait(server: FakeApiServer, timeout: float = 100, **kwargs: Any) -> Any:
+    return k8s_watch.wait_for(
+        "pods ready",
+        server,
+        k8s_watch.pods_ready,
+        timeout,
+        clock=server.clock,
+        sleep=server.sleep,
+        **kwargs,
+    )
+
+
+def test_returns_on_the_event_that_flips_the_condition() -> None:
+    server = FakeApiServer(
+        [pod("a")],
+        [[{"type": "MODIFIED", "object": pod("a", rv=2)}, {"type": "MODIFIED", "object": pod("a", ready=True, rv=3)}]],
+    )
+
+    objects = wait(server)
+
+    assert server.now == 2
+    assert server.lists == 1
+    assert list(objects) == ["uid-a"]
+
+
+def test_ready_at_list_time_does_not_watch() -> None:
+    server = FakeApiServer([pod("a", ready=True)], [])
+
+    wait(server)
+
+    assert server.watch_calls == []
+
+
+def test_resumes_from_last_resource_version() -> None:
+    server = FakeApiServer(
+        [pod("a")],
+        [
+            [{"type": "MODIFIED", "object": pod("a", rv=150)}],
+            [{"type": "MODIFIED", "object": pod("a", ready=True, rv=160)}],
+        ],
+    )
+
+    wait(server)
+
+    assert server.watch_calls == ["100", "150"]
+    assert server.lists == 1
+
+
+def test_gone_relists(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = FakeApiServer([pod("a")], [["gone"]])
+    first_list = server.list
+
+    def list_then_ready() -> tuple[list[dict[str, Any]], str]:
+        result = first_list()
+        server.items = [pod("a", ready=True)]
+        return result
+
+    monkeypatch.setattr(server, "list", list_then_ready)
+
+    wait(server)
+
+    assert server.lists == 2
+
+
+def test_watch_error_falls_back_to_polling(monkeypatch: pytest.MonkeyPatch) -> None:
+    server = FakeApiServer([pod("a")], [[ConnectionResetError("boom")]])
+
+    def flip_ready(seconds: float) -> None:
+        server.now += seconds
+        server.items = [pod("a", ready=True)]
+
+    monkeypatch.setattr(server, "sleep", flip_ready)
+
+    wait(server, poll_interval=5)
+
+    assert len(server.watch_calls) == 1
+    assert server.lists == 3
+
+
+def test_stable_for_requires_condition_to_keep_holding() -> None:
+    server = FakeApiServer(
+        [pod("a", ready=True)],
+        [
+            [{"type": "MODIFIED", "object": pod("a", ready=False, rv=2)}],
+            [{"type": "MODIFIED", "object": pod("a", ready=True, rv=3)}],
+        ],
+    )
+
+    wait(server, stable_for=10)
+
+    # not ready at t=1, ready again at t=13; a third watch covers just the quiet window
+    assert 23 <= server.now < 30
+    assert server.watch_calls == ["100", "2", "3"]
+
+
+def test_deleted_pods_are_dropped() -> None:
+    server = FakeApiServer(
+        [pod("a", ready=True), pod("b")],
+        [[{"type": "DELETED", "object": pod("b", rv=2)}]],
+    )
+
+    objects = wait(server)
+
+    assert list(objects) == ["uid-a"]
+
+
+def test_timeout() -> None:
+    server = FakeApiServer([pod("a")], [])
+
+    with pytest.raises(TimeoutError, match="pods ready"):
+        wait(server, timeout=30)
+
+
+def test_kubectl_pod_source(tmp_path: pathlib.Path) -> None:
+    pod_list = {"metadata": {"resourceVersion": "7"}, "items": [pod("a")]}
+    event = {"type": "MODIFIED", "object": pod("a", ready=True, rv=8)}
+    kubectl = tmp_path / "kubectl"
+    kubectl.write_text(
+        "#!/bin/sh\n"
+        f'echo "$@" >> {tmp_path}/calls\n'
+        'case "$3" in\n'
+        f"  *watch=1*) echo '{json.dumps(event)}' ;;\n"
+        f"  *) echo '{json.dumps(pod_list)}' ;;\n"
+        "esac\n"
+    )
+    kubectl.chmod(kubectl.stat().st_mode | stat.S_IXUSR)
+    source = k8s_watch.KubectlPodSource("ns", label_selector="app=x", kubectl=str(kubectl))
+
+    assert source.list() == ([pod("a")], "7")
+    assert list(source.watch("7", 30)) == [event]
+    calls = (tmp_path / "calls").read_text().splitlines()
+    assert calls[0] == "get --raw /api/v1/namespaces/ns/pods?labelSelector=app%3Dx"
+    assert "watch=1&resourceVersion=7" in calls[1]
@@ -2,9 +2,14 @@
 
 from __future__ import annotations
 
+import concurrent.futures
+import functools
+import hashlib
+import json
 import os
 import pathlib
 import re
+import tempfile
 from typing import TYPE_CHECKING, Any
 
 import gen_gha_matrix_jobs
@@ -12,6 +17,7 @@ import gha_pr_changed_files
 import makefile_helper
 import yaml
 
+import scripts.buildinputs_runner
 import scripts.sandbox
 
 ROOT_DIR = pathlib.Path(__file__).parent.parent.parent
@@ -29,24 +35,23 @@ This script creates the Tekton pipelines under /.tekton
 Usage:
 
 $ PYTHONPATH=. uv run ci/cached-builds/konflux_generate_component_build_pipelines.py
+
+Components are generated in parallel, and files whose content did not change are not rewritten.
+The buildinputs results behind the path-change CEL expressions are cached per Dockerfile, see `compute_cel_expression`.
 """
 
+# the generated files start with this
+HEADER = (
+    "# yamllint disable-file\n"
+    "# This file is autogenerated by ci/cached-builds/konflux_generate_component_build_pipelines.py\n"
+)
+
 
 def bundle_task_ref(name) -> dict:
     """Returns a reference to a Konflux task bundle.
 
     Uses the `image-registry.yaml` file as an up-to-date source for the digests."""
-    registry_path = ROOT_DIR / ".tekton/image-registry.yaml"
-    try:
-        with open(registry_path) as f:
-            data = yaml.safe_load(f)
-    except FileNotFoundError:
-        raise FileNotFoundError(
-            f"Required file {registry_path} not found. Bundle task references cannot be resolved without it."
-        ) from None
-
-    images: list[str] = [image["spec"]["taskRef"]["bundle"] for image in data["items"]]
-    for image in images:
+    for image in bundle_images():
         if re.search(f"^quay.io/konflux-ci/tekton-catalog/task-{name}:", image):
             bundle = image
             break
@@ -66,6 +71,21 @@ def bundle_task_ref(name) -> dict:
     }
 
 
+@functools.cache
+def bundle_images() -> list[str]:
+    """Returns the task bundles listed in `image-registry.yaml`, parsed once per run."""
+    registry_path = ROOT_DIR / ".tekton/image-registry.yaml"
+    try:
+        with open(registry_path) as f:
+            data = yaml.safe_load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"Required file {registry_path} not found. Bundle task references cannot be resolved without it."
+        ) from None
+
+    return [image["spec"]["taskRef"]["bundle"] for image in data["items"]]
+
+
 def component_build_pipeline(component_name, dockerfile_path, release, is_pr: bool = True) -> dict:
     """Returns a component build pipeline definition.
 
@@ -794,50 +814,90 @@ def extract_image_release(makefile_dir: pathlib.Path | str | None = None) -> str
 
 
 def main():
-    yaml_line_width = None
     yaml.add_representer(str, represent_str)
 
     release = extract_image_release(makefile_dir=str(ROOT_DIR)).strip()
     images = gen_gha_matrix_jobs.extract_image_targets(makefile_dir=str(ROOT_DIR))
-    for task in images:
-        task_name = re.sub(r"[^-_0-9A-Za-z]", "-", task)
-        dockerfile = gha_pr_changed_files.get_build_dockerfile(task)
-        with open(ROOT_DIR / ".tekton" / (task_name + "-push.yaml"), "w") as yaml_file:
-            print("# yamllint disable-file", file=yaml_file)
-            print(
-                "# This file is autogenerated by ci/cached-builds/konflux_generate_component_build_pipelines.py",
-                file=yaml_file,
-            )
-            print(
-                yaml.dump(
-                    component_build_pipeline(
-                        component_name=task_name, dockerfile_path=dockerfile, release=release, is_pr=False
-                    ),
-                    width=yaml_line_width,
-                ),
-                end="",
-                file=yaml_file,
-            )
-        with open(ROOT_DIR / ".tekton" / (task_name + "-pull-request.yaml"), "w") as yaml_file:
-            print("# yamllint disable-file", file=yaml_file)
-            print(
-                "# This file is autogenerated by ci/cached-builds/konflux_generate_component_build_pipelines.py",
-                file=yaml_file,
-            )
-            print(
-                yaml.dump(
-                    component_build_pipeline(
-                        component_name=task_name, dockerfile_path=dockerfile, release=release, is_pr=True
-                    ),
-                    width=yaml_line_width,
-                ),
-                end="",
-                file=yaml_file,
-            )
+    # once, before the workers would each start `make bin/buildinputs` on a fresh checkout
+    scripts.buildinputs_runner.ensure_local_buildinputs()
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        written = sum(executor.map(functools.partial(generate_component_pipelines, release=release), images))
+    print(f"Updated {written} of {2 * len(images)} pipeline files")
 
 
-def compute_cel_expression(dockerfile: pathlib.Path) -> str:
-    return cel_expression(root_dir=ROOT_DIR, files=scripts.sandbox.buildinputs(dockerfile))
+def generate_component_pipelines(task: str, release: str) -> int:
+    """Writes the push and pull-request pipelines of a Makefile target, returns the number of files that changed."""
+    yaml_line_width = None
+    task_name = re.sub(r"[^-_0-9A-Za-z]", "-", task)
+    dockerfile = gha_pr_changed_files.get_build_dockerfile(task)
+    written = 0
+    for suffix, is_pr in (("-push.yaml", False), ("-pull-request.yaml", True)):
+        pipeline = component_build_pipeline(
+            component_name=task_name, dockerfile_path=dockerfile, release=release, is_pr=is_pr
+        )
+        content = HEADER + yaml.dump(pipeline, width=yaml_line_width)
+        written += write_if_changed(ROOT_DIR / ".tekton" / (task_name + suffix), content)
+    return written
+
+
+def write_if_changed(path: pathlib.Path, content: str) -> bool:
+    try:
+        if path.read_text() == content:
+            return False
+    except FileNotFoundError:
+        pass
+    path.write_text(content)
+    return True
+
+
+def cel_cache_dir() -> pathlib.Path | None:
+    """Where `compute_cel_expression` caches, `KONFLUX_CEL_CACHE_DIR` overrides it and an empty value disables the cache."""
+    path = os.environ.get("KONFLUX_CEL_CACHE_DIR")
+    if path is not None:
+        return pathlib.Path(path) if path else None
+    return pathlib.Path(os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache") / "notebooks/konflux-cel"
+
+
+@functools.cache
+def buildinputs_fingerprint() -> str:
+    """Hash of the buildinputs sources, so that a change to the tool invalidates the cached results."""
+    digest = hashlib.sha256()
+    for path in sorted((ROOT_DIR / "scripts/buildinputs").iterdir()):
+        if path.is_file():
+            digest.update(path.name.encode() + b"\0" + path.read_bytes())
+    return digest.hexdigest()
+
+
+def compute_cel_expression(dockerfile: pathlib.Path | str) -> str:
+    """Returns the CEL expression matching changes to the build inputs of `dockerfile`.
+
+    Running buildinputs is the slow part, so the expression is cached under the hash of the
+    Dockerfile path, its content and the buildinputs sources. The cached entry also records which
+    of the resolved inputs are directories (they get a `/***` pattern) and is only used while that still holds.
+    """
+    cache_dir = cel_cache_dir()
+    if cache_dir is None:
+        return cel_expression(root_dir=ROOT_DIR, files=scripts.sandbox.buildinputs(dockerfile))
+
+    key = hashlib.sha256(
+        f"{buildinputs_fingerprint()}\0{dockerfile}\0".encode() + (ROOT_DIR / dockerfile).read_bytes()
+    ).hexdigest()
+    cache_file = cache_dir / f"{key}.json"
+    try:
+        entry = json.loads(cache_file.read_text())
+        if all((ROOT_DIR / file).is_dir() == is_dir for file, is_dir in entry["inputs"].items()):
+            return entry["expression"]
+    except OSError, ValueError, KeyError, TypeError:
+        pass
+
+    files = scripts.sandbox.buildinputs(dockerfile)
+    expression = cel_expression(root_dir=ROOT_DIR, files=files)
+    inputs = {str(file.relative_to(ROOT_DIR) if file.is_absolute() else file): file.is_dir() for file in files}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wt", dir=cache_dir, suffix=".tmp", delete=False) as f:
+        json.dump({"dockerfile": str(dockerfile), "inputs": inputs, "expression": expression}, f, indent=1)
+    pathlib.Path(f.name).replace(cache_file)
+    return expression
 
 
 def cel_expression(root_dir: pathlib.Path, files: list[pathlib.Path]) -> str:
@@ -868,6 +928,7 @@ else:
     # test dependencies
     if TYPE_CHECKING:
         import pyfakefs.fake_filesystem
+        import pytest
 
     class Tests:
         def test_compute_cel_expression(self, fs: pyfakefs.fake_filesystem.FakeFilesystem):
@@ -881,3 +942,44 @@ else:
                 cel_expression(ROOT_DIR, files=[pathlib.Path("a"), pathlib.Path("b") / "c.txt"])
                 == '"a/***".pathChanged() || "b/c.txt".pathChanged()'
             )
+
+        def test_compute_cel_expression_is_cached(
+            self, fs: pyfakefs.fake_filesystem.FakeFilesystem, monkeypatch: pytest.MonkeyPatch
+        ):
+            fs.cwd = ROOT_DIR  # pyright: ignore[reportAttributeAccessIssue]
+            fs.create_file(ROOT_DIR / "scripts/buildinputs/buildinputs.go", contents="package main")
+            fs.create_file(ROOT_DIR / "img/Dockerfile", contents="COPY a b/c.txt /")
+            fs.create_dir(ROOT_DIR / "a")
+            fs.create_file(ROOT_DIR / "b/c.txt")
+            monkeypatch.setenv("KONFLUX_CEL_CACHE_DIR", "/cache")
+            buildinputs_fingerprint.cache_clear()
+            calls = []
+
+            def buildinputs(dockerfile):
+                calls.append(dockerfile)
+                return [pathlib.Path("a"), pathlib.Path("b/c.txt")]
+
+            monkeypatch.setattr(scripts.sandbox, "buildinputs", buildinputs)
+            expected = '"a/***".pathChanged() || "b/c.txt".pathChanged()'
+
+            assert compute_cel_expression("img/Dockerfile") == expected
+            assert compute_cel_expression("img/Dockerfile") == expected
+            assert len(calls) == 1
+
+            # an input that turned from a file into a directory changes the expression
+            (ROOT_DIR / "b/c.txt").unlink()
+            (ROOT_DIR / "b/c.txt").mkdir()
+            assert compute_cel_expression("img/Dockerfile") == '"a/***".pathChanged() || "b/c.txt/***".pathChanged()'
+            # so does a change to the Dockerfile
+            (ROOT_DIR / "img/Dockerfile").write_text("COPY a b/c.txt /opt/")
+            compute_cel_expression("img/Dockerfile")
+            assert len(calls) == 3
+
+        def test_write_if_changed(self, fs: pyfakefs.fake_filesystem.FakeFilesystem):
+            path = pathlib.Path("/pipeline.yaml")
+            assert write_if_changed(path, "a")
+            mtime = path.stat().st_mtime_ns
+            assert not write_if_changed(path, "a")
+            assert path.stat().st_mtime_ns == mtime
+            assert write_if_changed(path, "b")
+            assert path.read_text() == "b"
@@ -13,6 +13,8 @@ import typing
 import unittest
 import unittest.mock
 
+import k8s_watch
+
 """Runs the make commands used to deploy, test, and undeploy image in Kubernetes
 
 The make commands this runs are intended to reproduce the commands we define in our OpenShift CI config at
@@ -80,7 +82,7 @@ def run_tests(target: str) -> None:
     check_call("timeout 10s bash -c 'until kubectl get serviceaccount/default; do sleep 1; done'", shell=True)
 
     check_call(f"make {shlex.quote(f'{deploy}-{deploy_target}')}", shell=True)
-    wait_for_stability(pod, target)
+    wait_for_stability(pod, target, namespace)
 
     try:
         if target.startswith("runtime-"):
@@ -150,20 +152,38 @@ def _make_just_print(target: str) -> str:
 _HEAVY_TARGETS = ("jupyter-datascience", "jupyter-trustyai")
 
 
-# TODO(jdanek) this is a dumb impl, needs to be improved
-def wait_for_stability(pod: str, target: str = "") -> None:
-    """Waits for the pod to be stable. Often I'm seeing that the probes initially fail.
+# Pods must stay Ready this long; often I'm seeing that the probes initially fail.
+_STABILITY_SECONDS = 6
+
+
+def wait_for_stability(pod: str, target: str = "", namespace: str | None = None) -> None:
+    """Waits for all pods in the namespace to be Ready and to stay Ready for a few seconds.
     > error: Internal error occurred: error executing command in container: container is not created or running
     > error: unable to upgrade connection: container not found ("notebook")
+
+    Pod changes are followed with a watch, so this returns as soon as the pods settle.
+    Like the `kubectl wait` loop it replaces, a timeout is only reported, not raised;
+    the test run that follows fails with the pod diagnostics dumped afterwards.
     """
     timeout = 200 if any(h in target for h in _HEAVY_TARGETS) else 100
-    for _ in range(3):
-        call(
-            f"timeout {timeout}s bash -c 'until kubectl wait --for=condition=Ready pods --all --timeout 5s; do sleep 1; done'",
-            shell=True,
+    if namespace is None:
+        namespace = subprocess.check_output(
+            ["kubectl", "config", "view", "--minify", "--output", "jsonpath={..namespace}"], text=True
+        ).strip()
+    start = time.monotonic()
+    try:
+        k8s_watch.wait_for(
+            f"pods in namespace {namespace} (including {pod}) to be stably Ready",
+            k8s_watch.KubectlPodSource(namespace),
+            k8s_watch.pods_ready,
+            timeout,
+            stable_for=_STABILITY_SECONDS,
         )
-        timeout = 50
-        time.sleep(3)
+    except TimeoutError as e:
+        print(f"[WARNING] {e}")
+    else:
+        print(f"[INFO] Pods in {namespace} stably Ready after {time.monotonic() - start:.1f}s")
+    sys.stdout.flush()
 
 
 # https://docs.github.com/en/actions/writing-workflows/choosing-what-your-workflow-does/workflow-commands-for-github-actions#grouping-log-lines
@@ -181,6 +201,7 @@ def gha_log_group(title):
 
 # https://docs.python.org/3/library/unittest.mock-examples.html#patch-decorators
 @unittest.mock.patch("time.sleep", unittest.mock.Mock())
+@unittest.mock.patch(f"{__name__}.wait_for_stability", unittest.mock.Mock())
 class TestMakeTest(unittest.TestCase):
     target = execute.__module__ + "." + execute.__name__
 
@@ -5,6 +5,13 @@ This is a focused availability check.
 It verifies that images can be fetched and, for successful checks,
 reads the image config timestamp so CI and local runs can show a richer summary with image age.
 
+Results for digest-pinned images never change, so successful checks are kept in a persistent cache
+keyed by ``registry/repository@digest`` (``$IMAGE_AVAILABILITY_CACHE``, default
+``~/.cache/notebooks/image-availability.json``). Digest references found in the cache are not inspected
+with a full ``skopeo inspect``, only with a cheap manifest HEAD request that still catches images deleted
+or garbage-collected from the registry. Tag references are resolved to a digest with the same HEAD request,
+and only go through ``skopeo inspect`` when that digest has not been seen before. Failures are never cached.
+
 Usage:
     python ci/check-image-availability.py manifests/odh/base/params-latest.env manifests/odh/base/params.env
 """
@@ -18,11 +25,14 @@ import pathlib
 import re
 import shutil
 import sys
+import tempfile
 from contextlib import AbstractContextManager
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from typing import Self
-from urllib.parse import quote
+from urllib.error import HTTPError
+from urllib.parse import quote, urlencode
+from urllib.request import Request, urlopen
 
 import structlog
 from rich.console import Console
@@ -37,9 +47,21 @@ log = structlog.get_logger()
 
 
 COMMAND_TIMEOUT_SECONDS = 120
+MANIFEST_HEAD_TIMEOUT_SECONDS = 30
 MAX_CONCURRENT_CHECKS = 22
 SUMMARY_MISSING_VALUE = "—"
 
+CACHE_PATH_ENV = "IMAGE_AVAILABILITY_CACHE"
+DEFAULT_CACHE_PATH = pathlib.Path.home() / ".cache" / "notebooks" / "image-availability.json"
+CACHE_VERSION = 1
+
+_MANIFEST_MEDIA_TYPES = (
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+)
+
 
 @dataclass(slots=True)
 class ImageCheckResult:
@@ -48,6 +70,25 @@ class ImageCheckResult:
     available: bool
     created: datetime | None = None
     error: str | None = None
+    digest: str | None = None
+    cached: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class ImageReference:
+    registry: str
+    repository: str
+    tag: str | None
+    digest: str | None
+
+    @property
+    def cache_key(self) -> str | None:
+        if self.digest is None:
+            return None
+        return f"{self.registry}/{self.repository}@{self.digest}"
+
+    def with_digest(self, digest: str) -> ImageReference:
+        return ImageReference(self.registry, self.repository, self.tag, digest)
 
 
 @dataclass(slots=True)
@@ -70,6 +111,7 @@ class RichProgressTable(AbstractContextManager["RichProgressTable"]):
                 "status": "Pending",
                 "quay_url": None,
                 "age": SUMMARY_MISSING_VALUE,
+                "cached": False,
             }
             for _, image_url in entries
         }
@@ -93,6 +135,7 @@ class RichProgressTable(AbstractContextManager["RichProgressTable"]):
             "status": "OK" if result.available else "Missing",
             "quay_url": build_quay_url(result.image_url),
             "age": format_age(result.created),
+            "cached": result.cached,
         }
         self._console.print(self._render_progress_line(result, state))
         self._live.update(self._render_table(), refresh=False)
@@ -109,6 +152,8 @@ class RichProgressTable(AbstractContextManager["RichProgressTable"]):
         age = format_age(result.created)
         if age != SUMMARY_MISSING_VALUE:
             progress_line.append(f" ({age})", style="dim")
+        if result.cached:
+            progress_line.append(" [cached]", style="dim")
         return progress_line
 
     def _render_table(self) -> Table:
@@ -128,9 +173,13 @@ class RichProgressTable(AbstractContextManager["RichProgressTable"]):
 
             image_cell = render_image_cell(image_url, self._supports_hyperlinks)
 
+            status_cell = f"[{status_style}]{status}[/{status_style}]"
+            if row["cached"]:
+                status_cell += " [dim](cached)[/dim]"
+
             table.add_row(
                 image_cell,
-                f"[{status_style}]{status}[/{status_style}]",
+                status_cell,
                 row["age"],
             )
 
@@ -218,12 +267,16 @@ def write_github_step_summary(results: list[ImageCheckResult]) -> None:
         return
 
     ok_count = sum(1 for result in results if result.available)
+    cached_count = sum(1 for result in results if result.cached)
     missing = [result for result in results if not result.available]
 
     lines = [
         "## Image Availability Check",
         "",
-        f"Checked **{len(results)}** images: **{ok_count} OK**, **{len(missing)} missing**.",
+        (
+            f"Checked **{len(results)}** images: **{ok_count} OK**, **{len(missing)} missing**"
+            f" ({cached_count} from the digest cache)."
+        ),
         "",
         "| Image | Status | Quay link | Age |",
         "| --- | --- | --- | --- |",
@@ -234,7 +287,7 @@ def write_github_step_summary(results: list[ImageCheckResult]) -> None:
         link_cell = f"[Open in Quay]({quay_url})" if quay_url else SUMMARY_MISSING_VALUE
         lines.append(
             f"| {format_markdown_image(result.image_url)} | "
-            f"{'OK' if result.available else 'Missing'} | "
+            f"{'OK' if result.available else 'Missing'}{' (cached)' if result.cached else ''} | "
             f"{link_cell} | {format_age(result.created)} |"
         )
 
@@ -326,14 +379,209 @@ def _extract_skopeo_error(stderr_text: str) -> str:
     return msg
 
 
+def parse_image_reference(image_url: str) -> ImageReference | None:
+    """Split an image reference into registry, repository, tag and digest.
+
+    >>> parse_image_reference("quay.io/opendatahub/workbench-images:jupyter-2024b@sha256:abc")
+    ImageReference(registry='quay.io', repository='opendatahub/workbench-images', tag='jupyter-2024b', digest='sha256:abc')
+    >>> parse_image_reference("ubuntu:24.04")
+    ImageReference(registry='docker.io', repository='library/ubuntu', tag='24.04', digest=None)
+    """
+    if "://" in image_url:
+        return None
+
+    name, _, digest = image_url.partition("@")
+    tag: str | None = None
+    last_slash = name.rfind("/")
+    if ":" in name[last_slash + 1 :]:
+        name, tag = name.rsplit(":", maxsplit=1)
+
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        registry, repository = first, rest
+    else:
+        registry, repository = "docker.io", name
+    if registry == "docker.io" and "/" not in repository:
+        repository = f"library/{repository}"
+
+    if not repository or (tag is None and not digest):
+        return None
+    return ImageReference(registry=registry, repository=repository, tag=tag, digest=digest or None)
+
+
+class ImageResultCache:
+    """Persistent availability results for digest-pinned images.
+
+    Only successful checks are stored. Entries not used during a run are dropped on save,
+    so the file tracks what the params env files currently reference.
+    """
+
+    def __init__(self, path: pathlib.Path, entries: dict[str, dict[str, str | None]]) -> None:
+        self.path = path
+        self._entries = entries
+        self._used: dict[str, dict[str, str | None]] = {}
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> ImageResultCache:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(path, {})
+        except OSError, ValueError:
+            log.warning("Ignoring unreadable image availability cache", path=str(path), exc_info=True)
+            return cls(path, {})
+        if data.get("version") != CACHE_VERSION:
+            return cls(path, {})
+        return cls(path, data.get("images", {}))
+
+    def get(self, key: str) -> dict[str, str | None] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._used[key] = entry
+        return entry
+
+    def put(self, key: str, created: datetime | None) -> None:
+        entry = {
+            "created": created.isoformat() if created else None,
+            "checked": datetime.now(UTC).isoformat(timespec="seconds"),
+        }
+        self._entries[key] = entry
+        self._used[key] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": CACHE_VERSION, "images": dict(sorted(self._used.items()))}
+        with tempfile.NamedTemporaryFile("w", dir=self.path.parent, delete=False, encoding="utf-8") as f:
+            json.dump(payload, f, indent=1)
+            f.write("\n")
+        pathlib.Path(f.name).replace(self.path)
+
+
+def _registry_url(registry: str) -> str:
+    """The base URL of a registry's v2 API.
+
+    >>> _registry_url("docker.io")
+    'https://registry-1.docker.io'
+    """
+    return "https://registry-1.docker.io" if registry == "docker.io" else f"https://{registry}"
+
+
+def _anonymous_token(www_authenticate: str | None) -> str | None:
+    """Fetch an anonymous pull token for a ``Bearer realm=...,service=...,scope=...`` challenge."""
+    if not www_authenticate or not www_authenticate.startswith("Bearer "):
+        return None
+    params = dict(re.findall(r'(\w+)="([^"]*)"', www_authenticate))
+    realm = params.pop("realm", None)
+    if realm is None:
+        return None
+    request = Request(f"{realm}?{urlencode(params)}")  # ruff: ignore[suspicious-url-open-usage]
+    with urlopen(request, timeout=MANIFEST_HEAD_TIMEOUT_SECONDS) as response:  # ruff: ignore[suspicious-url-open-usage]
+        data = json.load(response)
+    return data.get("token") or data.get("access_token")
+
+
+def head_manifest_digest(ref: ImageReference) -> str | None:
+    """Resolve a reference to its manifest digest with a registry v2 ``HEAD`` request.
+
+    The manifest is looked up by digest when the reference has one, otherwise by tag.
+    Returns ``None`` when the registry reports the manifest as unknown. Any other failure
+    (private repository, unexpected response) raises, and the caller falls back to skopeo.
+    """
+    url = f"{_registry_url(ref.registry)}/v2/{ref.repository}/manifests/{ref.digest or ref.tag}"
+    headers = {"Accept": ", ".join(_MANIFEST_MEDIA_TYPES)}
+    for _attempt in range(2):
+        request = Request(url, method="HEAD", headers=headers)  # ruff: ignore[suspicious-url-open-usage]
+        try:
+            with urlopen(request, timeout=MANIFEST_HEAD_TIMEOUT_SECONDS) as response:  # ruff: ignore[suspicious-url-open-usage]
+                digest = response.headers.get("Docker-Content-Digest")
+        except HTTPError as e:
+            if e.code == 404:
+                return None
+            if e.code != 401 or "Authorization" in headers:
+                raise
+            token = _anonymous_token(e.headers.get("WWW-Authenticate"))
+            if token is None:
+                raise
+            headers["Authorization"] = f"Bearer {token}"
+            continue
+        if not digest:
+            raise ValueError(f"registry returned no Docker-Content-Digest for {url}")
+        return digest
+    raise AssertionError("unreachable")
+
+
+async def _head_manifest(image_url: str, ref: ImageReference, semaphore: asyncio.Semaphore) -> tuple[bool, str | None]:
+    """Run ``head_manifest_digest``; returns whether the registry answered, and the digest it reported."""
+    try:
+        async with semaphore:
+            return True, await asyncio.to_thread(head_manifest_digest, ref)
+    except (OSError, ValueError) as e:
+        log.debug("Manifest HEAD failed, falling back to skopeo", image_url=image_url, error=str(e))
+        return False, None
+
+
+def _manifest_unknown(variable: str, image_url: str, *, emit_immediate_errors: bool) -> ImageCheckResult:
+    if emit_immediate_errors:
+        log.error("Image check failed", image_url=image_url, error="manifest unknown")
+    return ImageCheckResult(variable=variable, image_url=image_url, available=False, error="manifest unknown")
+
+
 async def check_image(
     variable: str,
     image_url: str,
     semaphore: asyncio.Semaphore,
+    cache: ImageResultCache,
     *,
     emit_immediate_errors: bool,
 ) -> ImageCheckResult:
-    """Check whether a container image exists in the registry."""
+    """Check whether a container image exists, using the digest cache where possible."""
+    ref = parse_image_reference(image_url)
+    # whether the registry has just confirmed that the manifest of ref exists
+    confirmed = False
+    if ref is not None and ref.digest is None:
+        answered, digest = await _head_manifest(image_url, ref, semaphore)
+        if answered and digest is None:
+            return _manifest_unknown(variable, image_url, emit_immediate_errors=emit_immediate_errors)
+        if digest is not None:
+            ref = ref.with_digest(digest)
+            confirmed = True
+
+    cache_key = ref.cache_key if ref is not None else None
+    if cache_key is not None and (entry := cache.get(cache_key)) is not None:
+        if not confirmed:
+            # the image may have been deleted from the registry since it was cached
+            confirmed, digest = await _head_manifest(image_url, ref, semaphore)
+            if confirmed and digest is None:
+                return _manifest_unknown(variable, image_url, emit_immediate_errors=emit_immediate_errors)
+        if confirmed:
+            log.debug("Image found in digest cache", image_url=image_url, cache_key=cache_key)
+            return ImageCheckResult(
+                variable=variable,
+                image_url=image_url,
+                available=True,
+                created=parse_created_timestamp(entry.get("created")),
+                digest=ref.digest,
+                cached=True,
+            )
+
+    result = await inspect_image(variable, image_url, semaphore, emit_immediate_errors=emit_immediate_errors)
+    if result.available and cache_key is not None:
+        result.digest = ref.digest
+        cache.put(cache_key, result.created)
+    return result
+
+
+async def inspect_image(
+    variable: str,
+    image_url: str,
+    semaphore: asyncio.Semaphore,
+    *,
+    emit_immediate_errors: bool,
+) -> ImageCheckResult:
+    """Check whether a container image exists in the registry and read its creation timestamp."""
     full_image_url = f"docker://{image_url}"
     command = [
         "skopeo",
@@ -406,6 +654,7 @@ async def check_image_with_progress(
     variable: str,
     image_url: str,
     semaphore: asyncio.Semaphore,
+    cache: ImageResultCache,
     state: ProgressState,
     state_lock: asyncio.Lock,
     rich_table: RichProgressTable | None,
@@ -414,6 +663,7 @@ async def check_image_with_progress(
         variable,
         image_url,
         semaphore,
+        cache,
         emit_immediate_errors=rich_table is None,
     )
     quay_url = build_quay_url(result.image_url)
@@ -437,6 +687,7 @@ async def check_image_with_progress(
                 missing_so_far=state.missing_count,
                 image_url=result.image_url,
                 available=result.available,
+                cached=result.cached,
                 age=None if age == SUMMARY_MISSING_VALUE else age,
                 quay_url=quay_url,
             )
@@ -454,13 +705,14 @@ def parse_env_file(path: pathlib.Path) -> list[tuple[str, str]]:
 
 async def run_checks(
     all_entries: list[tuple[str, str]],
+    cache: ImageResultCache,
     rich_table: RichProgressTable | None,
 ) -> list[ImageCheckResult]:
     semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHECKS)
     state = ProgressState(total=len(all_entries))
     state_lock = asyncio.Lock()
     tasks = [
-        check_image_with_progress(variable, image_url, semaphore, state, state_lock, rich_table)
+        check_image_with_progress(variable, image_url, semaphore, cache, state, state_lock, rich_table)
         for variable, image_url in all_entries
     ]
     return await asyncio.gather(*tasks)
@@ -487,6 +739,12 @@ async def main() -> int:
         log.info("Parsed env file", path=str(path), count=len(entries))
         all_entries.extend(entries)
 
+    # The same variable=image line in several env files only needs checking once
+    unique_entries = list(dict.fromkeys(all_entries))
+    if len(unique_entries) != len(all_entries):
+        log.info("Deduplicated identical references", total=len(all_entries), unique=len(unique_entries))
+    all_entries = unique_entries
+
     # Detect duplicate image URLs — two variables pointing to the same image is a bug
     seen_urls: dict[str, str] = {}
     for variable, image_url in all_entries:
@@ -500,19 +758,32 @@ async def main() -> int:
             return 1
         seen_urls[image_url] = variable
 
+    cache = ImageResultCache.load(pathlib.Path(os.environ.get(CACHE_PATH_ENV) or DEFAULT_CACHE_PATH))
+    log.info("Loaded image availability cache", path=str(cache.path), entries=len(cache))
+
     rich_table: RichProgressTable | None = None
     if should_use_rich_output():
         rich_table = RichProgressTable(all_entries)
         with rich_table:
-            results = await run_checks(all_entries, rich_table)
+            results = await run_checks(all_entries, cache, rich_table)
     else:
-        results = await run_checks(all_entries, rich_table)
+        results = await run_checks(all_entries, cache, rich_table)
+
+    try:
+        cache.save()
+    except OSError:
+        log.exception("Failed to write image availability cache", path=str(cache.path))
 
     write_github_step_summary(results)
 
     failed = [result for result in results if not result.available]
 
-    log.info("Check complete", total=len(results), failed=len(failed))
+    log.info(
+        "Check complete",
+        total=len(results),
+        failed=len(failed),
+        cached=sum(1 for result in results if result.cached),
+    )
 
     if failed:
         pretty_log.error(
@@ -8,14 +8,15 @@ import pytest
 
 _ci_dir = pathlib.Path(__file__).parent
 
-# ci/ and ci/cached-builds/ scripts use bare imports
+# ci/, ci/cached-builds/ and ci/security-scan/ scripts use bare imports
 # (e.g. `import gha_pr_changed_files`, `import package_versions_selftestdata`)
 sys.path.insert(0, str(_ci_dir))
 sys.path.insert(0, str(_ci_dir / "cached-builds"))
+sys.path.insert(0, str(_ci_dir / "security-scan"))
 
 # Paths that cannot be imported as Python modules (hyphens in names)
 collect_ignore_glob = ["check-image-availability.py"]
-collect_ignore = ["security-scan", "cached_builds"]
+collect_ignore = ["cached_builds"]
 
 
 def pytest_collect_file(parent: pytest.Collector, file_path: pathlib.Path):
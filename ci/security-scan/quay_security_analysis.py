@@ -1,15 +1,57 @@
-import fileinput
+"""Weekly Quay vulnerability report for the workbench images of the main, N and N-1 branches.
+
+For every image pinned in ``weekly_commit_ids.env``, the latest tag built from the branch's
+weekly commit is looked up with the Quay tag API, its vulnerability report is fetched from the
+Quay security API, and the pin is moved to that tag's manifest digest. Images are processed
+concurrently by a bounded pool, and the env file is rewritten once, atomically, at the end.
+
+Two things are cached on disk by digest (``$SECURITY_SCAN_CACHE``, default
+``~/.cache/notebooks/security-scan``): the build name read from the config of a pinned image,
+which never changes, and vulnerability reports, which are reused for ``--report-max-age`` seconds.
+
+Usage (the workflow sets these env variables, see .github/workflows/sec-scan.yml):
+    LATEST_MAIN_COMMIT=... RELEASE_VERSION_N=... HASH_N=... RELEASE_VERSION_N_1=... HASH_N_1=... \\
+        python ci/security-scan/quay_security_analysis.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import dataclasses
+import json
+import logging
 import os
 import re
 import subprocess
+import tempfile
+import time
 from collections import Counter
 from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 import requests
 
-branch_dictionary = {}
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping, Sequence
 
-commit_id_path = "ci/security-scan/weekly_commit_ids.env"
+LOGGER = logging.getLogger(__name__)
+
+COMMIT_ID_PATH = "ci/security-scan/weekly_commit_ids.env"
+RESULTS_PATH = "ci/security-scan/security_scan_results.md"
+
+QUAY_URL = "https://quay.io"
+REQUEST_TIMEOUT_SECONDS = 30
+MAX_WORKERS = 8
+TAGS_PAGE_SIZE = 100
+
+CACHE_DIR_ENV = "SECURITY_SCAN_CACHE"
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "notebooks" / "security-scan"
+# vulnerability reports of a digest change as new CVEs are published
+REPORT_MAX_AGE_SECONDS = 24 * 60 * 60
+
+SEVERITIES = ["Medium", "Low", "Unknown", "High", "Critical"]
 
 IMAGES_MAIN = [
     "odh-minimal-notebook-image-main",
@@ -52,102 +94,242 @@ IMAGES_N_1 = [
 ]
 
 
-def generate_markdown_table(branch_dictionary):
-    markdown_data = ""
-    for key, value in branch_dictionary.items():
-        markdown_data += f"| [{key}](https://quay.io/repository/opendatahub/workbench-images/manifest/{value['sha']}?tab=vulnerabilities) |"
-        for severity in ["Medium", "Low", "Unknown", "High", "Critical"]:
-            count = value.get(severity, 0)  # Get count for the severity, default to 0 if not present
-            markdown_data += f" {count} |"
-        markdown_data += "\n"
-    return markdown_data
-
-
-def process_image(image, commit_id_path, release_version_n, hash_n):
-    with open(commit_id_path, "r") as params_file:
-        img_line = next(line for line in params_file if re.search(f"{image}=", line))
-        img = img_line.split("=")[1].strip()
-
-    registry = img.split("@")[0]
-
-    src_tag_cmd = (
-        f'skopeo inspect docker://{img} | jq \'.Env[] | select(startswith("OPENSHIFT_BUILD_NAME=")) | split("=")[1]\''
+@dataclasses.dataclass(frozen=True, slots=True)
+class Branch:
+    title: str
+    images: Sequence[str]
+    # empty for main, whose tags do not carry a release version
+    release_version: str
+    commit_hash: str
+
+    def tag_regex(self, src_tag: str) -> str:
+        """
+        >>> Branch("N", [], "2025a", "abc1234").tag_regex("jupyter-minimal")
+        '^jupyter-minimal-2025a-\\\\d+-abc1234$'
+        >>> Branch("main", [], "", "abc1234").tag_regex("jupyter-minimal")
+        '^jupyter-minimal-(\\\\d+-)?abc1234$'
+        """
+        if self.release_version == "":
+            return f"^{src_tag}-(\\d+-)?{self.commit_hash}$"
+        return f"^{src_tag}-{self.release_version}-\\d+-{self.commit_hash}$"
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class ScanResult:
+    image: str
+    tag: str
+    # the pin written to the env file; the previous one when the tag's report is not available
+    reference: str
+    digest: str
+    severity_counts: dict[str, int]
+    error: str | None = None
+
+
+class ReportNotReadyError(RuntimeError):
+    """Quay has not (yet) produced a vulnerability report for a manifest, e.g. it is still queued."""
+
+    def __init__(self, repository: str, digest: str, status: str | None) -> None:
+        super().__init__(f"Quay has no vulnerability report for {repository}@{digest}: {status}")
+        self.status = status
+
+
+class DigestCache:
+    """JSON documents stored as ``<directory>/<kind>/<digest>.json``; a ``None`` directory disables caching."""
+
+    def __init__(self, directory: Path | None) -> None:
+        self.directory = directory
+
+    def _path(self, kind: str, digest: str) -> Path:
+        assert self.directory is not None
+        return self.directory / kind / f"{digest.replace(':', '-')}.json"
+
+    def get(self, kind: str, digest: str, max_age: float | None = None) -> Any:
+        if self.directory is None:
+            return None
+        path = self._path(kind, digest)
+        try:
+            if max_age is not None and time.time() - path.stat().st_mtime > max_age:
+                return None
+            return json.loads(path.read_text())
+        except FileNotFoundError:
+            return None
+        except OSError, ValueError:
+            LOGGER.warning("Ignoring unreadable cache entry %s", path, exc_info=True)
+            return None
+
+    def put(self, kind: str, digest: str, value: Any) -> None:
+        if self.directory is None:
+            return
+        path = self._path(kind, digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, suffix=".tmp", delete=False) as f:
+            json.dump(value, f)
+        Path(f.name).replace(path)
+
+
+def skopeo_inspect_config(reference: str) -> dict[str, Any]:
+    output = subprocess.check_output(
+        ["skopeo", "inspect", "--config", f"docker://{reference}"], text=True, timeout=REQUEST_TIMEOUT_SECONDS * 4
+    )
+    return json.loads(output)
+
+
+class QuayClient:
+    def __init__(
+        self,
+        cache: DigestCache,
+        *,
+        base_url: str = QUAY_URL,
+        session: requests.Session | None = None,
+        inspect_config: Callable[[str], dict[str, Any]] = skopeo_inspect_config,
+        report_max_age: float = REPORT_MAX_AGE_SECONDS,
+    ) -> None:
+        self.cache = cache
+        self.base_url = base_url.rstrip("/")
+        self.session = session or requests.Session()
+        self.inspect_config = inspect_config
+        self.report_max_age = report_max_age
+
+    def _get(self, path: str, **params: str | int) -> Any:
+        response = self.session.get(f"{self.base_url}{path}", params=params, timeout=REQUEST_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.json()
+
+    def build_name(self, reference: str) -> str:
+        """The ``OPENSHIFT_BUILD_NAME`` of a digest-pinned image, without the ``-amd64`` suffix."""
+        digest = reference.partition("@")[2]
+        if digest and (cached := self.cache.get("build-name", digest)) is not None:
+            return cached
+        config = self.inspect_config(reference)
+        env = (config.get("config") or {}).get("Env") or []
+        build_name = next(e.split("=", 1)[1] for e in env if e.startswith("OPENSHIFT_BUILD_NAME="))
+        build_name = build_name.replace("-amd64", "")
+        if digest:
+            self.cache.put("build-name", digest, build_name)
+        return build_name
+
+    def tags(self, repository: str, name_filter: str) -> dict[str, str]:
+        """Active tags of ``repository`` whose name contains ``name_filter``, mapped to their manifest digest."""
+        tags: dict[str, str] = {}
+        page = 1
+        while True:
+            data = self._get(
+                f"/api/v1/repository/{repository}/tag/",
+                filter_tag_name=f"like:{name_filter}",
+                onlyActiveTags="true",
+                limit=TAGS_PAGE_SIZE,
+                page=page,
+            )
+            tags.update((tag["name"], tag["manifest_digest"]) for tag in data.get("tags") or [])
+            if not data.get("has_additional"):
+                return tags
+            page += 1
+
+    def severity_counts(self, repository: str, digest: str) -> dict[str, int]:
+        if (cached := self.cache.get("security", digest, max_age=self.report_max_age)) is not None:
+            return cached
+        data = self._get(f"/api/v1/repository/{repository}/manifest/{digest}/security")
+        if data.get("status") != "scanned" or not data.get("data"):
+            raise ReportNotReadyError(repository, digest, data.get("status"))
+        counts = Counter(
+            vulnerability.get("Severity", "Unknown")
+            for feature in data["data"]["Layer"]["Features"]
+            for vulnerability in feature["Vulnerabilities"]
+        )
+        self.cache.put("security", digest, dict(counts))
+        return dict(counts)
+
+
+def process_image(client: QuayClient, image: str, reference: str, branch: Branch) -> ScanResult | None:
+    registry = reference.split("@", maxsplit=1)[0]
+    repository = registry.split("/", 1)[1]
+
+    src_tag = client.build_name(reference)
+    regex = re.compile(branch.tag_regex(src_tag))
+    tags = client.tags(repository, src_tag)
+    matching = sorted(tag for tag in tags if regex.search(tag))
+    if not matching:
+        LOGGER.warning("No tag of %s matches %s, keeping %s", image, regex.pattern, reference)
+        return None
+    latest_tag = matching[0]
+    digest = tags[latest_tag]
+
+    try:
+        severity_counts = client.severity_counts(repository, digest)
+    except ReportNotReadyError as e:
+        LOGGER.error("%s, keeping %s", e, reference)
+        return ScanResult(
+            image=image,
+            tag=latest_tag,
+            reference=reference,
+            digest=digest,
+            severity_counts={},
+            error=f"no vulnerability report: {e.status}",
+        )
+    return ScanResult(
+        image=image,
+        tag=latest_tag,
+        reference=f"{registry}@{digest}",
+        digest=digest,
+        severity_counts=severity_counts,
     )
-    src_tag = subprocess.check_output(src_tag_cmd, shell=True, text=True).strip().strip('"').replace("-amd64", "")
-    regex = ""
-
-    if release_version_n == "":
-        regex = f"^{src_tag}-(\\d+-)?{hash_n}$"
-    else:
-        regex = f"^{src_tag}-{release_version_n}-\\d+-{hash_n}$"
-
-    latest_tag_cmd = f"skopeo inspect docker://{img} | jq -r --arg regex \"{regex}\" '.RepoTags | map(select(. | test($regex))) | .[0]'"
-    latest_tag = subprocess.check_output(latest_tag_cmd, shell=True, text=True).strip()
-    digest_cmd = f"skopeo inspect docker://{registry}:{latest_tag} | jq .Digest | tr -d '\"'"
-    digest = subprocess.check_output(digest_cmd, shell=True, text=True).strip()
-    if digest is None or digest == "":
-        return
-
-    output = f"{registry}@{digest}"
-
-    sha_ = output.split(":")[1]
-
-    url = f"https://quay.io/api/v1/repository/opendatahub/workbench-images/manifest/sha256:{sha_}/security"
-
-    response = requests.get(url, timeout=30)
-    data = response.json()
-
-    vulnerabilities = []
-
-    for feature in data["data"]["Layer"]["Features"]:
-        if len(feature["Vulnerabilities"]) > 0:
-            for vulnerability in feature["Vulnerabilities"]:
-                vulnerabilities.append(vulnerability)  # ruff: ignore[manual-list-copy] Use `list` or `list.copy` to create a copy of a list
-
-    severity_levels = [entry.get("Severity", "Unknown") for entry in vulnerabilities]
-    severity_counts = Counter(severity_levels)
-
-    branch_dictionary[latest_tag] = {}
-    branch_dictionary[latest_tag]["sha"] = digest
-
-    for severity, count in severity_counts.items():
-        branch_dictionary[latest_tag][severity] = count
-
-    for line in fileinput.input(commit_id_path, inplace=True):
-        if line.startswith(f"{image}="):
-            line = f"{image}={output}\n"
-        print(line, end="")
-
-
-today = date.today()
-d2 = today.strftime("%B %d, %Y")
-
-LATEST_MAIN_COMMIT = os.environ["LATEST_MAIN_COMMIT"]
-
-for _i, image in enumerate(IMAGES_MAIN):
-    process_image(image, commit_id_path, "", LATEST_MAIN_COMMIT)
-
-branch_main_data = generate_markdown_table(branch_dictionary)
-branch_dictionary = {}
-
-RELEASE_VERSION_N = os.environ["RELEASE_VERSION_N"]
-HASH_N = os.environ["HASH_N"]
-
-for _i, image in enumerate(IMAGES):
-    process_image(image, commit_id_path, RELEASE_VERSION_N, HASH_N)
-
-branch_n_data = generate_markdown_table(branch_dictionary)
-branch_dictionary = {}
 
-RELEASE_VERSION_N_1 = os.environ["RELEASE_VERSION_N_1"]
-HASH_N_1 = os.environ["HASH_N_1"]
 
-for _i, image in enumerate(IMAGES_N_1):
-    process_image(image, commit_id_path, RELEASE_VERSION_N_1, HASH_N_1)
+def scan(
+    client: QuayClient, branches: Sequence[Branch], pins: Mapping[str, str], max_workers: int = MAX_WORKERS
+) -> dict[str, list[ScanResult]]:
+    """Process the images of all branches concurrently; returns the results per branch title, in image order."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            branch.title: [
+                executor.submit(process_image, client, image, pins[image], branch) for image in branch.images
+            ]
+            for branch in branches
+        }
+        return {
+            title: [result for future in branch_futures if (result := future.result()) is not None]
+            for title, branch_futures in futures.items()
+        }
+
+
+def read_env_file(path: str | Path) -> dict[str, str]:
+    entries = {}
+    for line in Path(path).read_text().splitlines():
+        key, sep, value = line.partition("=")
+        if sep and not line.lstrip().startswith("#"):
+            entries[key.strip()] = value.strip()
+    return entries
+
+
+def update_env_file(path: str | Path, updates: Mapping[str, str]) -> None:
+    """Replace the values of ``updates`` in the env file with a single atomic rewrite."""
+    path = Path(path)
+    lines = []
+    for line in path.read_text().splitlines(keepends=True):
+        key = line.partition("=")[0]
+        if key in updates:
+            line = f"{key}={updates[key]}\n"
+        lines.append(line)
+    with tempfile.NamedTemporaryFile("w", dir=path.parent, prefix=f".{path.name}.", delete=False) as f:
+        f.writelines(lines)
+    os.chmod(f.name, path.stat().st_mode)
+    Path(f.name).replace(path)
+
+
+def generate_markdown_table(results: Sequence[ScanResult]) -> str:
+    markdown_data = ""
+    for result in {result.tag: result for result in results}.values():
+        markdown_data += f"| [{result.tag}](https://quay.io/repository/opendatahub/workbench-images/manifest/{result.digest}?tab=vulnerabilities) |"
+        if result.error is not None:
+            markdown_data += f" {result.error} |" + " - |" * (len(SEVERITIES) - 1) + "\n"
+            continue
+        for severity in SEVERITIES:
+            markdown_data += f" {result.severity_counts.get(severity, 0)} |"
+        markdown_data += "\n"
+    return markdown_data
 
-branch_n_1_data = generate_markdown_table(branch_dictionary)
 
-markdown_content = """# Security Scan Results
+MARKDOWN_TEMPLATE = """# Security Scan Results
 
 Date: {todays_date}
 
@@ -170,10 +352,46 @@ Date: {todays_date}
 {branch_n_1}
 """
 
-final_markdown = markdown_content.format(
-    branch_n=branch_n_data, todays_date=d2, branch_n_1=branch_n_1_data, branch_main=branch_main_data
-)
 
-# Writing to the markdown file
-with open("ci/security-scan/security_scan_results.md", "w") as markdown_file:
-    markdown_file.write(final_markdown)
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--env-file", default=COMMIT_ID_PATH, help="Env file with the pinned images to update")
+    parser.add_argument("--output", default=RESULTS_PATH, help="Markdown report to write")
+    parser.add_argument("--quay-url", default=QUAY_URL)
+    parser.add_argument("--max-workers", type=int, default=MAX_WORKERS)
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get(CACHE_DIR_ENV, str(DEFAULT_CACHE_DIR)),
+        help=f"Digest cache directory, empty to disable (default: ${CACHE_DIR_ENV} or %(default)s)",
+    )
+    parser.add_argument("--report-max-age", type=float, default=REPORT_MAX_AGE_SECONDS, help="Seconds")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    branches = [
+        Branch("main", IMAGES_MAIN, "", os.environ["LATEST_MAIN_COMMIT"]),
+        Branch("N", IMAGES, os.environ["RELEASE_VERSION_N"], os.environ["HASH_N"]),
+        Branch("N - 1", IMAGES_N_1, os.environ["RELEASE_VERSION_N_1"], os.environ["HASH_N_1"]),
+    ]
+    client = QuayClient(
+        DigestCache(Path(args.cache_dir) if args.cache_dir else None),
+        base_url=args.quay_url,
+        inspect_config=skopeo_inspect_config,
+        report_max_age=args.report_max_age,
+    )
+    results = scan(client, branches, read_env_file(args.env_file), max_workers=args.max_workers)
+
+    update_env_file(args.env_file, {r.image: r.reference for branch in results.values() for r in branch})
+
+    final_markdown = MARKDOWN_TEMPLATE.format(
+        todays_date=date.today().strftime("%B %d, %Y"),
+        branch_main=generate_markdown_table(results["main"]),
+        branch_n=generate_markdown_table(results["N"]),
+        branch_n_1=generate_markdown_table(results["N - 1"]),
+    )
+    Path(args.output).write_text(final_markdown)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
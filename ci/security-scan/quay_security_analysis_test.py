@@ -0,0 +1,244 @@
+"""Tests for quay_security_analysis against a local HTTP stand-in for the Quay API."""
+
+from __future__ import annotations
+
+import http.server
+import json
+import threading
+import time
+import urllib.parse
+from typing import TYPE_CHECKING, Any
+
+import pytest
+import quay_security_analysis as qsa
+
+if TYPE_CHECKING:
+    import pathlib
+    from collections.abc import Generator
+
+REPOSITORY = "opendatahub/workbench-images"
+
+
+def security_report(*severities: str) -> dict[str, Any]:
+    return {
+        "status": "scanned",
+        "data": {
+            "Layer": {
+                "Features": [
+                    {"Name": "openssl", "Vulnerabilities": [{"Severity": s} for s in severities]},
+                    {"Name": "bash", "Vulnerabilities": []},
+                ]
+            }
+        },
+    }
+
+
+class FakeQuay(http.server.ThreadingHTTPServer):
+    """Serves the tag and manifest security endpoints from in-memory data, recording requests."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FakeQuayHandler)
+        self.tags: dict[str, str] = {}
+        self.reports: dict[str, dict[str, Any]] = {}
+        self.requests: list[str] = []
+        self.delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeQuayHandler(http.server.BaseHTTPRequestHandler):
+    server: FakeQuay
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        with self.server.lock:
+            self.server.requests.append(url.path)
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            time.sleep(self.server.delay)
+            if url.path == f"/api/v1/repository/{REPOSITORY}/tag/":
+                name_filter = query["filter_tag_name"][0].removeprefix("like:")
+                tags = [
+                    {"name": name, "manifest_digest": digest}
+                    for name, digest in self.server.tags.items()
+                    if name_filter in name
+                ]
+                page, limit = int(query["page"][0]), int(query["limit"][0])
+                body = {"tags": tags[(page - 1) * limit : page * limit], "has_additional": page * limit < len(tags)}
+            elif url.path.endswith("/security"):
+                digest = url.path.split("/")[-2]
+                body = self.server.reports[digest]
+            else:
+                self.send_error(404)
+                return
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def quay() -> Generator[FakeQuay]:
+    server = FakeQuay()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def inspect_config(reference: str) -> dict[str, Any]:
+    """Stand-in for skopeo: the build name is the part of the digest after ``sha256:old-``."""
+    name = reference.partition("@sha256:old-")[2]
+    return {"config": {"Env": ["PATH=/usr/bin", f"OPENSHIFT_BUILD_NAME={name}-amd64"]}}
+
+
+def pin(name: str) -> str:
+    return f"quay.io/{REPOSITORY}@sha256:old-{name}"
+
+
+def client(quay: FakeQuay, tmp_path: pathlib.Path, **kwargs: Any) -> qsa.QuayClient:
+    return qsa.QuayClient(
+        qsa.DigestCache(tmp_path / "cache"), base_url=quay.url, inspect_config=inspect_config, **kwargs
+    )
+
+
+def test_scan_updates_pins_and_counts_severities(
+    quay: FakeQuay, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # more matching tags than fit on one page
+    monkeypatch.setattr(qsa, "TAGS_PAGE_SIZE", 2)
+    quay.tags = {
+        "jupyter-minimal-2025a-3-abc1234": "sha256:new-minimal",
+        "jupyter-minimal-2025a-3-fff0000": "sha256:other",
+        "jupyter-minimal-2025a-4-abc1234": "sha256:newer-minimal",
+        "codeserver-2025a-1-abc1234": "sha256:new-codeserver",
+    }
+    quay.reports = {
+        "sha256:new-minimal": security_report("High", "High", "Low"),
+        "sha256:new-codeserver": security_report(),
+    }
+    env_file = tmp_path / "weekly_commit_ids.env"
+    env_file.write_text(f"minimal-n={pin('jupyter-minimal')}\n# comment\ncodeserver-n={pin('codeserver')}\nother=x\n")
+    branch = qsa.Branch("N", ["minimal-n", "codeserver-n"], "2025a", "abc1234")
+
+    results = qsa.scan(client(quay, tmp_path), [branch], qsa.read_env_file(env_file))
+    qsa.update_env_file(env_file, {r.image: r.reference for r in results["N"]})
+
+    minimal, codeserver = results["N"]
+    # the lexically first matching tag wins, as with the previous `jq '.[0]'`
+    assert minimal.tag == "jupyter-minimal-2025a-3-abc1234"
+    assert minimal.severity_counts == {"High": 2, "Low": 1}
+    assert codeserver.severity_counts == {}
+    assert env_file.read_text() == (
+        f"minimal-n=quay.io/{REPOSITORY}@sha256:new-minimal\n# comment\n"
+        f"codeserver-n=quay.io/{REPOSITORY}@sha256:new-codeserver\nother=x\n"
+    )
+    table = qsa.generate_markdown_table(results["N"])
+    assert "| [jupyter-minimal-2025a-3-abc1234](" in table
+    assert "sha256:new-minimal?tab=vulnerabilities) | 0 | 1 | 0 | 2 | 0 |" in table
+
+
+def test_reports_and_build_names_are_cached_by_digest(quay: FakeQuay, tmp_path: pathlib.Path) -> None:
+    quay.tags = {"minimal-1-abc1234": "sha256:new"}
+    quay.reports = {"sha256:new": security_report("Medium")}
+    branch = qsa.Branch("main", ["img"], "", "abc1234")
+    pins = {"img": pin("minimal")}
+    inspected: list[str] = []
+
+    def counting_inspect(reference: str) -> dict[str, Any]:
+        inspected.append(reference)
+        return inspect_config(reference)
+
+    for _ in range(2):
+        quay_client = client(quay, tmp_path)
+        quay_client.inspect_config = counting_inspect
+        assert qsa.scan(quay_client, [branch], pins)["main"][0].severity_counts == {"Medium": 1}
+
+    assert inspected == [pins["img"]]
+    assert sum(path.endswith("/security") for path in quay.requests) == 1
+
+    # an expired report is fetched again
+    qsa.scan(client(quay, tmp_path, report_max_age=-1), [branch], pins)
+    assert sum(path.endswith("/security") for path in quay.requests) == 2
+
+
+def test_unscanned_report_is_an_error_and_not_cached(quay: FakeQuay, tmp_path: pathlib.Path) -> None:
+    quay.tags = {"minimal-1-abc1234": "sha256:new", "other-1-abc1234": "sha256:other"}
+    quay.reports = {"sha256:new": {"status": "queued", "data": None}, "sha256:other": security_report("Low")}
+    branch = qsa.Branch("main", ["img", "other"], "", "abc1234")
+
+    unscanned, other = qsa.scan(client(quay, tmp_path), [branch], {"img": pin("minimal"), "other": pin("other")})[
+        "main"
+    ]
+
+    # the other images are still scanned, and the unscanned one keeps its pin
+    assert unscanned.error == "no vulnerability report: queued"
+    assert unscanned.reference == pin("minimal")
+    assert other.error is None
+    assert other.severity_counts == {"Low": 1}
+    assert "| [minimal-1-abc1234](" in qsa.generate_markdown_table([unscanned])
+    assert "no vulnerability report: queued | - | - | - | - |" in qsa.generate_markdown_table([unscanned])
+    assert [path.name for path in (tmp_path / "cache" / "security").iterdir()] == ["sha256-other.json"]
+
+
+def test_images_are_processed_concurrently(quay: FakeQuay, tmp_path: pathlib.Path) -> None:
+    images = [f"image{i}" for i in range(6)]
+    quay.tags = {f"image{i}-1-abc1234": f"sha256:new{i}" for i in range(6)}
+    quay.reports = {f"sha256:new{i}": security_report() for i in range(6)}
+    quay.delay = 0.1
+    branch = qsa.Branch("main", images, "", "abc1234")
+
+    results = qsa.scan(client(quay, tmp_path), [branch], {i: pin(i) for i in images}, max_workers=3)
+
+    assert [r.image for r in results["main"]] == images
+    assert quay.max_in_flight == 3
+
+
+def test_main_rewrites_env_file_once(quay: FakeQuay, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    quay.tags = {"minimal-1-abc1234": "sha256:new"}
+    quay.reports = {"sha256:new": security_report("Critical")}
+    env_file = tmp_path / "weekly_commit_ids.env"
+    env_file.write_text(f"{qsa.IMAGES_MAIN[0]}={pin('minimal')}\n")
+    output = tmp_path / "results.md"
+    for name, value in {
+        "LATEST_MAIN_COMMIT": "abc1234",
+        "RELEASE_VERSION_N": "2025a",
+        "HASH_N": "none",
+        "RELEASE_VERSION_N_1": "2024b",
+        "HASH_N_1": "none",
+    }.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr(qsa, "IMAGES_MAIN", qsa.IMAGES_MAIN[:1])
+    monkeypatch.setattr(qsa, "IMAGES", [])
+    monkeypatch.setattr(qsa, "IMAGES_N_1", [])
+    monkeypatch.setattr(qsa, "skopeo_inspect_config", inspect_config)
+    writes: list[object] = []
+    update_env_file = qsa.update_env_file
+    monkeypatch.setattr(qsa, "update_env_file", lambda *args: writes.append(args) or update_env_file(*args))
+
+    assert (
+        qsa.main(["--env-file", str(env_file), "--output", str(output), "--quay-url", quay.url, "--cache-dir", ""]) == 0
+    )
+
+    assert len(writes) == 1
+    assert env_file.read_text() == f"{qsa.IMAGES_MAIN[0]}=quay.io/{REPOSITORY}@sha256:new\n"
+    assert "[minimal-1-abc1234]" in output.read_text()
+    assert "| 0 | 0 | 0 | 0 | 1 |" in output.read_text()
@@ -9,8 +9,9 @@ for f in "${SCRIPT_DIR}"/utils/*.sh; do
   [[ -f "$f" ]] && source "$f"
 done
 
-# Start nginx and httpd
+# Start nginx, the culler's /api/kernels/ endpoint, and httpd (its CGI fallback)
 run-nginx.sh &
+python3 "${SCRIPT_DIR}/kernels-api.py" &
 /usr/sbin/httpd -D FOREGROUND &
 
 # Add .bashrc for custom prompt if not present
@@ -97,25 +98,8 @@ create_dir_and_file "$universal_dir" "$user_settings_filepath" "$universal_json_
 create_dir_and_file "$vscode_dir" "$settings_filepath" "$json_settings"
 create_dir_and_file "$vscode_dir" "$launch_filepath" "$json_launch_settings"
 
-# Ensure the extensions directory exists
-extensions_dir="${CODE_SERVER_DATA_DIR}/extensions"
-mkdir -p "$extensions_dir"
-
-# Copy installed extensions to the runtime extensions directory if they do not already exist
-if [ -d "/opt/app-root/extensions-temp" ]; then
-  for extension in /opt/app-root/extensions-temp/*/;
-  do
-    extension_folder=$(basename "$extension")
-    if [ ! -d "$extensions_dir/$extension_folder" ]; then
-      cp -r "$extension" "$extensions_dir"
-      echo "Debug: Extension '$extension_folder' copied to runtime directory."
-    else
-      echo "Debug: Extension '$extension_folder' already exists in runtime directory, skipping."
-    fi
-  done
-else
-  echo "Debug: Temporary extensions directory not found."
-fi
+# Link the extensions installed in the image into the runtime extensions directory (see utils/extensions.sh)
+provision_extensions /opt/app-root/extensions-temp "${CODE_SERVER_DATA_DIR}/extensions"
 
 # Ensure log directory exists
 logs_dir="${CODE_SERVER_DATA_DIR}/coder-logs"
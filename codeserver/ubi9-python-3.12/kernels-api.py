@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Jupyter-compatible /api/kernels/ endpoint for the notebook controller culler.
+
+Serves the same single synthetic kernel record as ``nginx/api/kernels/access.cgi``, but from a
+long-lived process: a poll costs no fork/exec, and code-server's ``/healthz`` is fetched at most
+once per ``--ttl`` seconds no matter how many polls arrive. nginx proxies ``/api/kernels/`` here
+and falls back to the httpd CGI while this server is not listening.
+
+Runs on the image's Python, so it has to stay stdlib-only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import http.server
+import json
+import sys
+import threading
+import time
+import urllib.request
+
+HEALTHZ_URL = "http://127.0.0.1:8787/healthz"
+HEALTHZ_TIMEOUT = 5
+# polls within this many seconds share one /healthz fetch
+HEALTHZ_TTL = 1.0
+PORT = 8081
+
+# code-server uses alive/expired; the culler expects busy/idle (Jupyter kernel terms)
+EXECUTION_STATES = {"alive": "busy", "expired": "idle"}
+
+
+class HeartbeatCache:
+    """The last ``/healthz`` response, refreshed when older than ``ttl`` seconds.
+
+    A failed fetch is cached as ``{}`` as well, so that a hanging code-server is asked once per
+    ``ttl`` and not once per poll. Concurrent polls of a stale cache wait for a single fetch.
+    """
+
+    def __init__(self, url: str = HEALTHZ_URL, ttl: float = HEALTHZ_TTL, timeout: float = HEALTHZ_TIMEOUT) -> None:
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._healthz: dict = {}
+        self._fetched_at: float | None = None
+
+    def get(self) -> dict:
+        with self._lock:
+            if self._fetched_at is None or time.monotonic() - self._fetched_at >= self.ttl:
+                self._healthz = self._fetch()
+                self._fetched_at = time.monotonic()
+            return self._healthz
+
+    def _fetch(self) -> dict:
+        # Example: {"status":"alive","lastHeartbeat":1742345025123}
+        try:
+            with urllib.request.urlopen(self.url, timeout=self.timeout) as response:  # ruff: ignore[suspicious-url-open-usage]
+                healthz = json.load(response)
+        except OSError as e:
+            print(f"kernels-api: healthz fetch failed ({self.url}): {e}", file=sys.stderr)
+            return {}
+        except ValueError as e:
+            print(f"kernels-api: healthz returned invalid JSON ({self.url}): {e}", file=sys.stderr)
+            return {}
+        return healthz if isinstance(healthz, dict) else {}
+
+
+def kernels(healthz: dict, now: float | None = None) -> list[dict]:
+    """The synthetic kernel list for a ``/healthz`` response, as ``access.cgi`` builds it.
+
+    >>> [k["execution_state"] for k in kernels({"status": "expired"}) + kernels({"status": "unknown"}) + kernels({})]
+    ['idle', 'busy', 'busy']
+    """
+    # On a fresh pod, code-server reports lastHeartbeat=0 until the first user interaction;
+    # that would mislead the culler, so the current time is used instead (like access.cgi does).
+    last_heartbeat_ms = healthz.get("lastHeartbeat")
+    if isinstance(last_heartbeat_ms, int) and last_heartbeat_ms > 0:
+        timestamp = last_heartbeat_ms // 1000
+    else:
+        timestamp = time.time() if now is None else now
+    last_activity = datetime.datetime.fromtimestamp(timestamp).astimezone().isoformat(timespec="seconds")
+    # default to busy, which is safe: it prevents premature culling when the state is unknown
+    execution_state = EXECUTION_STATES.get(healthz.get("status"), "busy")
+    return [
+        {
+            "id": "code-server",
+            "name": "code-server",
+            "last_activity": last_activity,
+            "execution_state": execution_state,
+            "connections": 1,
+        }
+    ]
+
+
+class KernelsApiHandler(http.server.BaseHTTPRequestHandler):
+    server: KernelsApiServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if not self.path.startswith("/api/kernels/"):
+            self.send_error(404)
+            return
+        body = json.dumps(kernels(self.server.heartbeat.get()), separators=(",", ":")).encode() + b"\n"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        # every culler poll would be logged, nginx does not log this location either
+        pass
+
+
+class KernelsApiServer(http.server.ThreadingHTTPServer):
+    # the default backlog of 5 drops connections of concurrent polls, which then wait for a SYN retransmit
+    request_queue_size = 128
+
+    def __init__(self, address: tuple[str, int], heartbeat: HeartbeatCache) -> None:
+        super().__init__(address, KernelsApiHandler)
+        self.heartbeat = heartbeat
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--healthz-url", default=HEALTHZ_URL)
+    parser.add_argument("--ttl", type=float, default=HEALTHZ_TTL, help="seconds a /healthz response is reused")
+    args = parser.parse_args(argv)
+
+    server = KernelsApiServer(("127.0.0.1", args.port), HeartbeatCache(args.healthz_url, args.ttl))
+    with server:
+        server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env bash
+
+# Provision the extensions installed in the image into the user's extensions directory.
+#
+# The image's extensions are symlinked instead of copied, so a first start on a fresh PVC writes
+# a few links rather than hundreds of MB. Whatever the user installs or updates is materialized
+# by code-server as a real directory next to the links and is never touched here.
+#
+# Extension folders are named <publisher>.<name>-<version>. After an image upgrade, the links to
+# the previous versions dangle, so they are removed and the new versions are linked instead.
+# The manifest lists the image extensions the directory was last provisioned from. When it is
+# unchanged, a warm start does nothing, and extensions the user uninstalled stay uninstalled.
+function provision_extensions() {
+    local image_dir=$1
+    local extensions_dir=$2
+    local manifest="${extensions_dir}/.image-extensions"
+
+    if [ ! -d "$image_dir" ]; then
+        echo "Debug: Image extensions directory '$image_dir' not found."
+        return 0
+    fi
+    mkdir -p "$extensions_dir"
+
+    local extension names=()
+    for extension in "$image_dir"/*/; do
+        [ -d "$extension" ] || continue
+        extension=${extension%/}
+        names+=("${extension##*/}")
+    done
+    local current
+    current=$(printf '%s\n' "${names[@]}")
+    if [ -f "$manifest" ] && [ "$(< "$manifest")" = "$current" ]; then
+        echo "Debug: Extensions are up to date with the image."
+        return 0
+    fi
+
+    local -A provisioned=()
+    if [ -f "$manifest" ]; then
+        while IFS= read -r extension; do
+            provisioned[$extension]=1
+        done < "$manifest"
+    fi
+
+    local link
+    for link in "$extensions_dir"/*; do
+        if [ -L "$link" ] && [ ! -e "$link" ] && [[ $(readlink "$link") == "$image_dir"/* ]]; then
+            rm -f "$link"
+            echo "Debug: Extension '${link##*/}' of a previous image removed."
+        fi
+    done
+
+    for extension in "${names[@]}"; do
+        if [ -e "$extensions_dir/$extension" ] || [ -L "$extensions_dir/$extension" ]; then
+            echo "Debug: Extension '$extension' already exists in runtime directory, skipping."
+        elif [ -n "${provisioned[$extension]:-}" ]; then
+            echo "Debug: Extension '$extension' was uninstalled by the user, skipping."
+        else
+            ln -s "$image_dir/$extension" "$extensions_dir/$extension"
+            echo "Debug: Extension '$extension' linked into runtime directory."
+        fi
+    done
+
+    printf '%s\n' "$current" > "$manifest"
+}
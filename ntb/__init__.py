@@ -4,6 +4,6 @@ from __future__ import annotations
 
 from .asserts import assert_subdict
 from .constants import ROOT_DIR
-from .strings import blockinfile, process_template_with_indents
+from .strings import blockinfile, process_template_with_indents, replace_block
 
-__all__ = ["ROOT_DIR", "assert_subdict", "blockinfile", "process_template_with_indents"]
+__all__ = ["ROOT_DIR", "assert_subdict", "blockinfile", "process_template_with_indents", "replace_block"]
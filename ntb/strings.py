@@ -91,51 +91,67 @@ class TestProcessTemplateWithIndents:
                 assert process_template_with_indents(inp) == expected
 
 
-def blockinfile(
-    filename: str | PathLike,
+def replace_block(
+    lines: list[str],
     contents: str,
     prefix: str | None = None,
     *,
     comment: str = "#",
-) -> None:
-    """This is similar to the functions in
-    * https://homely.readthedocs.io/en/latest/ref/files.html#homely-files-blockinfile-1
-    * ansible.modules.lineinfile
+    source: str | PathLike = "<string>",
+) -> list[str]:
+    """Return ``lines`` with the block between the BEGIN and END markers replaced by ``contents``.
+
+    ``lines`` are returned unchanged when there is no block; ``source`` is only used in error messages.
+
+    >>> replace_block(["a\\n", "### BEGIN x\\n", "old\\n", "### END x\\n"], "new", "x")
+    ['a\\n', '### BEGIN x\\n', 'new', '\\n### END x\\n']
     """
     begin_marker = f"{comment * 3} BEGIN{' ' + prefix if prefix else ''}"
     end_marker = f"{comment * 3} END{' ' + prefix if prefix else ''}"
 
     begin = end = -1
-    try:
-        with open(filename, "rt") as fp:
-            original_lines = fp.readlines()
-    except OSError as e:
-        raise RuntimeError(f"Failed to read {filename}: {e}") from e
-    for line_no, line in enumerate(original_lines):
+    for line_no, line in enumerate(lines):
         if line.rstrip() == begin_marker:
             begin = line_no
         elif line.rstrip() == end_marker:
             end = line_no
 
     if begin != -1 and end == -1:
-        raise ValueError(f"Found begin marker but no matching end marker in {filename}")
+        raise ValueError(f"Found begin marker but no matching end marker in {source}")
     if begin == -1 and end != -1:
-        raise ValueError(f"Found end marker but no matching begin marker in {filename}")
+        raise ValueError(f"Found end marker but no matching begin marker in {source}")
     if begin > end:
-        raise ValueError(f"Begin marker appears after end marker in {filename}")
+        raise ValueError(f"Begin marker appears after end marker in {source}")
 
-    lines = original_lines[:]
+    if begin == end == -1:
+        # no markers found
+        return lines
     # NOTE: textwrap.dedent() with raw strings leaves leading and trailing newline
     #       we want to preserve the trailing one because HEREDOC has to have an empty trailing line for hadolint
     new_contents = contents.lstrip("\n").splitlines(keepends=True)
     if new_contents and new_contents[-1] == "\n":
         new_contents = new_contents[:-1]
-    if begin == end == -1:
-        # no markers found
-        return
-    else:
-        lines[begin : end + 1] = [f"{begin_marker}\n", *new_contents, f"\n{end_marker}\n"]
+    return [*lines[:begin], f"{begin_marker}\n", *new_contents, f"\n{end_marker}\n", *lines[end + 1 :]]
+
+
+def blockinfile(
+    filename: str | PathLike,
+    contents: str,
+    prefix: str | None = None,
+    *,
+    comment: str = "#",
+) -> None:
+    """This is similar to the functions in
+    * https://homely.readthedocs.io/en/latest/ref/files.html#homely-files-blockinfile-1
+    * ansible.modules.lineinfile
+    """
+    try:
+        with open(filename, "rt") as fp:
+            original_lines = fp.readlines()
+    except OSError as e:
+        raise RuntimeError(f"Failed to read {filename}: {e}") from e
 
+    lines = replace_block(original_lines, contents, prefix, comment=comment, source=filename)
     if lines == original_lines:
         return
     with open(filename, "wt") as fp:
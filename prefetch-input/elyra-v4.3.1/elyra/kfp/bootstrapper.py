@@ -15,17 +15,25 @@
 #
 from abc import ABC
 from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 import glob
+import hashlib
+from importlib import metadata
 import json
 import logging
 import os
 from pathlib import Path
 import subprocess
 import sys
+import tarfile
 from tempfile import TemporaryFile
+import threading
 import time
 from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import Iterable
+from typing import List
 from typing import Optional
 from typing import Type
 from typing import TypeVar
@@ -55,6 +63,18 @@ enable_generic_node_script_output_to_s3 = (
 # This is useful in airgapped environments where the image
 # already contains the required packages.
 install_packages = os.getenv("ELYRA_INSTALL_PACKAGES", "true").lower() == "true"
+# Images that were verified at build time to satisfy requirements-elyra.txt can ship a stamp
+# file (see OpUtil.write_requirements_stamp) so that package installation is skipped without
+# inspecting the environment at all.
+requirements_stamp_file = os.getenv("ELYRA_REQUIREMENTS_STAMP", "/opt/app-root/etc/elyra-requirements.stamp")
+# Set it to true to log the full `pip freeze` after package installation.
+debug_package_install = os.getenv("ELYRA_DEBUG_PACKAGE_INSTALL", "false").lower() == "true"
+# Maximum number of concurrent object storage transfers (gets and puts) per operation.
+max_transfer_workers = max(1, int(os.getenv("ELYRA_COS_TRANSFER_WORKERS", "8")))
+# Files larger than this are uploaded as multipart uploads with parallel part transfers.
+multipart_threshold = int(os.getenv("ELYRA_COS_MULTIPART_THRESHOLD", str(64 * 1024 * 1024)))
+multipart_part_size = max(5 * 1024 * 1024, int(os.getenv("ELYRA_COS_MULTIPART_PART_SIZE", str(16 * 1024 * 1024))))
+multipart_parallel_uploads = max(1, int(os.getenv("ELYRA_COS_MULTIPART_PARALLEL_UPLOADS", "4")))
 
 pipeline_name = None  # global used in formatted logging
 operation_name = None  # global used in formatted logging
@@ -66,6 +86,9 @@ class FileOpBase(ABC):
     filepath = None
     cos_client = None
     cos_bucket = None
+    # Paths extracted from the dependency archive while process_dependencies() runs
+    _extracted_files = None
+    _extracted_files_lock = None
 
     @classmethod
     def get_instance(cls: Type[F], **kwargs: Any) -> F:
@@ -123,8 +146,9 @@ class FileOpBase(ABC):
     def process_dependencies(self) -> None:
         """Process dependencies
 
-        If a dependency archive is present, it will be downloaded from object storage
-        and expanded into the local directory.
+        If a dependency archive is present, it will be streamed from object storage
+        and expanded into the local directory, while the inputs are downloaded
+        concurrently.
 
         This method can be overridden by subclasses, although overrides should first
         call the superclass method.
@@ -133,15 +157,22 @@ class FileOpBase(ABC):
         t0 = time.time()
         archive_file = self.input_params.get("cos-dependencies-archive")
 
-        self.get_file_from_object_storage(archive_file)
-
         inputs = self.input_params.get("inputs")
-        if inputs:
-            input_list = inputs.split(INOUT_SEPARATOR)
-            for file in input_list:
-                self.get_file_from_object_storage(file.strip())
+        input_list = [file.strip() for file in inputs.split(INOUT_SEPARATOR)] if inputs else []
 
-        subprocess.call(["tar", "-zxvf", archive_file])
+        # Inputs are downloaded while the archive is being extracted.  As with the former
+        # download-then-`tar -zxvf` sequence, archive members take precedence over inputs
+        # with the same name.
+        self._extracted_files = set()
+        self._extracted_files_lock = threading.Lock()
+        try:
+            self.run_transfers(
+                [lambda: self.extract_archive_from_object_storage(archive_file)]
+                + [lambda file=file: self.get_file_from_object_storage(file) for file in input_list]
+            )
+        finally:
+            self._extracted_files = None
+            self._extracted_files_lock = None
         duration = time.time() - t0
         OpUtil.log_operation_info("dependencies processed", duration)
 
@@ -158,8 +189,10 @@ class FileOpBase(ABC):
         outputs = self.input_params.get("outputs")
         if outputs:
             output_list = outputs.split(INOUT_SEPARATOR)
+            files: List[str] = []
             for file in output_list:
-                self.process_output_file(file.strip())
+                files.extend(self.expand_output_file(file.strip()))
+            self.put_files_to_object_storage(files)
         duration = time.time() - t0
         OpUtil.log_operation_info("outputs processed", duration)
 
@@ -301,15 +334,59 @@ class FileOpBase(ABC):
 
         object_to_get = self.get_object_storage_filename(file_to_get)
         t0 = time.time()
-        self.cos_client.fget_object(bucket_name=self.cos_bucket, object_name=object_to_get, file_path=file_to_get)
+        if self._extracted_files_lock is None:
+            self.cos_client.fget_object(bucket_name=self.cos_bucket, object_name=object_to_get, file_path=file_to_get)
+        else:
+            # a dependency archive is being extracted concurrently: only move the download
+            # into place if the archive has not provided the same file
+            download_path = f"{file_to_get}.elyra-download"
+            self.cos_client.fget_object(bucket_name=self.cos_bucket, object_name=object_to_get, file_path=download_path)
+            with self._extracted_files_lock:
+                if os.path.normpath(file_to_get) in self._extracted_files:
+                    os.remove(download_path)
+                else:
+                    os.replace(download_path, file_to_get)
         duration = time.time() - t0
         OpUtil.log_operation_info(
             f"downloaded {file_to_get} from bucket: {self.cos_bucket}, object: {object_to_get}", duration
         )
 
+    def extract_archive_from_object_storage(self, archive_file: str) -> None:
+        """Utility function to expand a gzipped tar archive straight from the object stream
+
+        The archive is never written to local disk; members are extracted as they arrive.
+
+        :param archive_file: archive filename
+        """
+
+        object_to_get = self.get_object_storage_filename(archive_file)
+        t0 = time.time()
+        response = self.cos_client.get_object(bucket_name=self.cos_bucket, object_name=object_to_get)
+        try:
+            with tarfile.open(fileobj=response, mode="r|gz") as tar:
+                for member in tar:
+                    logger.debug(f"extracting {member.name}")
+                    if self._extracted_files_lock is not None:
+                        with self._extracted_files_lock:
+                            self._extracted_files.add(os.path.normpath(member.name))
+                    if hasattr(tarfile, "data_filter"):
+                        tar.extract(member, filter="data")
+                    else:  # Python without PEP 706 extraction filters
+                        tar.extract(member)
+        finally:
+            response.close()
+            response.release_conn()
+        duration = time.time() - t0
+        OpUtil.log_operation_info(
+            f"downloaded and extracted {archive_file} from bucket: {self.cos_bucket}, object: {object_to_get}", duration
+        )
+
     def put_file_to_object_storage(self, file_to_upload: str, object_name: Optional[str] = None) -> None:
         """Utility function to put files into an object storage
 
+        Files larger than ELYRA_COS_MULTIPART_THRESHOLD are uploaded as multipart
+        uploads whose parts are transferred in parallel.
+
         :param file_to_upload: filename
         :param object_name: remote filename (used to rename)
         """
@@ -319,30 +396,67 @@ class FileOpBase(ABC):
             object_to_upload = file_to_upload
 
         object_to_upload = self.get_object_storage_filename(object_to_upload)
+        multipart_args = {}
+        if os.path.getsize(file_to_upload) > multipart_threshold:
+            multipart_args = {"part_size": multipart_part_size, "num_parallel_uploads": multipart_parallel_uploads}
         t0 = time.time()
-        self.cos_client.fput_object(bucket_name=self.cos_bucket, object_name=object_to_upload, file_path=file_to_upload)
+        self.cos_client.fput_object(
+            bucket_name=self.cos_bucket, object_name=object_to_upload, file_path=file_to_upload, **multipart_args
+        )
         duration = time.time() - t0
         OpUtil.log_operation_info(
             f"uploaded {file_to_upload} to bucket: {self.cos_bucket} object: {object_to_upload}", duration
         )
 
+    def put_files_to_object_storage(self, files_to_upload: Iterable[str]) -> None:
+        """Utility function to put several files into an object storage concurrently
+
+        :param files_to_upload: filenames
+        """
+        self.run_transfers([lambda file=file: self.put_file_to_object_storage(file) for file in files_to_upload])
+
+    @staticmethod
+    def run_transfers(transfers: List[Callable[[], None]]) -> None:
+        """Run object storage transfers on a bounded thread pool
+
+        All transfers are attempted; the first failure (in submission order) is re-raised
+        once every transfer has finished.
+
+        :param transfers: callables performing one transfer each
+        """
+        if len(transfers) <= 1 or max_transfer_workers == 1:
+            for transfer in transfers:
+                transfer()
+            return
+        with ThreadPoolExecutor(max_workers=min(max_transfer_workers, len(transfers))) as executor:
+            futures = [executor.submit(transfer) for transfer in transfers]
+        for future in futures:
+            future.result()
+
     def has_wildcard(self, filename):
         wildcards = ["*", "?"]
         return bool(any(c in filename for c in wildcards))
 
-    def process_output_file(self, output_file):
-        """Puts the file to object storage.  Handles wildcards and directories."""
+    def expand_output_file(self, output_file: str) -> List[str]:
+        """Returns the files to upload for an output entry.  Handles wildcards and directories."""
 
         matched_files = [output_file]
         if self.has_wildcard(output_file):  # explode the wildcarded file
             matched_files = glob.glob(output_file)
 
+        files = []
         for matched_file in matched_files:
             if os.path.isdir(matched_file):
                 for file in os.listdir(matched_file):
-                    self.process_output_file(os.path.join(matched_file, file))
+                    files.extend(self.expand_output_file(os.path.join(matched_file, file)))
             else:
-                self.put_file_to_object_storage(matched_file)
+                files.append(matched_file)
+        return files
+
+    def process_output_file(self, output_file):
+        """Puts the file to object storage.  Handles wildcards and directories."""
+
+        self.put_files_to_object_storage(self.expand_output_file(output_file))
 
     def convert_param_str_to_dict(self, pipeline_parameters: Optional[str] = None) -> Dict[str, Any]:
         """Convert INOUT-separated string of pipeline parameters into a dictionary."""
@@ -589,7 +703,22 @@ class OpUtil(object):
         OpUtil.log_operation_info("Installing packages")
         t0 = time.time()
         requirements_file = cls.determine_elyra_requirements()
+
+        if cls.requirements_stamp_matches(requirements_file, requirements_stamp_file):
+            if user_volume_path:
+                os.environ["PIP_CONFIG_FILE"] = f"{user_volume_path}/pip.conf"
+            OpUtil.log_operation_info("Packages already installed (build-time stamp matches)", time.time() - t0)
+            return
+
         elyra_packages = cls.package_list_to_dict(requirements_file)
+        if not cls.unsatisfied_requirements(elyra_packages):
+            if user_volume_path:
+                os.environ["PIP_CONFIG_FILE"] = f"{user_volume_path}/pip.conf"
+            if debug_package_install:
+                subprocess.run([sys.executable, "-m", "pip", "freeze"])
+            OpUtil.log_operation_info("Packages already installed", time.time() - t0)
+            return
+
         current_packages = cls.package_list_to_dict("requirements-current.txt")
         to_install_list = []
 
@@ -633,10 +762,72 @@ class OpUtil(object):
         if user_volume_path:
             os.environ["PIP_CONFIG_FILE"] = f"{user_volume_path}/pip.conf"
 
-        subprocess.run([sys.executable, "-m", "pip", "freeze"])
+        if debug_package_install:
+            subprocess.run([sys.executable, "-m", "pip", "freeze"])
         duration = time.time() - t0
         OpUtil.log_operation_info("Packages installed", duration)
 
+    @classmethod
+    def unsatisfied_requirements(cls, elyra_packages: Dict[str, Optional[str]]) -> List[str]:
+        """Returns the pinned packages that are missing or older than their pin.
+
+        Checks the running interpreter's installed distributions in-process (no `pip freeze`)
+        and applies the same rules as the full install path: newer versions, editable installs
+        and non PEP-440 versions are accepted as they are.
+
+        :param elyra_packages: package name to pinned version, as returned by package_list_to_dict()
+        :return: the package names that need to be installed
+        """
+        unsatisfied = []
+        for package, ver in elyra_packages.items():
+            if ver is None:
+                continue
+            try:
+                installed = metadata.version(package)
+            except metadata.PackageNotFoundError:
+                unsatisfied.append(package)
+                continue
+            try:
+                if version.Version(ver) > version.Version(installed):
+                    unsatisfied.append(package)
+            except version.InvalidVersion:
+                continue  # the full install path skips these with a warning
+        return unsatisfied
+
+    @classmethod
+    def requirements_fingerprint(cls, requirements_file: str) -> str:
+        """Returns a fingerprint of a requirements file for the running interpreter"""
+        with open(requirements_file, "rb") as fh:
+            digest = hashlib.sha256(fh.read()).hexdigest()
+        return f"{digest} python{sys.version_info.major}.{sys.version_info.minor}"
+
+    @classmethod
+    def requirements_stamp_matches(cls, requirements_file: Optional[str], stamp_file: str) -> bool:
+        """Returns True if the stamp file was written for this exact requirements file"""
+        if not requirements_file or not os.path.isfile(stamp_file):
+            return False
+        try:
+            with open(stamp_file) as fh:
+                stamp = fh.read().strip()
+            return stamp == cls.requirements_fingerprint(requirements_file)
+        except OSError:
+            return False
+
+    @classmethod
+    def write_requirements_stamp(cls, requirements_file: str, stamp_file: str) -> None:
+        """Records at image build time that the environment satisfies a requirements file
+
+        :param requirements_file: the requirements-elyra.txt the image was verified against
+        :param stamp_file: where to write the stamp, see ELYRA_REQUIREMENTS_STAMP
+        :raises RuntimeError: if some pinned packages are missing or outdated
+        """
+        unsatisfied = cls.unsatisfied_requirements(cls.package_list_to_dict(requirements_file))
+        if unsatisfied:
+            raise RuntimeError(f"Environment does not satisfy {requirements_file}: {', '.join(sorted(unsatisfied))}")
+        os.makedirs(os.path.dirname(stamp_file) or ".", exist_ok=True)
+        with open(stamp_file, "w") as fh:
+            fh.write(cls.requirements_fingerprint(requirements_file) + "\n")
+
     @classmethod
     def determine_elyra_requirements(cls) -> Any:
         if sys.version_info.major == 3:
@@ -769,6 +960,10 @@ def main():
     logging.basicConfig(
         format="[%(levelname)1.1s %(asctime)s.%(msecs).03d] %(message)s", datefmt="%H:%M:%S", level=logging.DEBUG
     )
+    # Image build step: `python3 bootstrapper.py --write-requirements-stamp requirements-elyra.txt`
+    if len(sys.argv) == 3 and sys.argv[1] == "--write-requirements-stamp":
+        OpUtil.write_requirements_stamp(sys.argv[2], requirements_stamp_file)
+        return
     # Setup packages and gather arguments
     input_params = OpUtil.parse_arguments(sys.argv[1:])
     OpUtil.log_operation_info("starting operation")
@@ -83,6 +83,19 @@ def containarized_buildinputs(
     return stdout
 
 
+def _use_containerized_buildinputs() -> bool:
+    return "CI" in os.environ and os.environ["CI"] == "true"
+
+
+def ensure_local_buildinputs() -> None:
+    """Build bin/buildinputs if it is missing; CI runs the buildinputs image instead and needs no binary.
+
+    Callers that run buildinputs from several threads call this first, so that they do not all start the same build.
+    """
+    if not _use_containerized_buildinputs() and not (ROOT_DIR / "bin/buildinputs").exists():
+        subprocess.check_call([MAKE, "bin/buildinputs"], cwd=ROOT_DIR)
+
+
 def local_buildinputs(
     dockerfile: pathlib.Path | str,
     platform: Literal["linux/amd64", "linux/arm64", "linux/s390x", "linux/ppc64le"] = "linux/amd64",
@@ -107,7 +120,7 @@ def buildinputs(
     build_args: dict[str, str] | None = None,
 ) -> list[pathlib.Path]:
 
-    if "CI" in os.environ and os.environ["CI"] == "true":
+    if _use_containerized_buildinputs():
         stdout = containarized_buildinputs(dockerfile, platform, build_args)
     else:
         stdout = local_buildinputs(dockerfile, platform, build_args)
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Run syft on the repository and display results with source paths.
+"""Run syft on the repository or on an image and display results with source paths.
 
 Two modes:
   scan   — run syft, show each package with its location (optionally filter by name)
@@ -10,6 +10,14 @@ Options:
   --package, -p  filter results to packages matching this substring
   --type, -t     filter results to a specific ecosystem (npm, go-module, python, etc.)
   --json         output raw JSON instead of formatted text
+  --image        scan an image in a local OCI layout directory (PATH or PATH:TAG) instead of the repository
+  --platform     platform to pick from a multi-platform image (default linux/amd64)
+
+Images are scanned layer by layer. Each layer's result is cached under its digest in
+~/.cache/notebooks/syft-layers (SYFT_LAYER_CACHE_DIR overrides it, an empty value disables
+the cache). The image SBOM is then assembled from the layer results, with the overlay
+whiteouts applied. Images that share base layers therefore only pay for the layers that
+have not been scanned before. Use `skopeo copy docker://<image> oci:<dir>:<tag>` to get an OCI layout.
 
 Usage:
     ./uv run scripts/cve/syft_scan.py scan
@@ -17,6 +25,7 @@ Usage:
     ./uv run scripts/cve/syft_scan.py scan --no-config -p undici
     ./uv run scripts/cve/syft_scan.py report
     ./uv run scripts/cve/syft_scan.py report --no-config --type npm
+    ./uv run scripts/cve/syft_scan.py scan --image /tmp/minimal:latest -p openssl
 """
 
 from __future__ import annotations
@@ -27,12 +36,22 @@ import os
 import shutil
 import subprocess
 import sys
+import tarfile
 import tempfile
 from collections import defaultdict
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 
 from pydantic import BaseModel, ConfigDict, Field
 
+# overlay whiteouts, see https://github.com/opencontainers/image-spec/blob/main/layer.md#whiteouts
+WHITEOUT_PREFIX = ".wh."
+OPAQUE_WHITEOUT = ".wh..wh..opq"
+
+INDEX_MEDIA_TYPES = {
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+}
+
 
 class Location(BaseModel):
     model_config = ConfigDict(extra="allow")
@@ -53,6 +72,14 @@ class SyftOutput(BaseModel):
     artifacts: list[Artifact] = Field(default_factory=list)
 
 
+class LayerScan(BaseModel):
+    """Syft result for the content of a single layer, plus the paths the layer deletes from lower layers."""
+
+    artifacts: list[Artifact] = Field(default_factory=list)
+    whiteouts: list[str] = Field(default_factory=list)
+    opaque_dirs: list[str] = Field(default_factory=list)
+
+
 def find_repo_root() -> Path:
     """Walk up from this script to find the repo root (contains .git)."""
     current = Path(__file__).resolve().parent
@@ -63,8 +90,8 @@ def find_repo_root() -> Path:
     return Path.cwd()
 
 
-def run_syft(repo_root: Path, *, use_config: bool = True) -> SyftOutput:
-    """Run syft scan on the repo root and return parsed output."""
+def run_syft(repo_root: Path, *, use_config: bool = True, source: str | None = None) -> SyftOutput:
+    """Run syft scan on the repo root (or on ``source``) and return parsed output."""
     syft_bin = shutil.which("syft")
     if not syft_bin:
         print("Error: syft not found in PATH. Install from https://github.com/anchore/syft", file=sys.stderr)
@@ -84,7 +111,7 @@ def run_syft(repo_root: Path, *, use_config: bool = True) -> SyftOutput:
     cmd = [
         syft_bin,
         "scan",
-        f"dir:{repo_root}",
+        source or f"dir:{repo_root}",
         "-o",
         "syft-json",
         "-q",
@@ -109,6 +136,161 @@ def run_syft(repo_root: Path, *, use_config: bool = True) -> SyftOutput:
     return SyftOutput.model_validate_json(result.stdout)
 
 
+def syft_version() -> str:
+    """Return the syft version, which is part of the layer cache key."""
+    syft_bin = shutil.which("syft")
+    if not syft_bin:
+        print("Error: syft not found in PATH. Install from https://github.com/anchore/syft", file=sys.stderr)
+        sys.exit(1)
+    result = subprocess.run([syft_bin, "version", "-o", "json"], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)["version"]
+
+
+def layer_cache_dir() -> Path | None:
+    path = os.environ.get("SYFT_LAYER_CACHE_DIR")
+    if path is not None:
+        return Path(path) if path else None
+    return Path.home() / ".cache" / "notebooks" / "syft-layers"
+
+
+def _blob(layout: Path, digest: str) -> Path:
+    algorithm, _, encoded = digest.partition(":")
+    return layout / "blobs" / algorithm / encoded
+
+
+def resolve_oci_layers(image: str, platform: str = "linux/amd64") -> tuple[Path, list[str]]:
+    """Return the OCI layout directory of ``image`` (``PATH`` or ``PATH:TAG``) and its layer digests, bottom first."""
+    layout, ref = Path(image), None
+    if not (layout / "index.json").is_file() and ":" in image:
+        path, _, ref = image.rpartition(":")
+        layout = Path(path)
+    if not (layout / "index.json").is_file():
+        raise ValueError(f"{layout} is not an OCI layout directory (no index.json)")
+
+    descriptors = json.loads((layout / "index.json").read_text())["manifests"]
+    if ref is not None:
+        descriptors = [
+            d for d in descriptors if d.get("annotations", {}).get("org.opencontainers.image.ref.name") == ref
+        ]
+    if len(descriptors) != 1:
+        raise ValueError(f"Expected a single image for {image!r} in {layout}/index.json, found {len(descriptors)}")
+    descriptor = descriptors[0]
+
+    manifest = json.loads(_blob(layout, descriptor["digest"]).read_text())
+    if manifest.get("mediaType", descriptor.get("mediaType")) in INDEX_MEDIA_TYPES or "manifests" in manifest:
+        os_name, _, architecture = platform.partition("/")
+        for entry in manifest["manifests"]:
+            entry_platform = entry.get("platform", {})
+            if entry_platform.get("os") == os_name and entry_platform.get("architecture") == architecture:
+                manifest = json.loads(_blob(layout, entry["digest"]).read_text())
+                break
+        else:
+            raise ValueError(f"No {platform} image for {image!r} in {layout}")
+    return layout, [layer["digest"] for layer in manifest["layers"]]
+
+
+def _extraction_filter(member: tarfile.TarInfo, dest_path: str) -> tarfile.TarInfo | None:
+    """Extract what syft needs; skip what cannot be safely extracted (e.g. absolute symlinks) instead of failing."""
+    if PurePosixPath(member.name).name.startswith(WHITEOUT_PREFIX):
+        return None
+    try:
+        member = tarfile.data_filter(member, dest_path)
+    except tarfile.FilterError:
+        return None
+    if member.isdir():
+        # keep extracted directories writable and removable
+        member = member.replace(mode=(member.mode or 0) | 0o700, deep=False)
+    return member
+
+
+def scan_layer(repo_root: Path, layer: Path) -> LayerScan:
+    """Extract a layer tarball and run syft on its content alone."""
+    whiteouts: list[str] = []
+    opaque_dirs: list[str] = []
+    with tempfile.TemporaryDirectory(prefix="syft-layer-") as rootfs, tarfile.open(layer, mode="r:*") as tar:
+        for member in tar:
+            path = PurePosixPath("/", member.name)
+            if path.name == OPAQUE_WHITEOUT:
+                opaque_dirs.append(str(path.parent))
+            elif path.name.startswith(WHITEOUT_PREFIX):
+                whiteouts.append(str(path.with_name(path.name.removeprefix(WHITEOUT_PREFIX))))
+        tar.extractall(rootfs, filter=_extraction_filter)  # ruff: ignore[tarfile-unsafe-members] - _extraction_filter applies data_filter
+        data = run_syft(repo_root, use_config=False, source=f"dir:{rootfs}")
+    return LayerScan(artifacts=data.artifacts, whiteouts=whiteouts, opaque_dirs=opaque_dirs)
+
+
+def cached_scan_layer(repo_root: Path, layout: Path, digest: str, cache_dir: Path | None) -> LayerScan:
+    if cache_dir is None:
+        return scan_layer(repo_root, _blob(layout, digest))
+    cache_file = cache_dir / f"{digest.replace(':', '-')}.json"
+    try:
+        return LayerScan.model_validate_json(cache_file.read_text())
+    except OSError, ValueError:
+        pass
+    print(f"Scanning layer {digest}", file=sys.stderr)
+    result = scan_layer(repo_root, _blob(layout, digest))
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("w", dir=cache_file.parent, suffix=".tmp", delete=False) as f:
+        f.write(result.model_dump_json())
+    Path(f.name).replace(cache_file)
+    return result
+
+
+def _is_under(path: PurePosixPath, prefix: PurePosixPath) -> bool:
+    return path == prefix or prefix in path.parents
+
+
+def merge_layers(layers: list[tuple[str, LayerScan]]) -> list[Artifact]:
+    """Assemble the artifacts visible in the image from per-layer results, bottom layer first.
+
+    A location found in a layer is hidden when a later layer deletes it (a whiteout of the path or
+    of a parent directory, or an opaque whiteout of a parent directory) or when a later layer's own
+    result has a location with the same path (the file was replaced, e.g. an updated rpmdb).
+    An artifact without any visible location is dropped; kept locations are tagged with the layer digest.
+    """
+    merged: list[Artifact] = []
+    deleted: list[PurePosixPath] = []
+    replaced: set[str] = set()
+    for digest, scan in reversed(layers):
+        visible = []
+        for artifact in scan.artifacts:
+            locations = [
+                location.model_copy(update={"layerID": digest})
+                for location in artifact.locations
+                if location.path is not None
+                and location.path not in replaced
+                and not any(_is_under(PurePosixPath(location.path), prefix) for prefix in deleted)
+            ]
+            if locations or not artifact.locations:
+                visible.append(artifact.model_copy(update={"locations": locations}))
+        replaced.update(
+            location.path for artifact in scan.artifacts for location in artifact.locations if location.path
+        )
+        # opaque whiteouts and whiteouts only apply to the layers below
+        deleted.extend(PurePosixPath(path) for path in [*scan.whiteouts, *scan.opaque_dirs])
+        merged[:0] = visible
+    return merged
+
+
+def scan_image(repo_root: Path, image: str, *, platform: str = "linux/amd64") -> SyftOutput:
+    """Scan an image from a local OCI layout, reusing cached per-layer results."""
+    layout, digests = resolve_oci_layers(image, platform)
+    cache_dir = layer_cache_dir()
+    if cache_dir is not None:
+        cache_dir /= syft_version()
+    layers = [(digest, cached_scan_layer(repo_root, layout, digest, cache_dir)) for digest in digests]
+    return SyftOutput(artifacts=merge_layers(layers))
+
+
+def load_artifacts(args: argparse.Namespace) -> list[Artifact]:
+    repo_root = find_repo_root()
+    if args.image:
+        data = scan_image(repo_root, args.image, platform=args.platform)
+    else:
+        data = run_syft(repo_root, use_config=not args.no_config)
+    return filter_artifacts(data.artifacts, package=args.package, pkg_type=args.type)
+
+
 def filter_artifacts(
     artifacts: list[Artifact],
     *,
@@ -128,9 +310,7 @@ def filter_artifacts(
 
 def cmd_scan(args: argparse.Namespace) -> int:
     """Scan mode: list packages with their source locations."""
-    repo_root = find_repo_root()
-    data = run_syft(repo_root, use_config=not args.no_config)
-    artifacts = filter_artifacts(data.artifacts, package=args.package, pkg_type=args.type)
+    artifacts = load_artifacts(args)
 
     if args.json:
         print(
@@ -160,9 +340,7 @@ def cmd_scan(args: argparse.Namespace) -> int:
 
 def cmd_report(args: argparse.Namespace) -> int:
     """Report mode: summary grouped by source directory."""
-    repo_root = find_repo_root()
-    data = run_syft(repo_root, use_config=not args.no_config)
-    artifacts = filter_artifacts(data.artifacts, package=args.package, pkg_type=args.type)
+    artifacts = load_artifacts(args)
 
     by_type: dict[str, int] = defaultdict(int)
     by_dir: dict[str, list[Artifact]] = defaultdict(list)
@@ -196,7 +374,10 @@ def cmd_report(args: argparse.Namespace) -> int:
         print(json.dumps(report, indent=2))
         return 0
 
-    config_label = "WITHOUT .syft.yaml exclusions" if args.no_config else "with .syft.yaml exclusions"
+    if args.image:
+        config_label = f"image {args.image}"
+    else:
+        config_label = "WITHOUT .syft.yaml exclusions" if args.no_config else "with .syft.yaml exclusions"
     print(f"=== Syft Scan Report ({config_label}) ===\n")
 
     print(f"Total packages found: {len(artifacts)}\n")
@@ -248,6 +429,15 @@ def main() -> int:
         action="store_true",
         help="Output results as JSON",
     )
+    common.add_argument(
+        "--image",
+        help="Scan an image from a local OCI layout directory (PATH or PATH:TAG) instead of the repository",
+    )
+    common.add_argument(
+        "--platform",
+        default="linux/amd64",
+        help="Platform to scan when the image has several (default: linux/amd64)",
+    )
 
     subparsers.add_parser(
         "scan",
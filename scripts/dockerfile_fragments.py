@@ -10,18 +10,27 @@ The original AIPCC version uses the `ed` command to replace everything between
 This script currently has the data inline, but this can be easily changed.
 We could also support files, or maybe even `### BEGIN funcname("param1", "param2")` that would
  run Python function `funcname` and paste in the return value.
+
+A fingerprint manifest records, for every Dockerfile, the hash of its content after the last render
+ and the hash of each fragment it contains. A Dockerfile is only re-rendered when its content or one
+ of its fragments changed since then. The manifest lives in `~/.cache/notebooks/dockerfile_fragments.json`;
+ set `DOCKERFILE_FRAGMENTS_MANIFEST` to use another file, or to an empty value to always render everything.
 """
 
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
 import textwrap
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import ntb
 
 if TYPE_CHECKING:
-    import pathlib
-
     from pyfakefs.fake_filesystem import FakeFilesystem
 
 # restricting to the relevant directories significantly speeds up the processing
@@ -33,22 +42,131 @@ docker_directories = (
 )
 
 
-def sanity_check(dockerfile: pathlib.Path, replacements: dict[str, str]):
-    """Sanity check that we don't have any unexpected `### BEGIN`s and `### END`s"""
+MANIFEST_VERSION = 1
+
+
+def sanity_check(dockerfile: pathlib.Path, lines: list[str], replacements: dict[str, str]) -> list[str]:
+    """Sanity check that we don't have any unexpected `### BEGIN`s and `### END`s
+
+    Returns the names of the blocks found in the Dockerfile, in order of appearance."""
     begin = "#" * 3 + " BEGIN"
     end = "#" * 3 + " END"
-    with open(dockerfile, "rt") as fp:
-        for line_no, line in enumerate(fp, start=1):
-            for prefix in (begin, end):
-                if line.rstrip().startswith(prefix):
-                    suffix = line[len(prefix) + 1 :].rstrip()
-                    if suffix not in replacements:
-                        raise ValueError(
-                            f"Expected replacement for '{prefix} {suffix}' not found in {dockerfile}:{line_no}"
-                        )
-
-
-def main():
+    blocks = []
+    for line_no, line in enumerate(lines, start=1):
+        for prefix in (begin, end):
+            if line.rstrip().startswith(prefix):
+                suffix = line[len(prefix) + 1 :].rstrip()
+                if suffix not in replacements:
+                    raise ValueError(
+                        f"Expected replacement for '{prefix} {suffix}' not found in {dockerfile}:{line_no}"
+                    )
+                if prefix == begin and suffix not in blocks:
+                    blocks.append(suffix)
+    return blocks
+
+
+def sha256(data: str | bytes) -> str:
+    return hashlib.sha256(data.encode() if isinstance(data, str) else data).hexdigest()
+
+
+def default_manifest_path() -> pathlib.Path | None:
+    path = os.environ.get("DOCKERFILE_FRAGMENTS_MANIFEST")
+    if path is None:
+        return pathlib.Path.home() / ".cache" / "notebooks" / "dockerfile_fragments.json"
+    return pathlib.Path(path) if path else None
+
+
+def load_manifest(path: pathlib.Path | None) -> dict[str, Any]:
+    """Return the per-Dockerfile fingerprints, keyed by absolute path, or nothing if the manifest is unusable."""
+    if path is None:
+        return {}
+    try:
+        manifest = json.loads(path.read_text())
+    except OSError, ValueError:
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(path: pathlib.Path, files: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wt", dir=path.parent, prefix=f".{path.name}.", delete=False) as fp:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, fp, indent=1, sort_keys=True)
+    pathlib.Path(fp.name).replace(path)
+
+
+def find_dockerfiles() -> list[pathlib.Path]:
+    dockerfiles = []
+    for docker_dir in docker_directories:
+        for dockerfile in docker_dir.glob("**/Dockerfile*"):
+            if not dockerfile.is_file():
+                continue
+            if dockerfile.is_relative_to(ntb.ROOT_DIR / "examples"):
+                continue
+            dockerfiles.append(dockerfile)
+    return sorted(dockerfiles)
+
+
+def render(
+    dockerfiles: list[pathlib.Path],
+    replacements: dict[str, str],
+    manifest: dict[str, Any],
+    *,
+    check: bool = False,
+) -> tuple[list[pathlib.Path], dict[str, Any]]:
+    """Render the blocks of every Dockerfile whose fingerprint does not match the manifest.
+
+    Returns the Dockerfiles whose content changed (or, with ``check``, would change) and the
+    fingerprints to store. With ``check``, nothing is written and outdated Dockerfiles get no fingerprint.
+    """
+    fragment_hashes = {prefix: sha256(contents) for prefix, contents in replacements.items()}
+    changed = []
+    fingerprints = {}
+    for dockerfile in dockerfiles:
+        key = str(dockerfile.absolute())
+        data = dockerfile.read_bytes()
+        entry = manifest.get(key)
+        if (
+            isinstance(entry, dict)
+            and entry.get("sha256") == sha256(data)
+            and all(fragment_hashes.get(prefix) == digest for prefix, digest in entry.get("fragments", {}).items())
+        ):
+            fingerprints[key] = entry
+            continue
+
+        original = data.decode()
+        lines = original.splitlines(keepends=True)
+        blocks = sanity_check(dockerfile, lines, replacements)
+        for prefix in blocks:
+            lines = ntb.replace_block(lines, replacements[prefix], prefix, source=dockerfile)
+        rendered = "".join(lines)
+
+        if rendered != original:
+            changed.append(dockerfile)
+            if check:
+                continue
+            dockerfile.write_text(rendered)
+        fingerprints[key] = {
+            "sha256": sha256(rendered),
+            "fragments": {prefix: fragment_hashes[prefix] for prefix in blocks},
+        }
+    return changed, fingerprints
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Update the ### BEGIN/### END marked blocks in Dockerfiles.")
+    parser.add_argument(
+        "--check", action="store_true", help="Only report Dockerfiles that need an update, exit non-zero if any do"
+    )
+    parser.add_argument(
+        "--manifest",
+        type=lambda value: pathlib.Path(value) if value else None,
+        default=default_manifest_path(),
+        help="Fingerprint manifest; an empty value re-renders every Dockerfile",
+    )
+    args = parser.parse_args(argv)
+
     subscription_manager_register_refresh = textwrap.dedent(r"""
         RUN /bin/bash <<'EOF'
         # If we have a Red Hat subscription prepared, refresh it
@@ -177,29 +295,51 @@ def main():
                 --requirements=./pylock.toml"""),
     }
 
-    for docker_dir in docker_directories:
-        for dockerfile in docker_dir.glob("**/Dockerfile*"):
-            if not dockerfile.is_file():
-                continue
-            if dockerfile.is_relative_to(ntb.ROOT_DIR / "examples"):
-                continue
+    manifest = load_manifest(args.manifest)
+    changed, fingerprints = render(find_dockerfiles(), replacements, manifest, check=args.check)
 
-            sanity_check(dockerfile, replacements)
+    if args.manifest is not None:
+        # keep the fingerprints of Dockerfiles in other checkouts that share the manifest
+        root = str(ntb.ROOT_DIR.absolute())
+        files = {key: entry for key, entry in manifest.items() if not key.startswith(root + os.sep)}
+        files.update(fingerprints)
+        if files != manifest:
+            save_manifest(args.manifest, files)
 
-            for prefix, contents in replacements.items():
-                ntb.blockinfile(
-                    filename=dockerfile,
-                    contents=contents,
-                    prefix=prefix,
-                )
+    for dockerfile in changed:
+        print(f"{'Needs update' if args.check else 'Updated'}: {dockerfile.relative_to(ntb.ROOT_DIR)}")
+    return 1 if args.check and changed else 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
 
 
 class TestMain:
     def test_dry_run(self, fs: FakeFilesystem):
         for docker_dir in docker_directories:
             fs.add_real_directory(source_path=docker_dir, read_only=False)
-        main()
+        assert main(["--manifest", ""]) == 0
+
+    def test_manifest_skips_unchanged_dockerfiles(self, fs: FakeFilesystem):
+        dockerfile = ntb.ROOT_DIR / "jupyter" / "Dockerfile.cpu"
+        fs.create_file(dockerfile, contents="FROM scratch\n### BEGIN b\nold\n### END b\n")
+        other = ntb.ROOT_DIR / "runtimes" / "Dockerfile.cpu"
+        fs.create_file(other, contents="FROM scratch\n")
+        manifest = pathlib.Path("/manifest.json")
+
+        changed, fingerprints = render([dockerfile, other], {"b": "new"}, load_manifest(manifest))
+        assert changed == [dockerfile]
+        assert dockerfile.read_text() == "FROM scratch\n### BEGIN b\nnew\n### END b\n"
+        save_manifest(manifest, fingerprints)
+
+        # a fingerprint match skips the Dockerfile without looking at its blocks
+        fingerprints = load_manifest(manifest)
+        assert render([dockerfile, other], {"b": "new"}, fingerprints, check=True) == ([], fingerprints)
+
+        # editing the Dockerfile or the fragment it uses makes it render again, other Dockerfiles stay skipped
+        dockerfile.write_text("FROM ubi9\n### BEGIN b\nnew\n### END b\n")
+        assert render([dockerfile, other], {"b": "new"}, fingerprints, check=True)[0] == []
+        changed, _ = render([dockerfile, other], {"b": "newer"}, fingerprints, check=True)
+        assert changed == [dockerfile]
+        assert dockerfile.read_text() == "FROM ubi9\n### BEGIN b\nnew\n### END b\n"
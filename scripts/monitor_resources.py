@@ -1,79 +1,419 @@
 #! /usr/bin/env python3
+"""Sample CPU, memory, IO, pressure (PSI) and disk usage of a CI runner at sub-second resolution.
 
-import shutil
+Samples are read from cgroup v2 (``memory.current``, ``cpu.stat``, ``io.stat``) with ``/proc``
+fallbacks for the root cgroup and cgroup v1 hosts, plus the ``/proc/pressure`` PSI stall
+counters. The kernel's ``avg10`` is a 10-second moving average and would hide sub-second
+spikes, so pressure is the growth of the ``total=`` stall time between two samples instead.
+Disk usage is that of the whole filesystem holding each monitored path (``statvfs``); paths
+on the same filesystem show the same growth, and the output says which ones do.
+They are kept in a fixed-size ring buffer, so the monitor can run for the whole job at
+constant memory. Per-phase peaks are tracked incrementally, so they survive ring-buffer
+eviction.
+
+Phases are named by writing to the marker file (``--phase-file``); the file is re-read
+whenever its mtime changes, or immediately on SIGUSR1::
+
+    uv run scripts/monitor_resources.py --phase-file /tmp/phase &
+    echo "build" > /tmp/phase
+    kill -USR1 %1  # optional, makes the phase switch exact
+
+On SIGTERM/SIGINT the time series is written as compact columnar JSON (``--output``) and
+a table of per-phase peaks is appended to ``$GITHUB_STEP_SUMMARY`` when that is set.
+A one-line summary is still logged every ``--log-every`` seconds, so a runner that is
+killed outright (OOM, disk full) leaves a breadcrumb trail in the job log.
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import dataclasses
+import json
+import os
+import pathlib
 import signal
-import subprocess
-import sys
+import threading
 import time
 
 import structlog
 
 from ci.logging_config import configure_logging
 
-configure_logging()
 log = structlog.get_logger()
 
-_HAS_FREE = shutil.which("free") is not None
-
 PATHS_TO_MONITOR: list[str] = ["/", "/mnt", "/mnt/containers/storage"]
 
+CGROUP_ROOT = pathlib.Path("/sys/fs/cgroup")
+PROC_ROOT = pathlib.Path("/proc")
 
-def _handle_signal(signum: int, _frame: object) -> None:
-    log.info("Resource monitoring stopped", signal=signal.Signals(signum).name)
-    sys.exit(0)
+DEFAULT_INTERVAL = 0.5
+# 4 hours of samples at the default interval
+DEFAULT_CAPACITY = 28_800
+DEFAULT_LOG_EVERY = 30.0
+DEFAULT_PHASE = "startup"
 
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
 
-def get_disk_usage(path: str) -> dict[str, str]:
-    try:
-        usage = shutil.disk_usage(path)
-    except OSError:
-        return {"status": "not found"}
-    pct = usage.used / usage.total * 100 if usage.total else 0
-    gib_free = usage.free / (1024**3)
-    return {"used_pct": f"{pct:.0f}%", "free_gib": f"{gib_free:.1f}"}
+# PSI resources and kinds recorded per sample, as (resource, kind) pairs
+PSI_SERIES: tuple[tuple[str, str], ...] = (
+    ("cpu", "some"),
+    ("memory", "some"),
+    ("memory", "full"),
+    ("io", "some"),
+    ("io", "full"),
+)
 
 
-def get_memory_usage() -> dict[str, str]:
-    if not _HAS_FREE:
-        return {}
-    try:
-        result = subprocess.run(
-            ["free", "-h"],
-            capture_output=True,
-            check=False,
-            text=True,
-            timeout=5,
-        )
-    except subprocess.TimeoutExpired:
-        return {"status": "timeout"}
-    if result.returncode != 0:
-        return {"status": "error"}
-    info: dict[str, str] = {}
-    for line in result.stdout.splitlines():
-        parts = line.split()
-        if parts and parts[0] == "Mem:":
-            info["mem_total"] = parts[1]
-            info["mem_used"] = parts[2]
-            info["mem_free"] = parts[3]
-        elif parts and parts[0] == "Swap:":
-            info["swap_total"] = parts[1]
-            info["swap_used"] = parts[2]
-    return info
-
-
-def main() -> None:
-    signal.signal(signal.SIGTERM, _handle_signal)
-    signal.signal(signal.SIGINT, _handle_signal)
-
-    log.info("Starting resource monitoring")
-
-    while True:
-        log.info(
-            "Resource stats",
-            disk={path: get_disk_usage(path) for path in PATHS_TO_MONITOR},
-            memory=get_memory_usage(),
+@dataclasses.dataclass(slots=True, frozen=True)
+class Sample:
+    """One reading of all counters; cumulative counters are converted to rates by the caller."""
+
+    t: float
+    phase: str
+    mem_bytes: int
+    cpu_usec: int
+    io_read_bytes: int
+    io_write_bytes: int
+    psi_total_usec: tuple[int, ...]
+    disk_used_bytes: tuple[int | None, ...]
+
+
+class ResourceReader:
+    """Reads resource counters from cgroup v2, falling back to system-wide ``/proc`` files."""
+
+    def __init__(self, cgroup: pathlib.Path = CGROUP_ROOT, proc: pathlib.Path = PROC_ROOT) -> None:
+        self.cgroup = cgroup
+        self.proc = proc
+        self.cgroup_v2 = (cgroup / "cgroup.controllers").is_file()
+
+    def _cgroup_file(self, name: str) -> pathlib.Path | None:
+        if not self.cgroup_v2:
+            return None
+        path = self.cgroup / name
+        return path if path.is_file() else None
+
+    @staticmethod
+    def _read_keyed(path: pathlib.Path) -> dict[str, int]:
+        """Parse ``key value`` lines, as in ``cpu.stat`` or ``/proc/vmstat``."""
+        values: dict[str, int] = {}
+        for line in path.read_text().splitlines():
+            key, _, value = line.partition(" ")
+            try:
+                values[key.rstrip(":")] = int(value.split()[0])
+            except ValueError, IndexError:
+                continue
+        return values
+
+    def memory_bytes(self) -> int:
+        if (path := self._cgroup_file("memory.current")) is not None:
+            return int(path.read_text())
+        # The root cgroup has no memory.current; use what the kernel considers not available.
+        meminfo = self._read_keyed(self.proc / "meminfo")
+        return (meminfo.get("MemTotal", 0) - meminfo.get("MemAvailable", 0)) * 1024
+
+    def cpu_usec(self) -> int:
+        if (path := self._cgroup_file("cpu.stat")) is not None:
+            return self._read_keyed(path).get("usage_usec", 0)
+        # /proc/stat "cpu" line: user nice system idle iowait irq softirq steal ...
+        fields = (self.proc / "stat").read_text().split("\n", 1)[0].split()[1:]
+        busy_ticks = sum(int(v) for i, v in enumerate(fields[:8]) if i not in (3, 4))
+        return busy_ticks * 1_000_000 // _CLK_TCK
+
+    def io_bytes(self) -> tuple[int, int]:
+        if (path := self._cgroup_file("io.stat")) is not None:
+            read = write = 0
+            for line in path.read_text().splitlines():
+                for field in line.split()[1:]:
+                    key, _, value = field.partition("=")
+                    if key == "rbytes":
+                        read += int(value)
+                    elif key == "wbytes":
+                        write += int(value)
+            return read, write
+        vmstat = self._read_keyed(self.proc / "vmstat")
+        return vmstat.get("pgpgin", 0) * 1024, vmstat.get("pgpgout", 0) * 1024
+
+    def psi_total_usec(self) -> tuple[int, ...]:
+        """The cumulative ``total`` stall time of each series in ``PSI_SERIES``; 0 where PSI is unavailable."""
+        values: dict[tuple[str, str], int] = {}
+        for resource in {resource for resource, _ in PSI_SERIES}:
+            path = self._cgroup_file(f"{resource}.pressure") or self.proc / "pressure" / resource
+            try:
+                text = path.read_text()
+            except OSError:
+                continue
+            for line in text.splitlines():
+                kind, *fields = line.split()
+                for field in fields:
+                    if field.startswith("total="):
+                        values[resource, kind] = int(field.removeprefix("total="))
+        return tuple(values.get(series, 0) for series in PSI_SERIES)
+
+    @staticmethod
+    def same_filesystem_as(paths: list[str]) -> dict[str, str]:
+        """Map each path to the first earlier path on the same filesystem, for those that share one."""
+        first_on_device: dict[int, str] = {}
+        shared: dict[str, str] = {}
+        for path in paths:
+            try:
+                device = os.stat(path).st_dev
+            except OSError:
+                continue
+            if device in first_on_device:
+                shared[path] = first_on_device[device]
+            else:
+                first_on_device[device] = path
+        return shared
+
+    @staticmethod
+    def disk_used_bytes(paths: list[str]) -> tuple[int | None, ...]:
+        """Used bytes of the filesystem holding each path, not of the path itself."""
+        used: list[int | None] = []
+        for path in paths:
+            try:
+                st = os.statvfs(path)
+            except OSError:
+                used.append(None)
+                continue
+            used.append((st.f_blocks - st.f_bfree) * st.f_frsize)
+        return tuple(used)
+
+
+class PhaseMarker:
+    """Tracks the current phase name from a marker file, re-reading it only when its mtime changes."""
+
+    def __init__(self, path: pathlib.Path | None, default: str = DEFAULT_PHASE) -> None:
+        self.path = path
+        self.current = default
+        self._mtime_ns: int | None = None
+        self.force = False
+
+    def read(self) -> str:
+        if self.path is None:
+            return self.current
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except OSError:
+            return self.current
+        if mtime_ns != self._mtime_ns or self.force:
+            self._mtime_ns = mtime_ns
+            self.force = False
+            self.current = self.path.read_text().strip() or self.current
+        return self.current
+
+
+@dataclasses.dataclass(slots=True)
+class PhaseStats:
+    """Peaks of one phase, accumulated sample by sample."""
+
+    start: float
+    end: float = 0.0
+    samples: int = 0
+    peak_mem_bytes: int = 0
+    peak_cpu_cores: float = 0.0
+    peak_io_read_bps: float = 0.0
+    peak_io_write_bps: float = 0.0
+    # percent of the time between two samples that tasks were stalled
+    peak_psi_stall_pct: list[float] = dataclasses.field(default_factory=lambda: [0.0] * len(PSI_SERIES))
+    disk_start_bytes: tuple[int | None, ...] = ()
+    disk_end_bytes: tuple[int | None, ...] = ()
+
+    def disk_growth_bytes(self) -> list[int | None]:
+        return [
+            None if start is None or end is None else end - start
+            for start, end in zip(self.disk_start_bytes, self.disk_end_bytes, strict=True)
+        ]
+
+
+class ResourceMonitor:
+    """Collects samples into a ring buffer and keeps per-phase peaks."""
+
+    def __init__(
+        self,
+        reader: ResourceReader,
+        phase: PhaseMarker,
+        paths: list[str],
+        capacity: int = DEFAULT_CAPACITY,
+        clock=time.monotonic,
+    ) -> None:
+        self.reader = reader
+        self.phase = phase
+        self.paths = paths
+        self.same_filesystem_as = reader.same_filesystem_as(paths)
+        self.samples: collections.deque[Sample] = collections.deque(maxlen=capacity)
+        self.phases: dict[str, PhaseStats] = {}
+        self._clock = clock
+        self._t0 = clock()
+        self._previous: Sample | None = None
+
+    def sample(self) -> Sample:
+        io_read, io_write = self.reader.io_bytes()
+        current = Sample(
+            t=self._clock() - self._t0,
+            phase=self.phase.read(),
+            mem_bytes=self.reader.memory_bytes(),
+            cpu_usec=self.reader.cpu_usec(),
+            io_read_bytes=io_read,
+            io_write_bytes=io_write,
+            psi_total_usec=self.reader.psi_total_usec(),
+            disk_used_bytes=self.reader.disk_used_bytes(self.paths),
         )
-        time.sleep(30)
+        self.samples.append(current)
+        self._update_phase(current)
+        self._previous = current
+        return current
+
+    def _update_phase(self, current: Sample) -> None:
+        stats = self.phases.get(current.phase)
+        if stats is None:
+            stats = self.phases[current.phase] = PhaseStats(start=current.t, disk_start_bytes=current.disk_used_bytes)
+        stats.end = current.t
+        stats.samples += 1
+        stats.disk_end_bytes = current.disk_used_bytes
+        stats.peak_mem_bytes = max(stats.peak_mem_bytes, current.mem_bytes)
+        previous = self._previous
+        if previous is not None and (dt := current.t - previous.t) > 0:
+            stats.peak_psi_stall_pct = [
+                max(peak, stall_pct(now - before, dt))
+                for peak, now, before in zip(
+                    stats.peak_psi_stall_pct, current.psi_total_usec, previous.psi_total_usec, strict=True
+                )
+            ]
+            stats.peak_cpu_cores = max(stats.peak_cpu_cores, (current.cpu_usec - previous.cpu_usec) / 1e6 / dt)
+            stats.peak_io_read_bps = max(stats.peak_io_read_bps, (current.io_read_bytes - previous.io_read_bytes) / dt)
+            stats.peak_io_write_bps = max(
+                stats.peak_io_write_bps, (current.io_write_bytes - previous.io_write_bytes) / dt
+            )
+
+    def to_json(self) -> dict:
+        """Columnar time series plus per-phase peaks; columns keep the output compact.
+
+        ``psi_stall_usec`` holds the stall time since the previous sample, 0 for the first one kept.
+        """
+        phase_names = list(self.phases)
+        previous = [self.samples[0], *self.samples][:-1] if self.samples else []
+        return {
+            "cgroup_v2": self.reader.cgroup_v2,
+            "paths": self.paths,
+            # disk usage is per filesystem, these paths show the growth of an earlier one's
+            "same_filesystem_as": self.same_filesystem_as,
+            "psi_series": [f"{resource}.{kind}" for resource, kind in PSI_SERIES],
+            "phase_names": phase_names,
+            "columns": {
+                "t": [round(s.t, 3) for s in self.samples],
+                "phase": [phase_names.index(s.phase) for s in self.samples],
+                "mem_bytes": [s.mem_bytes for s in self.samples],
+                "cpu_usec": [s.cpu_usec for s in self.samples],
+                "io_read_bytes": [s.io_read_bytes for s in self.samples],
+                "io_write_bytes": [s.io_write_bytes for s in self.samples],
+                "psi_stall_usec": [
+                    [now - before for now, before in zip(s.psi_total_usec, p.psi_total_usec, strict=True)]
+                    for s, p in zip(self.samples, previous, strict=True)
+                ],
+                "disk_used_bytes": [list(s.disk_used_bytes) for s in self.samples],
+            },
+            "phases": {
+                name: dataclasses.asdict(stats) | {"disk_growth_bytes": stats.disk_growth_bytes()}
+                for name, stats in self.phases.items()
+            },
+        }
+
+    def summary_markdown(self) -> str:
+        gib = 1024**3
+        mib = 1024**2
+        psi_headers = " | ".join(f"PSI {resource} {kind} peak stall" for resource, kind in PSI_SERIES)
+        path_headers = " | ".join(f"Δ disk {path}" for path in self.paths)
+        lines = [
+            "### Resource usage by phase",
+            "",
+            f"| Phase | Duration | Peak memory | Peak CPU | Peak IO read | Peak IO write | {psi_headers} | {path_headers} |",
+            "|" + "---|" * (6 + len(PSI_SERIES) + len(self.paths)),
+        ]
+        for name, stats in self.phases.items():
+            psi = " | ".join(f"{v:.1f}%" for v in stats.peak_psi_stall_pct)
+            disk = " | ".join("n/a" if g is None else f"{g / gib:+.2f} GiB" for g in stats.disk_growth_bytes())
+            lines.append(
+                f"| {name} | {stats.end - stats.start:.0f}s | {stats.peak_mem_bytes / gib:.2f} GiB"
+                f" | {stats.peak_cpu_cores:.2f} cores | {stats.peak_io_read_bps / mib:.0f} MiB/s"
+                f" | {stats.peak_io_write_bps / mib:.0f} MiB/s | {psi} | {disk} |"
+            )
+        lines.append("")
+        lines.append("Disk growth is that of the filesystem holding each path.")
+        lines.extend(f"{path} is on the same filesystem as {other}." for path, other in self.same_filesystem_as.items())
+        return "\n".join(lines) + "\n"
+
+
+def stall_pct(stall_usec: int, seconds: float) -> float:
+    """Stall time as a percentage of the wall time it accumulated over.
+
+    >>> stall_pct(250_000, 0.5)
+    50.0
+    """
+    return stall_usec / 1e4 / seconds
+
+
+def _log_sample(sample: Sample, previous: Sample, paths: list[str]) -> None:
+    """Logs ``sample``, with the pressure averaged since the ``previous`` logged one."""
+    dt = sample.t - previous.t
+    log.info(
+        "Resource stats",
+        phase=sample.phase,
+        mem_gib=f"{sample.mem_bytes / 1024**3:.2f}",
+        psi_stall_pct={
+            f"{r}.{k}": round(stall_pct(now - before, dt), 1) if dt > 0 else 0.0
+            for (r, k), now, before in zip(PSI_SERIES, sample.psi_total_usec, previous.psi_total_usec, strict=True)
+        },
+        disk_used_gib={
+            path: None if used is None else f"{used / 1024**3:.1f}"
+            for path, used in zip(paths, sample.disk_used_bytes, strict=True)
+        },
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    configure_logging()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="seconds between samples")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="ring buffer size in samples")
+    parser.add_argument("--log-every", type=float, default=DEFAULT_LOG_EVERY, help="seconds between log lines")
+    parser.add_argument("--phase-file", type=pathlib.Path, help="marker file holding the current phase name")
+    parser.add_argument("--output", type=pathlib.Path, default=pathlib.Path("resource-monitor.json"))
+    args = parser.parse_args(argv)
+
+    stop = threading.Event()
+    phase = PhaseMarker(args.phase_file)
+
+    def _handle_stop(signum: int, _frame: object) -> None:
+        log.info("Resource monitoring stopped", signal=signal.Signals(signum).name)
+        stop.set()
+
+    def _handle_phase(_signum: int, _frame: object) -> None:
+        phase.force = True
+
+    signal.signal(signal.SIGTERM, _handle_stop)
+    signal.signal(signal.SIGINT, _handle_stop)
+    signal.signal(signal.SIGUSR1, _handle_phase)
+
+    monitor = ResourceMonitor(ResourceReader(CGROUP_ROOT, PROC_ROOT), phase, PATHS_TO_MONITOR, capacity=args.capacity)
+    log.info("Starting resource monitoring", interval=args.interval, cgroup_v2=monitor.reader.cgroup_v2)
+
+    next_log = 0.0
+    logged: Sample | None = None
+    while not stop.is_set():
+        sample = monitor.sample()
+        if sample.t >= next_log:
+            _log_sample(sample, logged or sample, monitor.paths)
+            logged = sample
+            next_log = sample.t + args.log_every
+        stop.wait(args.interval)
+
+    with open(args.output, "w") as f:
+        json.dump(monitor.to_json(), f, separators=(",", ":"))
+    log.info("Wrote resource time series", path=str(args.output), samples=len(monitor.samples))
+    if summary_path := os.environ.get("GITHUB_STEP_SUMMARY"):
+        with open(summary_path, "a") as f:
+            f.write(monitor.summary_markdown())
 
 
 if __name__ == "__main__":
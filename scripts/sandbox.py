@@ -1,28 +1,46 @@
 #! /usr/bin/env python3
 
+from __future__ import annotations
+
 import argparse
+import contextlib
+import dataclasses
+import errno
+import fcntl
 import glob
+import hashlib
 import os
 import pathlib
 import shutil
 import subprocess
 import sys
 import tempfile
-from typing import Literal, cast
+from typing import TYPE_CHECKING, Literal, cast
 
 import structlog
 
 from ci.logging_config import configure_logging
 from scripts.buildinputs_runner import buildinputs
 
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
 ROOT_DIR = pathlib.Path(__file__).parent.parent
 
+# Number of most recently used sandboxes kept in the cache directory
+KEEP_SANDBOXES = 4
+_COMPLETE_MARKER = ".sandbox-complete"
+
+# linux/fs.h FICLONE = _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
 log = structlog.get_logger()
 
 
 class Args(argparse.Namespace):
     dockerfile: pathlib.Path
     platform: Literal["linux/amd64", "linux/arm64", "linux/s390x", "linux/ppc64le"]
+    cache_dir: str
     remaining: list[str]
 
 
@@ -32,6 +50,12 @@ def main() -> int:
     p.add_argument(
         "--platform", type=str, choices=["linux/amd64", "linux/arm64", "linux/s390x", "linux/ppc64le"], required=True
     )
+    p.add_argument(
+        "--cache-dir",
+        default=os.environ.get("SANDBOX_CACHE_DIR", ""),
+        help="reuse sandboxes from this directory when prerequisites are unchanged, e.g. ~/.cache/notebooks/sandbox"
+        " (default: SANDBOX_CACHE_DIR, or a temporary directory per build)",
+    )
     p.add_argument("remaining", nargs=argparse.REMAINDER)
 
     args = cast("Args", p.parse_args())
@@ -48,9 +72,9 @@ def main() -> int:
     build_args = extract_build_args(args.remaining[1:])
     prereqs = buildinputs(dockerfile=args.dockerfile, platform=args.platform, build_args=build_args)
 
-    with tempfile.TemporaryDirectory(delete=True) as tmpdir:
-        setup_sandbox(prereqs, pathlib.Path(tmpdir))
-        command = [arg if arg != "{};" else tmpdir for arg in args.remaining[1:]]
+    cache_dir = pathlib.Path(args.cache_dir) if args.cache_dir else None
+    with sandbox_context(prereqs, cache_dir) as sandbox_dir:
+        command = [arg if arg != "{};" else str(sandbox_dir) for arg in args.remaining[1:]]
         print(f"running {command=}")
         try:
             subprocess.check_call(command)
@@ -60,6 +84,92 @@ def main() -> int:
     return 0
 
 
+@contextlib.contextmanager
+def sandbox_context(prereqs: list[pathlib.Path], cache_dir: pathlib.Path | None) -> Generator[pathlib.Path]:
+    """Yield a directory holding the build context for *prereqs*.
+
+    Without a *cache_dir* this is a throwaway temporary directory. With one, the sandbox is
+    kept in ``cache_dir/<fingerprint>`` and reused by later builds whose prerequisite set and
+    file stats are unchanged (see ``SandboxPlan.fingerprint``). A sandbox is held with a shared
+    ``flock`` while it is in use, so that pruning by a concurrent build leaves it alone.
+    """
+    plan = plan_sandbox(prereqs)
+    if cache_dir is None:
+        with tempfile.TemporaryDirectory(delete=True) as tmpdir:
+            plan.apply(pathlib.Path(tmpdir))
+            yield pathlib.Path(tmpdir)
+        return
+
+    sandbox_dir = cache_dir / plan.fingerprint()
+    fd = _lock_sandbox(sandbox_dir)
+    if fd is not None:
+        log.info("Reusing sandbox", path=str(sandbox_dir))
+        os.utime(sandbox_dir)
+    else:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        staging = pathlib.Path(tempfile.mkdtemp(dir=cache_dir, prefix=".staging-"))
+        # the lock is on the directory itself, so it stays held across the rename
+        fd = os.open(staging, os.O_RDONLY | os.O_DIRECTORY)
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        plan.apply(staging)
+        (staging / _COMPLETE_MARKER).touch()
+        try:
+            staging.rename(sandbox_dir)
+        except OSError:
+            # a concurrent build finished the same sandbox first, this build uses its own copy once
+            log.info("Using a one-off sandbox", path=str(staging))
+            sandbox_dir = staging
+        else:
+            log.info("Created sandbox", path=str(sandbox_dir), files=len(plan.files))
+        _prune_sandboxes(cache_dir, keep=sandbox_dir)
+    try:
+        yield sandbox_dir
+    finally:
+        os.close(fd)
+        if sandbox_dir.name.startswith(".staging-"):
+            shutil.rmtree(sandbox_dir, ignore_errors=True)
+
+
+def _lock_sandbox(sandbox_dir: pathlib.Path) -> int | None:
+    """Take a shared lock on a complete sandbox and return its descriptor, or None if there is no such sandbox."""
+    try:
+        fd = os.open(sandbox_dir, os.O_RDONLY | os.O_DIRECTORY)
+    except FileNotFoundError:
+        return None
+    fcntl.flock(fd, fcntl.LOCK_SH)
+    # checked under the lock, pruning removes the marker before the rest of the sandbox
+    if not (sandbox_dir / _COMPLETE_MARKER).exists():
+        os.close(fd)
+        return None
+    return fd
+
+
+def _prune_sandboxes(cache_dir: pathlib.Path, keep: pathlib.Path) -> None:
+    """Delete all but the ``KEEP_SANDBOXES`` most recently used sandboxes, except those in use."""
+    sandboxes = sorted(
+        (d for d in cache_dir.iterdir() if d.is_dir() and not d.name.startswith(".")),
+        key=lambda d: d.stat().st_mtime,
+        reverse=True,
+    )
+    for stale in sandboxes[KEEP_SANDBOXES:]:
+        if stale == keep:
+            continue
+        try:
+            fd = os.open(stale, os.O_RDONLY | os.O_DIRECTORY)
+        except FileNotFoundError:
+            continue
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            log.debug("Sandbox is in use, not pruning it", path=str(stale))
+            continue
+        else:
+            (stale / _COMPLETE_MARKER).unlink(missing_ok=True)
+            shutil.rmtree(stale, ignore_errors=True)
+        finally:
+            os.close(fd)
+
+
 def extract_build_args(remaining: list[str]) -> dict[str, str]:
     """Extract --build-arg KEY=VALUE pairs from the command line using argparse."""
     parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
@@ -124,6 +234,79 @@ def _ignore_dirname(
     return dirname in root_only_ignore and parent_at_repo_root
 
 
+def _link_or_copy(src: pathlib.Path | str, dst: pathlib.Path) -> None:
+    """Place *src* at *dst* without copying data where the filesystem allows it.
+
+    Tries a hardlink first, then a reflink (``FICLONE``, e.g. on XFS or Btrfs), and
+    falls back to a plain content copy across filesystems or where linking is refused
+    (e.g. ``fs.protected_hardlinks`` for files owned by another user).
+    Symlinks are followed, so the sandbox always holds regular files.
+    """
+    src = os.path.realpath(src)
+    if dst.is_symlink() or dst.exists():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+        return
+    except OSError as err:
+        if err.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES, errno.EMLINK, errno.ENOTSUP):
+            raise
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        shutil.copymode(src, dst)
+        return
+    except OSError:
+        pass
+    shutil.copy(src, dst)
+
+
+@dataclasses.dataclass
+class SandboxPlan:
+    """Directories and ``(source, destination)`` files that make up a build context.
+
+    Destinations are relative to the sandbox root, so the plan can be fingerprinted
+    before anything is created on disk.
+    """
+
+    dirs: list[pathlib.Path] = dataclasses.field(default_factory=list)
+    files: list[tuple[pathlib.Path, pathlib.Path]] = dataclasses.field(default_factory=list)
+
+    def fingerprint(self) -> str:
+        """Hash of the destination layout and the size and mtime of every source file.
+
+        Stat data stands in for content hashes so that multi-GB prefetch trees are not
+        read just to decide whether a sandbox can be reused. A file rewritten within the
+        mtime granularity and at the same size is therefore not noticed; in-place edits to
+        a hardlinked file show up in the sandbox anyway, as it shares the inode.
+        """
+        digest = hashlib.sha256()
+        for d in sorted(self.dirs):
+            digest.update(f"d {d}\n".encode())
+        for src, dst in sorted(self.files, key=lambda f: f[1]):
+            st = src.stat()
+            digest.update(f"f {dst} {st.st_size} {st.st_mtime_ns}\n".encode())
+        return digest.hexdigest()[:32]
+
+    def apply(self, root: pathlib.Path) -> None:
+        skipped: set[pathlib.Path] = set()
+        for d in self.dirs:
+            if skipped.intersection(d.parents):
+                continue
+            try:
+                (root / d).mkdir(parents=True, exist_ok=True)
+            except PermissionError:
+                log.warning(f"cannot create directory, skipping subtree: {d}")
+                skipped.add(d)
+        for src, dst in self.files:
+            if skipped.intersection(dst.parents):
+                continue
+            try:
+                _link_or_copy(src, root / dst)
+            except PermissionError:
+                log.warning(f"cannot copy file, skipping: {dst}")
+
+
 def _copy_tree(
     src: pathlib.Path,
     dst: pathlib.Path,
@@ -132,16 +315,39 @@ def _copy_tree(
     root_only_ignore: set[str] | None = None,
     any_depth_ignore: set[str] | None = None,
 ):
-    """Copy a directory tree, copying only file content (no metadata/xattrs).
+    """Place a directory tree at *dst*, linking or copying only file content (no metadata/xattrs).
 
     shutil.copytree's internal copystat() on directories fails on macOS with
     EPERM when extended attributes (quarantine, etc.) cannot be reproduced
-    on the destination.  Walking manually with shutil.copy avoids this.
+    on the destination.  Walking manually avoids this.
     Directories that cannot be created (e.g. macOS EPERM on certain dotfiles
     in temp directories) are logged and skipped.
 
     Ignore sets follow ``_ignored_dir_names`` / ``.dockerignore`` semantics.
     """
+    plan = SandboxPlan()
+    _plan_tree(
+        plan,
+        src,
+        dst,
+        repo_base_rel=repo_base_rel,
+        root_only_ignore=root_only_ignore,
+        any_depth_ignore=any_depth_ignore,
+    )
+    # absolute destinations ignore the root they are joined to
+    plan.apply(pathlib.Path("/"))
+
+
+def _plan_tree(
+    plan: SandboxPlan,
+    src: pathlib.Path,
+    dst: pathlib.Path,
+    *,
+    repo_base_rel: pathlib.Path | None = None,
+    root_only_ignore: set[str] | None = None,
+    any_depth_ignore: set[str] | None = None,
+) -> None:
+    """Add a directory tree to *plan*, see ``_copy_tree``."""
     root_only_ignore = root_only_ignore or set()
     any_depth_ignore = any_depth_ignore or set()
     if repo_base_rel is None:
@@ -152,7 +358,8 @@ def _copy_tree(
     if src.name in root_only_ignore and len(repo_base_rel.parts) == 1:
         return
 
-    _copy_tree_dir(
+    _plan_tree_dir(
+        plan,
         src,
         dst,
         pathlib.Path("."),
@@ -163,7 +370,8 @@ def _copy_tree(
     )
 
 
-def _copy_tree_dir(
+def _plan_tree_dir(
+    plan: SandboxPlan,
     src_dir: pathlib.Path,
     dst_dir: pathlib.Path,
     rel: pathlib.Path,
@@ -176,11 +384,7 @@ def _copy_tree_dir(
     if real_dir in ancestor_realpaths:
         return
 
-    try:
-        dst_dir.mkdir(parents=True, exist_ok=True)
-    except PermissionError:
-        log.warning(f"cannot create directory, skipping subtree: {rel}")
-        return
+    plan.dirs.append(dst_dir)
 
     parent_at_repo_root = len((repo_base_rel / rel).parts) == 0
     chain = ancestor_realpaths | {real_dir}
@@ -201,7 +405,8 @@ def _copy_tree_dir(
                 parent_at_repo_root=parent_at_repo_root,
             ):
                 continue
-            _copy_tree_dir(
+            _plan_tree_dir(
+                plan,
                 pathlib.Path(entry.path),
                 dst_dir / name,
                 rel / name,
@@ -211,16 +416,18 @@ def _copy_tree_dir(
                 chain,
             )
         elif entry.is_file(follow_symlinks=True):
-            try:
-                shutil.copy(entry.path, dst_dir / name)
-            except PermissionError:
-                log.warning(f"cannot copy file, skipping: {rel / name}")
+            plan.files.append((pathlib.Path(entry.path), dst_dir / name))
 
 
 def setup_sandbox(prereqs: list[pathlib.Path], tmpdir: pathlib.Path):
+    plan_sandbox(prereqs).apply(tmpdir)
+
+
+def plan_sandbox(prereqs: list[pathlib.Path]) -> SandboxPlan:
+    plan = SandboxPlan()
     gitignore = ROOT_DIR / ".gitignore"
     if gitignore.exists():
-        shutil.copy(gitignore, tmpdir)
+        plan.files.append((gitignore, pathlib.Path(".gitignore")))
 
     root_only_ignore, any_depth_ignore = _ignored_dir_names(ROOT_DIR)
 
@@ -239,17 +446,18 @@ def setup_sandbox(prereqs: list[pathlib.Path], tmpdir: pathlib.Path):
                 continue
             for m in matched:
                 m_path = pathlib.Path(m)
-                (tmpdir / m_path.parent).mkdir(parents=True, exist_ok=True)
+                plan.dirs.append(m_path.parent)
                 if m_path.is_dir():
-                    _copy_tree(
+                    _plan_tree(
+                        plan,
+                        m_path,
                         m_path,
-                        tmpdir / m_path,
                         repo_base_rel=m_path,
                         root_only_ignore=root_only_ignore,
                         any_depth_ignore=any_depth_ignore,
                     )
                 else:
-                    shutil.copy(m_path, tmpdir / m_path.parent)
+                    plan.files.append((m_path, m_path))
             continue
 
         if not dep.exists():
@@ -259,16 +467,18 @@ def setup_sandbox(prereqs: list[pathlib.Path], tmpdir: pathlib.Path):
             sys.exit(1)
 
         if dep.is_dir():
-            _copy_tree(
+            _plan_tree(
+                plan,
+                dep,
                 dep,
-                tmpdir / dep,
                 repo_base_rel=dep,
                 root_only_ignore=root_only_ignore,
                 any_depth_ignore=any_depth_ignore,
             )
         else:
-            (tmpdir / dep.parent).mkdir(parents=True, exist_ok=True)
-            shutil.copy(dep, tmpdir / dep.parent)
+            plan.dirs.append(dep.parent)
+            plan.files.append((dep, dep))
+    return plan
 
 
 if __name__ == "__main__":
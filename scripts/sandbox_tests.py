@@ -1,6 +1,8 @@
 #! /usr/bin/env python3
 from __future__ import annotations
 
+import errno
+import os
 import pathlib
 import tempfile
 from typing import TYPE_CHECKING
@@ -8,7 +10,8 @@ from typing import TYPE_CHECKING
 import pytest
 
 from ci.logging_config import configure_logging
-from scripts.sandbox import _copy_tree, _ignored_dir_names, _load_dockerignore, setup_sandbox
+from scripts import sandbox
+from scripts.sandbox import _copy_tree, _ignored_dir_names, _load_dockerignore, sandbox_context, setup_sandbox
 
 if TYPE_CHECKING:
     import pyfakefs.fake_filesystem
@@ -272,3 +275,99 @@ class TestCopyTreeWithIgnore:
 
         assert (dst / "real.txt").read_text() == "content"
         assert (dst / "link.txt").read_text() == "content"
+
+
+class TestLinkOrCopy:
+    def test_same_filesystem_is_hardlinked(self, tmp_path: pathlib.Path):
+        src = tmp_path / "src"
+        (src / "wheels").mkdir(parents=True)
+        (src / "wheels" / "big.whl").write_bytes(b"wheel")
+
+        dst = tmp_path / "dst"
+        _copy_tree(src, dst)
+
+        assert (dst / "wheels" / "big.whl").read_bytes() == b"wheel"
+        assert os.path.samefile(src / "wheels" / "big.whl", dst / "wheels" / "big.whl")
+
+    def test_cross_device_falls_back_to_copy(self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+        def cross_device_link(src, dst):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+        monkeypatch.setattr(sandbox.os, "link", cross_device_link)
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "file.txt").write_text("content")
+
+        dst = tmp_path / "dst"
+        _copy_tree(src, dst)
+
+        assert (dst / "file.txt").read_text() == "content"
+        assert not os.path.samefile(src / "file.txt", dst / "file.txt")
+
+
+class TestSandboxReuse:
+    @pytest.fixture
+    def workdir(self, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+        workdir = tmp_path / "repo"
+        (workdir / "prefetch-input").mkdir(parents=True)
+        (workdir / "prefetch-input" / "dep.tar").write_text("v1")
+        monkeypatch.chdir(workdir)
+        return workdir
+
+    def test_unchanged_prerequisites_reuse_sandbox(self, workdir: pathlib.Path, tmp_path: pathlib.Path):
+        cache_dir = tmp_path / "cache"
+        prereqs = [pathlib.Path("prefetch-input")]
+
+        with sandbox_context(prereqs, cache_dir) as first:
+            assert (first / "prefetch-input" / "dep.tar").read_text() == "v1"
+        with sandbox_context(prereqs, cache_dir) as second:
+            assert second == first
+
+    def test_changed_file_gets_new_sandbox(self, workdir: pathlib.Path, tmp_path: pathlib.Path):
+        cache_dir = tmp_path / "cache"
+        prereqs = [pathlib.Path("prefetch-input")]
+
+        with sandbox_context(prereqs, cache_dir) as first:
+            pass
+        dep = workdir / "prefetch-input" / "dep.tar"
+        dep.unlink()
+        dep.write_text("v2 longer")
+        with sandbox_context(prereqs, cache_dir) as second:
+            assert second != first
+            assert (second / "prefetch-input" / "dep.tar").read_text() == "v2 longer"
+
+    def test_old_sandboxes_are_pruned(
+        self, workdir: pathlib.Path, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setattr(sandbox, "KEEP_SANDBOXES", 1)
+        cache_dir = tmp_path / "cache"
+        dep = workdir / "prefetch-input" / "dep.tar"
+
+        for i in range(3):
+            dep.write_text("x" * (i + 1))
+            with sandbox_context([pathlib.Path("prefetch-input")], cache_dir) as current:
+                pass
+
+        assert [d for d in cache_dir.iterdir() if not d.name.startswith(".")] == [current]
+
+    def test_sandbox_in_use_is_not_pruned(
+        self, workdir: pathlib.Path, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setattr(sandbox, "KEEP_SANDBOXES", 1)
+        cache_dir = tmp_path / "cache"
+        dep = workdir / "prefetch-input" / "dep.tar"
+
+        with sandbox_context([pathlib.Path("prefetch-input")], cache_dir) as in_use:
+            # a concurrent build with other prerequisites would prune it
+            dep.unlink()
+            dep.write_text("v2 longer")
+            with sandbox_context([pathlib.Path("prefetch-input")], cache_dir) as other:
+                pass
+            assert (in_use / "prefetch-input" / "dep.tar").read_text() == "v1"
+
+        assert {d for d in cache_dir.iterdir() if not d.name.startswith(".")} == {in_use, other}
+
+    def test_without_cache_dir_sandbox_is_temporary(self, workdir: pathlib.Path):
+        with sandbox_context([pathlib.Path("prefetch-input")], None) as tmpdir:
+            assert (tmpdir / "prefetch-input" / "dep.tar").is_file()
+        assert not tmpdir.exists()
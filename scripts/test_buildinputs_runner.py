@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import pathlib
 
+import pytest
+
 from scripts import buildinputs_runner
 
 
@@ -83,6 +85,29 @@ def test_local_buildinputs(monkeypatch, tmp_path):
     assert captured["env"]["TARGETPLATFORM"] == "linux/amd64"
 
 
+def test_ensure_local_buildinputs_builds_only_a_missing_binary(monkeypatch, tmp_path):
+    builds = []
+    monkeypatch.delenv("CI", raising=False)
+    monkeypatch.setattr(buildinputs_runner, "ROOT_DIR", tmp_path)
+    monkeypatch.setattr(buildinputs_runner.subprocess, "check_call", lambda command, cwd: builds.append(command))
+
+    buildinputs_runner.ensure_local_buildinputs()
+    assert builds == [[buildinputs_runner.MAKE, "bin/buildinputs"]]
+
+    (tmp_path / "bin").mkdir()
+    (tmp_path / "bin" / "buildinputs").touch()
+    buildinputs_runner.ensure_local_buildinputs()
+    assert len(builds) == 1
+
+
+def test_ensure_local_buildinputs_is_a_noop_in_ci(monkeypatch, tmp_path):
+    monkeypatch.setenv("CI", "true")
+    monkeypatch.setattr(buildinputs_runner, "ROOT_DIR", tmp_path)
+    monkeypatch.setattr(buildinputs_runner.subprocess, "check_call", lambda *a, **kw: pytest.fail("built in CI"))
+
+    buildinputs_runner.ensure_local_buildinputs()
+
+
 def test_buildinputs_dispatches_to_container_in_ci(monkeypatch):
     monkeypatch.setenv("CI", "true")
     monkeypatch.setattr(buildinputs_runner, "containarized_buildinputs", lambda *a, **kw: '["a.txt"]\n')
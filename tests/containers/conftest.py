@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import concurrent.futures
 import dataclasses
+import itertools
 import logging
 import os
 import platform
+import threading
 from typing import TYPE_CHECKING, Any
 
 import docker.errors
@@ -13,11 +16,11 @@ import testcontainers.core.config
 import testcontainers.core.container
 import testcontainers.core.docker_client
 
-from tests.containers import docker_utils, skopeo_utils
+from tests.containers import docker_utils, perf_utils, readiness, scheduling, skopeo_utils
 from tests.containers.kubernetes_utils import TestFrame
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Generator
+    from collections.abc import Callable, Generator, Iterable
 
     from pytest import ExitCode, Metafunc, Parser, Session
 
@@ -26,6 +29,12 @@ TESTCONTAINERS_DOCKER_SOCKET_OVERRIDE = "TESTCONTAINERS_DOCKER_SOCKET_OVERRIDE"
 
 SHUTDOWN_RYUK = False
 
+# image architecture as Docker reports it (GOARCH) -> as `uname -m` reports it
+UNAME_ARCHITECTURES = {"amd64": "x86_64", "arm64": "aarch64", "s390x": "s390x", "ppc64le": "ppc64le"}
+
+# concurrent inspects and pulls when resolving the --image values at session start
+IMAGE_RESOLVE_WORKERS = 4
+
 # NOTE: Configure Testcontainers through `testcontainers.core.config` and not through env variables.
 # Importing `testcontainers` above has already read out env variables, and so at this point, setting
 #  * DOCKER_HOST
@@ -47,6 +56,8 @@ class Image:
     labels: dict[str, str]
     # Env from image config when available (local inspect or skopeo); used when source_location is missing
     env: dict[str, str] | None = None
+    # GOARCH naming, e.g. "amd64"; see UNAME_ARCHITECTURES
+    architecture: str | None = None
 
     @classmethod
     def from_docker(cls, image: docker.models.images.Image, name: str):
@@ -55,7 +66,7 @@ class Image:
         # So we read from both so labels are present when running against Podman (e.g. GHA).
         labels = _labels_from_docker_attrs(image.attrs)
         env = _env_from_docker_attrs(image.attrs)
-        return Image(id=image.id, name=name, labels=labels, env=env)
+        return Image(id=image.id, name=name, labels=labels, env=env, architecture=image.attrs.get("Architecture"))
 
 
 def _labels_from_docker_attrs(attrs: dict[str, Any]) -> dict[str, str]:
@@ -92,6 +103,41 @@ def pytest_addoption(parser: Parser) -> None:
         default=False,
         help="Don't remove images pulled during manifest validation tests",
     )
+    parser.addoption(
+        "--perf-results-dir",
+        default=None,
+        help="Directory to store performance test results in, as <benchmark>/<image digest>.json",
+    )
+    parser.addoption(
+        "--perf-baseline-dir",
+        default=None,
+        help="Results directory of an earlier run; performance tests fail when they regress against it",
+    )
+    parser.addoption(
+        "--perf-regression-threshold",
+        type=float,
+        default=perf_utils.DEFAULT_REGRESSION_THRESHOLD,
+        help="Relative slowdown over the baseline that fails a performance test (default: %(default)s)",
+    )
+    parser.addoption(
+        "--schedule-by-image",
+        action="store_true",
+        default=False,
+        help="With pytest-xdist (-n), run the tests of each --image on one worker, and images side by side"
+        " as long as they fit the CPU and memory budget (see tests/containers/scheduling.py)",
+    )
+    parser.addoption(
+        "--budget-cpus",
+        type=float,
+        default=None,
+        help="CPUs for --schedule-by-image to use (default: the cgroup limit, or all CPUs)",
+    )
+    parser.addoption(
+        "--budget-memory",
+        type=float,
+        default=None,
+        help="GiB of memory for --schedule-by-image to use (default: the cgroup limit, or all memory)",
+    )
 
 
 # https://docs.pytest.org/en/latest/reference/reference.html#pytest.hookspec.pytest_generate_tests
@@ -106,7 +152,22 @@ def pytest_generate_tests(metafunc: Metafunc) -> None:
         metafunc.parametrize(image.__name__, image_option, scope="session")
 
 
+_image_metadata: dict[str, Image] = {}
+_image_metadata_lock = threading.Lock()
+
+
 def get_image_metadata(image: str) -> Image:
+    """Return the metadata of ``image``, from memory if ``resolve_images`` or an earlier call already resolved it."""
+    with _image_metadata_lock:
+        image_metadata = _image_metadata.get(image)
+    if image_metadata is None:
+        image_metadata = _resolve_image_metadata(image)
+        with _image_metadata_lock:
+            image_metadata = _image_metadata.setdefault(image, image_metadata)
+    return image_metadata
+
+
+def _resolve_image_metadata(image: str) -> Image:
     client = testcontainers.core.docker_client.DockerClient()
     try:
         # docker inspect
@@ -115,6 +176,7 @@ def get_image_metadata(image: str) -> Image:
         # skopeo inspect (may be None if skopeo not installed or inspect failed)
         image_info = skopeo_utils.get_image_info(image)
         if image_info is not None and image_info.labels is not None:
+            # the architecture stays unknown, skopeo_utils inspects the amd64 variant of every image
             return Image(id=None, name=image, labels=image_info.labels, env=image_info.env or {})
         # pull & docker inspect
         image_metadata = client.client.images.pull(image)
@@ -123,6 +185,118 @@ def get_image_metadata(image: str) -> Image:
     return Image.from_docker(image_metadata, name=image)
 
 
+def resolve_images(images: Iterable[str], max_workers: int = IMAGE_RESOLVE_WORKERS) -> None:
+    """Resolve the metadata of all ``images`` into memory, for ``get_image_metadata``, pulling the missing ones.
+
+    Local inspects run concurrently. Missing images are inspected with skopeo for their layers and then
+    pulled concurrently in the order of ``pull_waves``. An image that cannot be pulled keeps its skopeo
+    metadata; if it has none, it is left for ``get_image_metadata`` to fail in the tests that need it.
+    """
+    client = testcontainers.core.docker_client.DockerClient().client
+    images = list(dict.fromkeys(images))
+
+    def inspect(image: str) -> docker.models.images.Image | None:
+        try:
+            return client.images.get(image)
+        except docker.errors.ImageNotFound:
+            return None
+
+    def pull(image: str) -> docker.models.images.Image | None:
+        logging.info(f"Pulling {image}")
+        try:
+            return client.images.pull(image)
+        except docker.errors.APIError as e:
+            logging.warning(f"Failed to pull {image}: {e}")
+            return None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        local = dict(zip(images, executor.map(inspect, images), strict=True))
+        missing = [image for image, docker_image in local.items() if docker_image is None]
+        remote = dict(zip(missing, executor.map(skopeo_utils.get_image_info, missing), strict=True))
+        layers = {image: info.rootfs.diff_ids if info is not None else [] for image, info in remote.items()}
+        for wave in pull_waves(layers):
+            local.update(zip(wave, executor.map(pull, wave), strict=True))
+
+    for image, docker_image in local.items():
+        if docker_image is not None:
+            image_metadata = Image.from_docker(docker_image, name=image)
+        elif (image_info := remote.get(image)) is not None:
+            image_metadata = Image(id=None, name=image, labels=image_info.labels, env=image_info.env)
+        else:
+            continue
+        with _image_metadata_lock:
+            _image_metadata[image] = image_metadata
+
+
+def pull_waves(layers: dict[str, list[str]]) -> list[list[str]]:
+    """Order pulls so that images built on the same base do not download its layers side by side.
+
+    ``layers`` maps images to their layer digests, base first. Images are grouped by their first layer.
+    The first wave holds, from every group, the image that shares the most layers with the rest of its
+    group (the bigger one on a tie). The second wave holds the rest of the groups, whose shared layers
+    are present by then. Images with unknown layers are pulled in the first wave.
+
+    >>> pull_waves({"a": ["base", "x"], "b": ["base", "x", "y"], "c": ["other"], "d": [], "e": ["base"]})
+    [['b', 'c', 'd'], ['a', 'e']]
+    """
+    groups: dict[str, list[str]] = {}
+    for image, digests in layers.items():
+        groups.setdefault(digests[0] if digests else f"unknown:{image}", []).append(image)
+
+    def shared(a: str, b: str) -> int:
+        pairs = zip(layers[a], layers[b], strict=False)
+        return sum(1 for _ in itertools.takewhile(lambda pair: pair[0] == pair[1], pairs))
+
+    first, second = [], []
+    for group in groups.values():
+        leader = max(group, key=lambda i: (sum(shared(i, j) for j in group if j != i), len(layers[i])))
+        first.append(leader)
+        second.extend(image for image in group if image != leader)
+    return [wave for wave in (first, second) if wave]
+
+
+def _image_cost(image: str) -> scheduling.Resources:
+    """The cost of testing ``image``, judged by its name label when its metadata has already been resolved."""
+    with _image_metadata_lock:
+        image_metadata = _image_metadata.get(image)
+    name = image_metadata.labels.get("name", "") if image_metadata is not None else ""
+    return scheduling.image_cost(image, name)
+
+
+# https://pytest-xdist.readthedocs.io/en/stable/how-to.html#creating-a-custom-scheduler
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config: pytest.Config, log: Any) -> scheduling.ImageScheduling | None:
+    if not config.getoption("--schedule-by-image"):
+        return None
+    scheduler = scheduling.ImageScheduling(
+        config,
+        log,
+        images=config.getoption("--image"),
+        budget=scheduling.budget_from_config(config),
+        cost=_image_cost,
+    )
+    config.stash[scheduling.SCHEDULER] = scheduler
+    return scheduler
+
+
+# https://pytest-xdist.readthedocs.io/en/stable/how-to.html#controlling-the-number-of-workers
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_auto_num_workers(config: pytest.Config) -> int | None:
+    if not config.getoption("--schedule-by-image"):
+        return None
+    return scheduling.worker_count(scheduling.budget_from_config(config), images=len(config.getoption("--image")))
+
+
+# https://docs.pytest.org/en/latest/reference/reference.html#pytest.hookspec.pytest_terminal_summary
+def pytest_terminal_summary(terminalreporter: pytest.TerminalReporter) -> None:
+    scheduler = terminalreporter.config.stash.get(scheduling.SCHEDULER, None)
+    if scheduler is None:
+        return
+    terminalreporter.section("worker utilization")
+    for line in scheduler.report():
+        terminalreporter.write_line(line)
+
+
 def skip_if_not_workbench_image(image: str) -> Image:
     """Skip unless the image is JupyterLab or code-server (RStudio is no longer in this repo)."""
     image_metadata = get_image_metadata(image)
@@ -157,6 +331,18 @@ def skip_if_not_rocm_image(image: str) -> Image:
     return image_metadata
 
 
+@pytest.fixture(scope="session")
+def perf_options(pytestconfig: pytest.Config) -> perf_utils.PerfOptions:
+    return perf_utils.PerfOptions.from_config(pytestconfig)
+
+
+@pytest.fixture(autouse=True)
+def report_readiness(request: pytest.FixtureRequest) -> Generator[None]:
+    """Attach readiness times measured by ``readiness.wait_until_ready`` to the test's report."""
+    with readiness.report_to(request.node):
+        yield
+
+
 @pytest.fixture(scope="function")
 def tf() -> Generator[TestFrame[Any]]:
     with TestFrame() as tf:
@@ -172,10 +358,23 @@ def image(request):
 
 @pytest.fixture(scope="session")
 def container_arch(image: str) -> str:
-    """Detect the CPU architecture of the container image. Runs once per session."""
+    """The CPU architecture of the container image, as ``uname -m`` reports it."""
+    image_metadata = get_image_metadata(image)
+    if image_metadata.architecture is None:
+        return _uname_arch(image)
+    arch = UNAME_ARCHITECTURES.get(image_metadata.architecture)
+    if arch is None:
+        raise ValueError(
+            f"Unexpected architecture {image_metadata.architecture!r}, expected one of {UNAME_ARCHITECTURES}"
+        )
+    return arch
+
+
+def _uname_arch(image: str) -> str:
+    """Detect the CPU architecture by running the image, when it was only inspected remotely."""
     container = testcontainers.core.container.DockerContainer(image=image, user=0)
     container.with_command("/bin/sh -c 'sleep infinity'")
-    known_architectures = {"x86_64", "aarch64", "s390x", "ppc64le"}
+    known_architectures = set(UNAME_ARCHITECTURES.values())
     try:
         container.start()
         exit_code, output = container.exec(["uname", "-m"])
@@ -317,6 +516,11 @@ def pytest_sessionstart(session: Session) -> None:
             logging.error("Set env variable 'export TESTCONTAINERS_RYUK_DISABLED=true' and try again.")
             raise RuntimeError("Consider disabling Ryuk as per the log messages above.") from e
 
+    # resolve (and pull) all images up front and concurrently, fixtures then get their metadata from memory;
+    # under pytest-xdist only the controller does, before it starts the workers, which inspect the pulled images
+    if not hasattr(session.config, "workerinput"):
+        resolve_images(session.config.getoption("--image"))
+
 
 # https://docs.pytest.org/en/latest/reference/reference.html#pytest.hookspec.pytest_sessionfinish
 def pytest_sessionfinish(session: Session, exitstatus: int | ExitCode) -> None:
@@ -102,9 +102,10 @@ def running_container(
     user: int = 23456,
     group_add: list[int] | None = None,
     env: dict[str, str] | None = None,
+    command: str | list[str] = "/bin/sh -c 'sleep infinity'",
     **kwargs,
 ) -> Generator[testcontainers.core.container.DockerContainer]:
-    """Start a container with 'sleep infinity' and stop it on exit.
+    """Start a container with 'sleep infinity' (or ``command``) and stop it on exit.
 
     GID 0 is always added (OpenShift runs with root supplemental group for /opt/app-root access).
     """
@@ -113,7 +114,7 @@ def running_container(
     if env:
         for key, value in env.items():
             container.with_env(key, value)
-    container.with_command("/bin/sh -c 'sleep infinity'")
+    container.with_command(command)
     try:
         container.start()
         yield container
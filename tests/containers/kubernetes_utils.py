@@ -20,10 +20,11 @@ import ocp_resources.project_request
 import ocp_resources.resource
 import requests
 
+from ci.cached_builds import k8s_watch
 from tests.containers import socket_proxy
 
 if TYPE_CHECKING:
-    from collections.abc import Callable, Generator
+    from collections.abc import Callable, Generator, Mapping
     from socket import socket
 
     from kubernetes.dynamic import DynamicClient, ResourceField
@@ -296,19 +297,16 @@ class PodUtils:
         expect_pods_count: int,
         timeout: float = TestFrameConstants.READINESS_TIMEOUT,
     ) -> None:
-        """Wait for all pods in namespace to be ready"""
+        """Wait for all pods in namespace to be ready.
 
-        # it's a dynamic client with the `resource` parameter already filled in
-        class ResourceType(kubernetes.dynamic.Resource, kubernetes.dynamic.DynamicClient):
-            pass
-
-        resource: ResourceType = client.resources.get(
+        Pod changes are followed with the watch API, so this returns as soon as the last pod turns ready.
+        """
+        resource = client.resources.get(
             kind=ocp_resources.pod.Pod.kind,
             api_version=ocp_resources.pod.Pod.api_version,
         )
 
-        def ready() -> bool:
-            pods = resource.get(namespace=namespace_name, label_selector=label_selector).items  # pyright: ignore[reportCallIssue]
+        def ready(pods: Mapping[str, dict[str, Any]]) -> bool:
             if not pods and expect_pods_count == 0:
                 logging.debug("All expected Pods %s in Namespace %s are ready", label_selector, namespace_name)
                 return True
@@ -319,7 +317,7 @@ class PodUtils:
                 logging.debug("Expected Pods %s/%s are not ready", namespace_name, label_selector)
                 return False
             pod: ResourceField
-            for pod in pods:
+            for pod in (_to_resource_field(raw) for raw in pods.values()):
                 if not Readiness.is_pod_ready(pod) and not Readiness.is_pod_succeeded(pod):
                     if not pod.status.containerStatuses:
                         pod_status = pod.status
@@ -339,14 +337,60 @@ class PodUtils:
             logging.info("Pods matching %s/%s are ready", namespace_name, label_selector)
             return True
 
-        Wait.until(
+        Wait.for_resources(
             description=f"readiness of all Pods matching {label_selector} in Namespace {namespace_name}",
-            poll_interval=TestFrameConstants.GLOBAL_POLL_INTERVAL_MEDIUM,
+            source=DynamicWatchSource(client, resource, namespace=namespace_name, label_selector=label_selector),
+            condition=ready,
             timeout=timeout,
-            ready=ready,
         )
 
 
+def _to_resource_field(value: Any) -> Any:
+    """Wrap a raw watch object like the dynamic client does, for attribute access to nested fields."""
+    if isinstance(value, dict):
+        return kubernetes.dynamic.ResourceField(params={k: _to_resource_field(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_to_resource_field(v) for v in value]
+    return value
+
+
+class DynamicWatchSource:
+    """Lists and watches one kind of resource for ``k8s_watch.wait_for``, using the dynamic client."""
+
+    def __init__(
+        self,
+        client: DynamicClient,
+        resource: kubernetes.dynamic.Resource,
+        namespace: str | None = None,
+        label_selector: str | None = None,
+    ):
+        self.client = client
+        self.resource = resource
+        self.namespace = namespace
+        self.label_selector = label_selector
+
+    def list(self) -> tuple[list[dict[str, Any]], str]:
+        result = self.client.get(self.resource, namespace=self.namespace, label_selector=self.label_selector)
+        raw = result.to_dict()
+        return raw.get("items") or [], raw["metadata"]["resourceVersion"]
+
+    def watch(self, resource_version: str, timeout_seconds: int) -> Generator[dict[str, Any]]:
+        try:
+            for event in self.client.watch(
+                self.resource,
+                namespace=self.namespace,
+                label_selector=self.label_selector,
+                resource_version=resource_version,
+                timeout=timeout_seconds,
+                allow_watch_bookmarks=True,
+            ):
+                yield {"type": event["type"], "object": event["raw_object"]}
+        except kubernetes.client.exceptions.ApiException as e:
+            if e.status == 410:
+                raise k8s_watch.ResourceVersionExpiredError(e.reason) from e
+            raise
+
+
 class Wait:
     @staticmethod
     def until(
@@ -433,6 +477,32 @@ class Wait:
             sleep_time: float = min(poll_interval, time_left)
             time.sleep(sleep_time)
 
+    @staticmethod
+    def for_resources(
+        description: str,
+        source: k8s_watch.WatchSource,
+        condition: Callable[[Mapping[str, dict[str, Any]]], bool],
+        timeout: float,
+        stable_for: float = 0.0,
+    ) -> Mapping[str, dict[str, Any]]:
+        """Watch-based counterpart of ``until`` for conditions on Kubernetes objects.
+
+        Returns as soon as an event makes ``condition`` true, and falls back to polling
+        every ``GLOBAL_POLL_INTERVAL_MEDIUM`` seconds only after a watch error."""
+        try:
+            return k8s_watch.wait_for(
+                description,
+                source,
+                condition,
+                timeout,
+                stable_for=stable_for,
+                poll_interval=TestFrameConstants.GLOBAL_POLL_INTERVAL_MEDIUM,
+            )
+        except TimeoutError as e:
+            wait_exception: WaitError = WaitError(str(e))
+            logging.error(wait_exception)
+            raise wait_exception from e
+
 
 class WaitError(Exception):
     pass
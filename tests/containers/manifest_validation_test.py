@@ -8,7 +8,10 @@ Two approaches are provided:
 
 - **SBOM-based** (fast, ~2s per image): downloads the SBOM artifact attached to the image
   via ``cosign download sbom``, no need to pull the full image. Works when cosign+skopeo
-  are available. For multi-arch images, resolves the amd64 manifest first.
+  are available. For multi-arch images, resolves the amd64 manifest first. The SBOMs of
+  all tags are prefetched concurrently once per session and their parsed package index is
+  cached on disk by image digest (``$SBOM_CACHE_DIR``, default ``~/.cache/notebooks/sbom``),
+  so reruns work offline.
 
 - **pip-list-based** (slow, pulls full image): starts a container and runs ``pip list``.
   Requires a container runtime (podman/docker). More thorough but much slower for large
@@ -28,6 +31,7 @@ incorrectly bumped the N-1 annotation to 5.0, even though the N-1 image still ha
 from __future__ import annotations
 
 import collections
+import concurrent.futures
 import dataclasses
 import json
 import logging
@@ -36,6 +40,8 @@ import pathlib
 import re
 import shutil
 import subprocess
+import tempfile
+import threading
 import urllib.error
 import urllib.request
 from typing import TYPE_CHECKING
@@ -50,6 +56,8 @@ from manifests.tools.package_names import all_workbench_pip_names, manifest_name
 from tests import PROJECT_ROOT
 
 if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable
+
     import testcontainers.core.container
 
 _LOG = logging.getLogger(__name__)
@@ -61,6 +69,11 @@ _SKIP_SOFTWARE: frozenset[str] = frozenset()
 # ``ROCM_VERSION`` in the OCI config instead and may not ship ``rocm-core``.
 _ROCM_VERSION_ENV_KEY = "env:ROCM_VERSION"
 
+# SBOM package indexes are cached here by image digest; set to an empty string to disable
+SBOM_CACHE_DIR_ENV = "SBOM_CACHE_DIR"
+_DEFAULT_SBOM_CACHE_DIR = pathlib.Path.home() / ".cache" / "notebooks" / "sbom"
+_SBOM_FETCH_WORKERS = 8
+
 
 # Packages listed in manifest annotations that are not pip packages.
 def _imagestream_to_source_hint(is_name: str) -> str:
@@ -177,60 +190,142 @@ def _resolve_amd64(image_ref: str) -> str:
 # ---------------------------------------------------------------------------
 
 
-def _packages_from_sbom(image_ref: str, *, source_hint: str = "", python_version: str = "") -> dict[str, str]:
-    """Extract {normalized_name: version} from the SBOM attached to *image_ref*.
-
-    For multi-arch manifest lists, resolves the amd64 image first.
-    Requires ``cosign`` and ``skopeo`` on PATH.
+@dataclasses.dataclass
+class _SbomPackageIndex:
+    """The packages listed in one SBOM, parsed once and indexed by ecosystem.
 
     SBOMs for workbench images are generated by squashing two Syft runs (source
     repo scan + image filesystem scan).  The source scan picks up every
     Pipfile.lock in the monorepo, so the same pypi package can appear multiple
-    times with different versions.  *source_hint* and *python_version* are used
-    to disambiguate duplicates — see :func:`_resolve_pypi_duplicates`.
+    times with different versions; those are kept as candidates and resolved per
+    imagestream by :meth:`packages`.
     """
-    image_ref = _resolve_amd64(image_ref)
 
-    result = subprocess.run(
-        ["cosign", "download", "sbom", image_ref],
-        capture_output=True,
-        text=True,
-        check=True,
-        timeout=60,
-    )
-    sbom = json.loads(result.stdout)
-
-    packages: dict[str, str] = {}
-    pypi_entries: dict[str, list[tuple[str, str]]] = collections.defaultdict(list)
+    # normalized pip name -> [(version, sourceInfo), ...]
+    pypi: dict[str, list[tuple[str, str]]]
+    # ``rpm:*``, ``npm:*`` and ``env:*`` keys -> version
+    other: dict[str, str]
+    _resolved: dict[tuple[str, str], dict[str, str]] = dataclasses.field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_sbom(cls, sbom: dict) -> _SbomPackageIndex:
+        pypi: dict[str, list[tuple[str, str]]] = collections.defaultdict(list)
+        other: dict[str, str] = {}
+        for pkg in sbom.get("packages", []):
+            refs = pkg.get("externalRefs", [])
+            purl = next(
+                (r.get("referenceLocator", "") for r in refs if "purl" in r.get("referenceType", "")),
+                "",
+            )
+            name = pkg.get("name", "")
+            version = pkg.get("versionInfo", "")
+            if not name or not version or version == "UNKNOWN":
+                continue
+            if "pkg:pypi/" in purl:
+                pypi[_normalize_pip_name(name)].append((version, pkg.get("sourceInfo", "")))
+            elif "pkg:rpm/" in purl:
+                # Store RPM packages for software annotation validation
+                # e.g. python3.12=3.12.12-1.el9, cuda-nvcc-12-8=12.8.93-1, rocm-core=6.4.3...
+                other[f"rpm:{name}"] = version
+            elif "pkg:npm/" in purl:
+                key = f"npm:{name}"
+                # npm SBOMs can have multiple versions of the same package
+                # (nested node_modules). We only look up code-server, so just
+                # keep whichever entry isn't 0.0.0 (dev placeholder).
+                if key not in other or other[key] == "0.0.0":
+                    other[key] = version
+        return cls(pypi=dict(pypi), other=other)
+
+    def to_json(self) -> dict:
+        return {"pypi": self.pypi, "other": self.other}
+
+    @classmethod
+    def from_json(cls, data: dict) -> _SbomPackageIndex:
+        pypi = {name: [(version, source) for version, source in entries] for name, entries in data["pypi"].items()}
+        return cls(pypi=pypi, other=data["other"])
+
+    def packages(self, *, source_hint: str = "", python_version: str = "") -> dict[str, str]:
+        """Return {normalized_name: version}, disambiguating pypi duplicates with :func:`_resolve_pypi_duplicates`."""
+        key = (source_hint, python_version)
+        if key not in self._resolved:
+            self._resolved[key] = {**self.other, **_resolve_pypi_duplicates(self.pypi, source_hint, python_version)}
+        return dict(self._resolved[key])
+
+
+class _SbomStore:
+    """Fetches SBOM attestations concurrently and caches their package index on disk by image digest.
+
+    For a digest-pinned reference, both the amd64 digest it resolves to and the SBOM of that
+    digest are immutable, so both are cached (as ``resolved/<digest>`` and ``index/<digest>.json``
+    under *cache_dir*) and reruns do not touch the network. Tag references are resolved again every
+    time, as the tag may have moved. Fetch errors are raised from :meth:`get`.
+    """
 
-    for pkg in sbom.get("packages", []):
-        refs = pkg.get("externalRefs", [])
-        purl = next(
-            (r.get("referenceLocator", "") for r in refs if "purl" in r.get("referenceType", "")),
-            "",
+    def __init__(self, cache_dir: pathlib.Path | None, max_workers: int = _SBOM_FETCH_WORKERS) -> None:
+        self.cache_dir = cache_dir
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._futures: dict[str, concurrent.futures.Future[_SbomPackageIndex]] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, image_refs: Iterable[str]) -> None:
+        for image_ref in image_refs:
+            self._future(image_ref)
+
+    def get(self, image_ref: str) -> _SbomPackageIndex:
+        return self._future(image_ref).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(cancel_futures=True)
+
+    def _future(self, image_ref: str) -> concurrent.futures.Future[_SbomPackageIndex]:
+        with self._lock:
+            if image_ref not in self._futures:
+                self._futures[image_ref] = self._executor.submit(self._load, image_ref)
+            return self._futures[image_ref]
+
+    def _cached(self, kind: str, digest: str) -> pathlib.Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / kind / digest.replace(":", "-")
+
+    @staticmethod
+    def _write(path: pathlib.Path, text: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, suffix=".tmp", delete=False) as f:
+            f.write(text)
+        pathlib.Path(f.name).replace(path)
+
+    def _resolve(self, image_ref: str) -> str:
+        # a tag can move to another image, so only what a digest resolves to is cached
+        _, _, digest = image_ref.rpartition("@")
+        path = self._cached("resolved", digest) if digest.startswith("sha256:") else None
+        if path is not None and path.exists():
+            return path.read_text()
+        resolved = _resolve_amd64(image_ref)
+        if path is not None:
+            self._write(path, resolved)
+        return resolved
+
+    def _load(self, image_ref: str) -> _SbomPackageIndex:
+        amd64_ref = self._resolve(image_ref)
+        digest = amd64_ref.rpartition("@")[2]
+        path = self._cached("index", digest + ".json") if digest.startswith("sha256:") else None
+        if path is not None and path.exists():
+            _LOG.debug(f"Using cached SBOM index for {image_ref}: {path}")
+            return _SbomPackageIndex.from_json(json.loads(path.read_text()))
+
+        result = subprocess.run(
+            ["cosign", "download", "sbom", amd64_ref],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=60,
         )
-        name = pkg.get("name", "")
-        version = pkg.get("versionInfo", "")
-        if not name or not version or version == "UNKNOWN":
-            continue
-        if "pkg:pypi/" in purl:
-            source_info = pkg.get("sourceInfo", "")
-            pypi_entries[_normalize_pip_name(name)].append((version, source_info))
-        elif "pkg:rpm/" in purl:
-            # Store RPM packages for software annotation validation
-            # e.g. python3.12=3.12.12-1.el9, cuda-nvcc-12-8=12.8.93-1, rocm-core=6.4.3...
-            packages[f"rpm:{name}"] = version
-        elif "pkg:npm/" in purl:
-            key = f"npm:{name}"
-            # npm SBOMs can have multiple versions of the same package
-            # (nested node_modules). We only look up code-server, so just
-            # keep whichever entry isn't 0.0.0 (dev placeholder).
-            if key not in packages or packages[key] == "0.0.0":
-                packages[key] = version
-
-    packages.update(_resolve_pypi_duplicates(pypi_entries, source_hint, python_version))
-    _enrich_rocm_version_from_image_config(image_ref, packages)
-    return packages
+        index = _SbomPackageIndex.from_sbom(json.loads(result.stdout))
+        _enrich_rocm_version_from_image_config(amd64_ref, index.other)
+        if path is not None:
+            self._write(path, json.dumps(index.to_json()))
+        return index
 
 
 def _resolve_pypi_duplicates(
@@ -662,11 +757,34 @@ def _iter_old_tags(base_dir: pathlib.Path) -> list[_TagInfo]:
 _BASE_DIRS = [PROJECT_ROOT / "manifests" / "odh" / "base", PROJECT_ROOT / "manifests" / "rhoai" / "base"]
 
 
+def _has_sbom(image_ref: str) -> bool:
+    """Pre-Konflux images in quay.io/modh have no SBOM attached."""
+    return "quay.io/modh/" not in image_ref
+
+
+@pytest.fixture(scope="session")
+def sbom_store() -> Generator[_SbomStore]:
+    """Start fetching the SBOMs of the old tags of all base dirs, so that the downloads overlap."""
+    if not shutil.which("cosign") or not shutil.which("skopeo"):
+        pytest.skip("cosign and/or skopeo not found on PATH")
+
+    cache_dir = os.environ.get(SBOM_CACHE_DIR_ENV, str(_DEFAULT_SBOM_CACHE_DIR))
+    store = _SbomStore(pathlib.Path(cache_dir) if cache_dir else None)
+    try:
+        store.prefetch(
+            t.image_ref for base_dir in _BASE_DIRS for t in _iter_old_tags(base_dir) if _has_sbom(t.image_ref)
+        )
+        yield store
+    finally:
+        store.close()
+
+
 @pytest.mark.manifest_validation
 @pytest.mark.parametrize("base_dir", _BASE_DIRS, ids=["odh", "rhoai"])
 def test_old_tag_annotations_match_sbom(
     subtests: pytest.Subtests,
     base_dir: pathlib.Path,
+    sbom_store: _SbomStore,
 ):
     """Fast: validate N-1 tag annotations against SBOM artifacts (cosign + skopeo, no image pull).
 
@@ -684,23 +802,22 @@ def test_old_tag_annotations_match_sbom(
     (e.g. tensorboard in pytorch images).  Prefer ``test_old_tag_annotations_match_quay``
     when an authoritative per-image check is needed.
     """
-    if not shutil.which("cosign") or not shutil.which("skopeo"):
-        pytest.skip("cosign and/or skopeo not found on PATH")
-
     for t in _iter_old_tags(base_dir):
-        _LOG.info(f"Fetching SBOM for {t.is_name} tag {t.tag_name}: {t.image_ref}")
-        if "quay.io/modh/" in t.image_ref:
+        _LOG.info(f"Checking SBOM for {t.is_name} tag {t.tag_name}: {t.image_ref}")
+        if not _has_sbom(t.image_ref):
             _LOG.info(f"Skipping pre-Konflux image (no SBOM): {t.image_ref}")
             continue
 
-        source_hint = _imagestream_to_source_hint(t.is_name)
-        python_version = _extract_python_version(t.image_ref)
         try:
-            actual_packages = _packages_from_sbom(t.image_ref, source_hint=source_hint, python_version=python_version)
+            index = sbom_store.get(t.image_ref)
         except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as exc:
             with subtests.test(msg=f"{t.is_name} tag {t.tag_name}: SBOM fetch"):
                 pytest.fail(f"Failed to fetch SBOM for {t.image_ref}: {exc}")
             continue
+        actual_packages = index.packages(
+            source_hint=_imagestream_to_source_hint(t.is_name),
+            python_version=_extract_python_version(t.image_ref),
+        )
 
         _compare_manifest_vs_actual(subtests, t.is_name, t.tag_name, t.python_deps, actual_packages)
         _compare_manifest_vs_actual(subtests, t.is_name, t.tag_name, t.software, actual_packages, is_software=True)
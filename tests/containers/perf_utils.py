@@ -0,0 +1,155 @@
+"""Store per-image performance measurements and compare them against a baseline.
+
+Results are written as ``<results dir>/<benchmark>/<image digest>.json``. A baseline is any
+directory laid out the same way, typically the results directory of an earlier run. Baselines
+are looked up by the image ``name`` label rather than by digest, because every build of an
+image gets a new digest; when several baseline files match, the most recent one wins.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import testcontainers.core.docker_client
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    import pytest
+
+LOGGER = logging.getLogger(__name__)
+
+# relative slowdown over the baseline that fails a test, e.g. 0.25 = 25% slower
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class PerfOptions:
+    results_dir: Path | None
+    baseline_dir: Path | None
+    threshold: float
+
+    @classmethod
+    def from_config(cls, config: pytest.Config) -> PerfOptions:
+        results_dir = config.getoption("--perf-results-dir")
+        baseline_dir = config.getoption("--perf-baseline-dir")
+        return cls(
+            results_dir=Path(results_dir) if results_dir else None,
+            baseline_dir=Path(baseline_dir) if baseline_dir else None,
+            threshold=config.getoption("--perf-regression-threshold"),
+        )
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class PerfResult:
+    benchmark: str
+    # the image `name` label, stable across builds
+    image: str
+    digest: str
+    metrics: dict[str, float]
+    details: dict[str, Any] = dataclasses.field(default_factory=dict)
+    timestamp: float = dataclasses.field(default_factory=time.time)
+
+    def to_json(self) -> dict[str, Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_json(cls, data: Mapping[str, Any]) -> PerfResult:
+        return cls(**{field.name: data[field.name] for field in dataclasses.fields(cls) if field.name in data})
+
+
+def image_digest(image: str) -> str:
+    """Return the registry digest of a pulled image, or its local image id if it was never pushed."""
+    client = testcontainers.core.docker_client.DockerClient().client
+    attrs = client.images.get(image).attrs
+    for repo_digest in attrs.get("RepoDigests") or []:
+        _, _, digest = repo_digest.partition("@")
+        if digest:
+            return digest
+    return attrs["Id"]
+
+
+def image_id(image: str) -> str:
+    """Return the local id of a pulled image.
+
+    For an image pulled by tag, ``image_digest`` names the multi-arch manifest list, the same on every platform;
+    the id belongs to the single-platform image that was pulled.
+    """
+    client = testcontainers.core.docker_client.DockerClient().client
+    return client.images.get(image).attrs["Id"]
+
+
+def save_result(results_dir: Path, result: PerfResult) -> Path:
+    path = results_dir / result.benchmark / f"{result.digest.replace(':', '-')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result.to_json(), indent=2, sort_keys=True) + "\n")
+    LOGGER.info(f"Wrote {result.benchmark} results for {result.image} to {path}")
+    return path
+
+
+def load_baseline(baseline_dir: Path, benchmark: str, image: str) -> PerfResult | None:
+    """Return the most recent stored result of ``benchmark`` for the image with the ``name`` label ``image``."""
+    candidates = []
+    for path in sorted((baseline_dir / benchmark).glob("*.json")):
+        try:
+            result = PerfResult.from_json(json.loads(path.read_text()))
+        except (OSError, ValueError, TypeError) as e:
+            LOGGER.warning(f"Ignoring unreadable baseline {path}: {e}")
+            continue
+        if result.image == image:
+            candidates.append(result)
+    return max(candidates, key=lambda r: r.timestamp, default=None)
+
+
+def find_regressions(
+    metrics: Mapping[str, float],
+    baseline: Mapping[str, float],
+    threshold: float,
+    min_delta: Mapping[str, float] | None = None,
+) -> list[str]:
+    """Describe every metric that grew by more than ``threshold`` (relative) over the baseline.
+
+    Metrics are "lower is better". ``min_delta`` holds per-metric absolute growth that is
+    tolerated regardless of the relative threshold, so that noise on tiny values does not fail.
+
+    >>> find_regressions({"a": 1.3, "b": 0.02, "c": 5}, {"a": 1.0, "b": 0.01}, 0.25, {"b": 0.1})
+    ['a: 1.3 > baseline 1 (+30%, threshold 25%)']
+    """
+    regressions = []
+    for name, value in metrics.items():
+        reference = baseline.get(name)
+        if reference is None or reference <= 0:
+            continue
+        if value - reference <= (min_delta or {}).get(name, 0.0):
+            continue
+        growth = value / reference - 1
+        if growth > threshold:
+            regressions.append(
+                f"{name}: {value:.4g} > baseline {reference:.4g} (+{growth:.0%}, threshold {threshold:.0%})"
+            )
+    return regressions
+
+
+def record_and_check(
+    request: pytest.FixtureRequest,
+    options: PerfOptions,
+    result: PerfResult,
+    min_delta: Mapping[str, float] | None = None,
+) -> list[str]:
+    """Attach ``result`` to the test report, store it, and return regressions against the baseline."""
+    for name, value in result.metrics.items():
+        request.node.user_properties.append((f"{result.benchmark}.{name}", value))
+    if options.results_dir is not None:
+        save_result(options.results_dir, result)
+    if options.baseline_dir is None:
+        return []
+    baseline = load_baseline(options.baseline_dir, result.benchmark, result.image)
+    if baseline is None:
+        LOGGER.warning(f"No {result.benchmark} baseline for {result.image} in {options.baseline_dir}")
+        return []
+    return find_regressions(result.metrics, baseline.metrics, options.threshold, min_delta)
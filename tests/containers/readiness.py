@@ -0,0 +1,124 @@
+"""Wait for a server in a container to become ready without sleeping through most of the wait.
+
+``wait_until_ready`` runs a readiness check with exponential backoff that starts in milliseconds,
+and follows the container log meanwhile: a "listening" line from the server wakes the wait up
+immediately and restarts the backoff. A wait therefore ends within milliseconds of the server
+answering, instead of up to a whole fixed polling interval later. The end of the log stream means
+that the container exited, which fails the wait right away.
+
+The measured time is attached to the running test as a ``readiness.<name>`` user property (see
+``report_to``), so the JUnit report doubles as a startup-time record.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Self
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
+    import pytest
+    import testcontainers.core.container
+    from docker.models.containers import Container
+
+LOGGER = logging.getLogger(__name__)
+
+# Jupyter Server: "Jupyter Server 2.16.0 is running at:", code-server: "HTTP server listening on http://..."
+LISTENING_LOG_LINE = re.compile(rb"listening on|is running at", re.IGNORECASE)
+
+INITIAL_DELAY = 0.01
+MAX_DELAY = 1.0
+
+# tests that readiness times are reported to, innermost last
+_report_nodes: list[pytest.Item] = []
+
+
+@contextlib.contextmanager
+def report_to(node: pytest.Item) -> Generator[None]:
+    """Attach readiness times measured in this context to ``node``'s user properties."""
+    _report_nodes.append(node)
+    try:
+        yield
+    finally:
+        _report_nodes.pop()
+
+
+class LogWatcher:
+    """Follows a container's log in a daemon thread.
+
+    ``event`` is set on every line that matches ``pattern``, and when the log ends (``ended``).
+    """
+
+    def __init__(self, container: Container, pattern: re.Pattern[bytes] = LISTENING_LOG_LINE) -> None:
+        self.pattern = pattern
+        self.event = threading.Event()
+        self.ended = False
+        self._stream = container.logs(stream=True, follow=True)
+        self._thread = threading.Thread(target=self._follow, daemon=True)
+
+    def __enter__(self) -> Self:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._stream.close()
+
+    def _follow(self) -> None:
+        tail = b""
+        try:
+            for chunk in self._stream:
+                # chunks are not aligned to lines, so look at the end of the previous one as well
+                if self.pattern.search(tail + chunk):
+                    self.event.set()
+                tail = chunk[-200:]
+        except Exception as e:
+            # closing the stream from __exit__ ends up here as well
+            LOGGER.debug(f"Stopped following container log: {e!r}")
+        finally:
+            self.ended = True
+            self.event.set()
+
+
+def wait_until_ready(
+    container: testcontainers.core.container.DockerContainer,
+    check: Callable[[], bool],
+    *,
+    name: str,
+    timeout: float = 120,
+    initial_delay: float = INITIAL_DELAY,
+    max_delay: float = MAX_DELAY,
+) -> float:
+    """Run ``check`` until it returns true, and return the seconds that took.
+
+    ``check`` must not raise when the server is not up yet; it is called at least once.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    wrapped = container.get_wrapped_container()
+    delay = initial_delay
+    with LogWatcher(wrapped) as watcher:
+        while not check():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{name} did not become ready within {timeout}s")
+            if watcher.ended:
+                wrapped.reload()
+                assert wrapped.status != "exited", f"Container exited before {name} became ready"
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, max_delay)
+            elif watcher.event.wait(min(delay, remaining)):
+                watcher.event.clear()
+                delay = initial_delay
+            else:
+                delay = min(delay * 2, max_delay)
+
+    elapsed = time.monotonic() - started
+    LOGGER.info(f"{name} became ready in {elapsed:.3f}s")
+    if _report_nodes:
+        _report_nodes[-1].user_properties.append((f"readiness.{name}", elapsed))
+    return elapsed
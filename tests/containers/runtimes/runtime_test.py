@@ -1,11 +1,45 @@
 from __future__ import annotations
 
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
 import pathlib
+import tempfile
+import time
+from typing import TYPE_CHECKING
 
 import allure
+import pydantic
 import pytest
 
-from tests.containers import base_image_test, conftest, docker_utils
+from tests.containers import base_image_test, conftest, docker_utils, perf_utils
+
+if TYPE_CHECKING:
+    import testcontainers.core.container
+
+LOGGER = logging.getLogger(__name__)
+
+BENCHMARK = "runtime-checks"
+
+PROTOBUF_TESTUNITS = (
+    pathlib.Path(__file__).resolve().parents[1] / "workbenches" / "jupyterlab" / "protobuf_testunits.py"
+)
+
+# set to a directory, e.g. ~/.cache/notebooks/runtime-checks, to skip checks that already passed on the image
+RUNTIME_CHECK_CACHE_DIR_ENV = "RUNTIME_CHECK_CACHE_DIR"
+
+# absolute growth tolerated on top of the relative threshold
+_MIN_DELTA_S = 0.5
+
+
+class CheckResult(pydantic.BaseModel):
+    exit_code: int
+    output: str
+    seconds: float
+    # read from the cache instead of run in this session
+    cached: bool = False
 
 
 def _is_lean_runtime_image(runtime_image: conftest.Image) -> bool:
@@ -14,91 +48,193 @@ def _is_lean_runtime_image(runtime_image: conftest.Image) -> bool:
     return "-minimal-" in name or "-baseline-" in name
 
 
-class TestRuntimeImage:
-    """Tests for runtime images in this repository."""
+def check_zmq():
+    import zmq  # pyright: ignore reportMissingImports  # ruff: ignore[import-outside-top-level]
+
+    context = zmq.Context()
+    socket = None
+    try:
+        socket = context.socket(zmq.PAIR)
+        print("pyzmq imported and socket created successfully")
+    finally:
+        if socket is not None:
+            socket.close(0)  # linger=0
+        context.term()
+
+
+def check_mlflow():
+    import mlflow  # pyright: ignore reportMissingImports  # ruff: ignore[import-outside-top-level]
+
+    assert hasattr(mlflow, "start_run"), "MLflow does not have start_run function"
+    assert hasattr(mlflow, "log_param"), "MLflow does not have log_param function"
+    print(f"MLflow imported successfully (version: {mlflow.__version__})")
+
+
+def runtime_check_commands(runtime_image: conftest.Image, arch: str) -> dict[str, list[str]]:
+    """The commands of the checks that apply to ``runtime_image``, by the name the tests look them up with."""
+    commands = {
+        # NOTE: /usr/bin/python3 would not find zmq, we need python3 in user's venv
+        "pyzmq": base_image_test.encode_python_function_execution_command_interpreter("python3", check_zmq),
+    }
+    if _is_lean_runtime_image(runtime_image):
+        return commands
+    commands["feast"] = ["/bin/sh", "-c", "feast version"]
+    commands["protobuf"] = [
+        "env",
+        "PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=upb",
+        "python3",
+        f"/opt/app-root/src/{PROTOBUF_TESTUNITS.name}",
+    ]
+    # the native stack is unreliable under CI QEMU user emulation, and an import may never finish there
+    if arch != "s390x":
+        commands["mlflow"] = base_image_test.encode_python_function_execution_command_interpreter(
+            "python3", check_mlflow
+        )
+    return commands
+
+
+class RuntimeCheckCache:
+    """Caches passed check results on disk by image id.
+
+    A check that passed on an image passes again on the same image, as long as the check itself did not change,
+    so results are stored under ``<image id>/<hash of the commands and protobuf_testunits.py>.json`` in
+    *cache_dir*. Failed checks are not stored, they run again next time.
+    """
+
+    def __init__(self, cache_dir: pathlib.Path | None) -> None:
+        self.cache_dir = cache_dir
+
+    def _path(self, image_id: str, commands: dict[str, list[str]]) -> pathlib.Path | None:
+        if self.cache_dir is None:
+            return None
+        definition = json.dumps(commands, sort_keys=True).encode() + PROTOBUF_TESTUNITS.read_bytes()
+        return self.cache_dir / image_id.replace(":", "-") / f"{hashlib.sha256(definition).hexdigest()[:16]}.json"
+
+    def load(self, image_id: str, commands: dict[str, list[str]]) -> dict[str, CheckResult]:
+        path = self._path(image_id, commands)
+        if path is None or not path.exists():
+            return {}
+        LOGGER.debug(f"Using cached runtime check results: {path}")
+        cached = pydantic.TypeAdapter(dict[str, CheckResult]).validate_json(path.read_bytes())
+        return {name: result.model_copy(update={"cached": True}) for name, result in cached.items()}
+
+    def save(self, image_id: str, commands: dict[str, list[str]], results: dict[str, CheckResult]) -> None:
+        path = self._path(image_id, commands)
+        if path is None:
+            return
+        passed = {
+            name: result.model_dump(exclude={"cached"}) for name, result in results.items() if result.exit_code == 0
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, suffix=".tmp", delete=False) as f:
+            json.dump(passed, f)
+        pathlib.Path(f.name).replace(path)
+
+
+def _run_check(container: testcontainers.core.container.DockerContainer, command: list[str]) -> CheckResult:
+    started = time.perf_counter()
+    exit_code, output = container.exec(command)
+    return CheckResult(
+        exit_code=exit_code, output=output.decode(errors="replace"), seconds=time.perf_counter() - started
+    )
+
+
+@pytest.fixture(scope="class")
+def runtime_checks(runtime_image: conftest.Image, container_arch: str) -> dict[str, CheckResult]:
+    """Results of all checks that apply to the image, run as concurrent execs in one container.
+
+    With ``RUNTIME_CHECK_CACHE_DIR`` set, checks that already passed on the same image are not run again (see
+    ``RuntimeCheckCache``); when all of them did, no container is started at all.
+    """
+    commands = runtime_check_commands(runtime_image, container_arch)
+    cache_dir = os.environ.get(RUNTIME_CHECK_CACHE_DIR_ENV)
+    cache = RuntimeCheckCache(pathlib.Path(cache_dir) if cache_dir else None)
+    cache_key = perf_utils.image_id(runtime_image.name)
+
+    results = cache.load(cache_key, commands)
+    pending = {name: command for name, command in commands.items() if name not in results}
+    if pending:
+        with docker_utils.running_container(runtime_image.name) as container:
+            docker_utils.container_cp(container, PROTOBUF_TESTUNITS, "/opt/app-root/src/")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                futures = {name: executor.submit(_run_check, container, command) for name, command in pending.items()}
+            results |= {name: future.result() for name, future in futures.items()}
+        cache.save(cache_key, commands, results)
+    for name, result in results.items():
+        source = "cache" if result.cached else "run"
+        LOGGER.info(f"Runtime check {name}: exit code {result.exit_code} in {result.seconds:.2f}s ({source})")
+    return results
 
-    @allure.description("Check that pyzmq library works correctly, important to check especially on s390x.")
-    def test_pyzmq_import(self, runtime_image: conftest.Image) -> None:
-        def check_zmq():
-            import zmq  # pyright: ignore reportMissingImports  # ruff: ignore[import-outside-top-level]
-
-            context = zmq.Context()
-            socket = None
-            try:
-                socket = context.socket(zmq.PAIR)
-                print("pyzmq imported and socket created successfully")
-            finally:
-                if socket is not None:
-                    socket.close(0)  # linger=0
-                context.term()
 
-        with docker_utils.running_container(runtime_image.name) as container:
-            exit_code, output_bytes = container.exec(
-                # NOTE: /usr/bin/python3 would not find zmq, we need python3 in user's venv
-                base_image_test.encode_python_function_execution_command_interpreter("python3", check_zmq)
-            )
+class TestRuntimeImage:
+    """Tests for runtime images in this repository.
 
-        assert exit_code == 0, f"Python script execution failed. Output: {output_bytes}"
-        assert b"pyzmq imported and socket created successfully" in output_bytes, (
-            f"Expected success message not found in output. Output: {output_bytes}"
+    All checks of an image share one container; see the ``runtime_checks`` fixture."""
+
+    @allure.description("Check that pyzmq library works correctly, important to check especially on s390x.")
+    def test_pyzmq_import(self, runtime_checks: dict[str, CheckResult]) -> None:
+        result = runtime_checks["pyzmq"]
+        assert result.exit_code == 0, f"Python script execution failed. Output: {result.output}"
+        assert "pyzmq imported and socket created successfully" in result.output, (
+            f"Expected success message not found in output. Output: {result.output}"
         )
 
     @allure.description("Check that feast CLI works correctly (imports pyarrow._s3fs transitively).")
-    def test_feast_version(self, runtime_image: conftest.Image) -> None:
+    def test_feast_version(self, runtime_image: conftest.Image, runtime_checks: dict[str, CheckResult]) -> None:
         if _is_lean_runtime_image(runtime_image):
             pytest.skip("Feast is not installed in minimal/baseline runtime images.")
 
-        with docker_utils.running_container(runtime_image.name) as container:
-            exit_code, output_bytes = container.exec(["/bin/sh", "-c", "feast version"])
-
-        output = output_bytes.decode()
-        assert exit_code == 0, f"'feast version' failed: {output}"
+        result = runtime_checks["feast"]
+        assert result.exit_code == 0, f"'feast version' failed: {result.output}"
 
     @allure.issue("AIPCC-13675")
     @allure.description("Force UPB and run protobuf endian/packed roundtrips (catches silent s390x decode bugs).")
-    def test_protobuf_upb_roundtrips(self, runtime_image: conftest.Image) -> None:
+    def test_protobuf_upb_roundtrips(
+        self, runtime_image: conftest.Image, runtime_checks: dict[str, CheckResult]
+    ) -> None:
         if _is_lean_runtime_image(runtime_image):
             pytest.skip("Protobuf/feast stack is not the focus of minimal/baseline runtime images.")
 
-        script = pathlib.Path(__file__).resolve().parents[1] / "workbenches" / "jupyterlab" / "protobuf_testunits.py"
-        with docker_utils.running_container(runtime_image.name) as container:
-            docker_utils.container_cp(container, script, "/opt/app-root/src/")
-            exit_code, output_bytes = container.exec(
-                [
-                    "env",
-                    "PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=upb",
-                    "python3",
-                    "/opt/app-root/src/protobuf_testunits.py",
-                ]
-            )
-
-        output = output_bytes.decode()
-        assert exit_code == 0, f"protobuf_testunits failed: {output}"
+        result = runtime_checks["protobuf"]
+        assert result.exit_code == 0, f"protobuf_testunits failed: {result.output}"
 
     @allure.description("Check that MLflow module imports and core functions are available.")
-    def test_mlflow_import(self, runtime_image: conftest.Image) -> None:
+    def test_mlflow_import(
+        self, runtime_image: conftest.Image, container_arch: str, runtime_checks: dict[str, CheckResult]
+    ) -> None:
         if _is_lean_runtime_image(runtime_image):
             pytest.skip("MLflow is not installed in minimal/baseline runtime images.")
-
-        def check_mlflow():
-            import mlflow  # pyright: ignore reportMissingImports  # ruff: ignore[import-outside-top-level]
-
-            assert hasattr(mlflow, "start_run"), "MLflow does not have start_run function"
-            assert hasattr(mlflow, "log_param"), "MLflow does not have log_param function"
-            print(f"MLflow imported successfully (version: {mlflow.__version__})")
-
-        with docker_utils.running_container(runtime_image.name) as container:
-            exit_code, arch_output = container.exec(["uname", "-m"])
-            arch = arch_output.decode().strip()
-            if exit_code == 0 and arch == "s390x":
-                pytest.skip(
-                    "MLflow import skipped for s390x images (native stack unreliable under CI QEMU user emulation)."
-                )
-            exit_code, output_bytes = container.exec(
-                base_image_test.encode_python_function_execution_command_interpreter("python3", check_mlflow)
+        if container_arch == "s390x":
+            pytest.skip(
+                "MLflow import skipped for s390x images (native stack unreliable under CI QEMU user emulation)."
             )
 
-        assert exit_code == 0, f"Python script execution failed. Output: {output_bytes}"
-        assert b"MLflow imported successfully" in output_bytes, (
-            f"Expected success message not found in output. Output: {output_bytes}"
+        result = runtime_checks["mlflow"]
+        assert result.exit_code == 0, f"Python script execution failed. Output: {result.output}"
+        assert "MLflow imported successfully" in result.output, (
+            f"Expected success message not found in output. Output: {result.output}"
+        )
+
+    @pytest.mark.performance
+    def test_runtime_check_durations(
+        self,
+        request: pytest.FixtureRequest,
+        runtime_image: conftest.Image,
+        runtime_checks: dict[str, CheckResult],
+        perf_options: perf_utils.PerfOptions,
+    ) -> None:
+        """Records how long each check took; they ran side by side, so each duration includes some contention."""
+        measured = {f"{name}_s": r.seconds for name, r in runtime_checks.items() if not r.cached and r.exit_code == 0}
+        if not measured:
+            pytest.skip("No runtime check was run in this session, the results came from the cache")
+
+        result = perf_utils.PerfResult(
+            benchmark=BENCHMARK,
+            image=runtime_image.labels["name"],
+            digest=perf_utils.image_digest(runtime_image.name),
+            metrics=measured,
+        )
+        regressions = perf_utils.record_and_check(
+            request, perf_options, result, min_delta=dict.fromkeys(measured, _MIN_DELTA_S)
         )
+        assert not regressions, f"Runtime checks of {result.image} regressed:\n" + "\n".join(regressions)
@@ -0,0 +1,287 @@
+"""Run the container tests of several images side by side with pytest-xdist, within the machine's resources.
+
+With ``--schedule-by-image``, ``-n`` workers do not take tests one by one: each worker runs all tests of one
+``--image`` at a time, so that the session fixtures of an image are set up in one process only. Images start
+while their estimated cost fits into the CPU and memory budget, which is the cgroup limit of the pytest
+process unless ``--budget-cpus`` and ``--budget-memory`` say otherwise. Heavy images (CUDA, ROCm, and the
+frameworks built on them) cost more than the rest, so fewer of them run at the same time. With ``-n auto``,
+there are as many workers as light images fit into the budget. At the end, the terminal summary reports how
+busy every worker was::
+
+    uv run pytest tests/containers -n auto --schedule-by-image --image=... --image=...
+
+Without ``-n``, tests run serially as before.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+from xdist.scheduler import LoadScopeScheduling
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator, Sequence
+
+    from xdist.remote import Producer
+    from xdist.workermanage import WorkerController
+
+GiB = 1024**3
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+PROC_SELF_CGROUP = Path("/proc/self/cgroup")
+
+# names of images that get the HEAVY_IMAGE cost; same fragments as conftest.skip_if_not_{cuda,rocm}_image look for
+HEAVY_IMAGE_FRAGMENTS = ("cuda", "rocm", "pytorch", "tensorflow")
+
+
+@dataclasses.dataclass(frozen=True)
+class Resources:
+    cpus: float = 0
+    memory: int = 0
+
+    def __add__(self, other: Resources) -> Resources:
+        return Resources(cpus=self.cpus + other.cpus, memory=self.memory + other.memory)
+
+    def fits(self, budget: Resources) -> bool:
+        return self.cpus <= budget.cpus and self.memory <= budget.memory
+
+    def __str__(self) -> str:
+        return f"{self.cpus:g} CPUs, {self.memory / GiB:.1f} GiB memory"
+
+
+# estimated use of the containers that the tests of one image run at a time
+LIGHT_IMAGE = Resources(cpus=1, memory=2 * GiB)
+HEAVY_IMAGE = Resources(cpus=2, memory=6 * GiB)
+
+
+def image_cost(*names: str) -> Resources:
+    """The estimated cost of testing an image, given its reference and/or its `name` label.
+
+    >>> image_cost("quay.io/opendatahub/workbench-images:jupyter-minimal-ubi9-python-3.12") == LIGHT_IMAGE
+    True
+    >>> image_cost("localhost/image:latest", "odh-notebook-jupyter-cuda-pytorch-ubi9-python-3.12") == HEAVY_IMAGE
+    True
+    """
+    if any(fragment in name for name in names for fragment in HEAVY_IMAGE_FRAGMENTS):
+        return HEAVY_IMAGE
+    return LIGHT_IMAGE
+
+
+def parse_cpu_max(cpu_max: str) -> float | None:
+    """CPUs allowed by a cgroup v2 ``cpu.max``, or None when unlimited.
+
+    >>> parse_cpu_max("250000 100000")
+    2.5
+    >>> parse_cpu_max("max 100000") is None
+    True
+    """
+    quota, _, period = cpu_max.strip().partition(" ")
+    if quota == "max":
+        return None
+    return int(quota) / int(period or 100_000)
+
+
+def parse_memory_max(memory_max: str) -> int | None:
+    """Bytes allowed by a cgroup v2 ``memory.max`` or a v1 ``memory.limit_in_bytes``, or None when unlimited.
+
+    >>> parse_memory_max("8589934592")
+    8589934592
+    >>> parse_memory_max("max") is None
+    True
+    """
+    memory_max = memory_max.strip()
+    if memory_max == "max":
+        return None
+    return int(memory_max)
+
+
+def _read(path: Path) -> str | None:
+    try:
+        return path.read_text()
+    except OSError:
+        return None
+
+
+def _cgroup_v2_directories(root: Path, proc_self_cgroup: Path) -> Iterator[Path]:
+    """The cgroup of this process and its ancestors; a limit anywhere on the way up applies."""
+    cgroup = "/"
+    for line in (_read(proc_self_cgroup) or "").splitlines():
+        if line.startswith("0::"):
+            cgroup = line.removeprefix("0::")
+    directory = root / cgroup.lstrip("/")
+    yield directory
+    yield from (parent for parent in directory.parents if parent.is_relative_to(root))
+
+
+def cgroup_budget(root: Path = CGROUP_ROOT, proc_self_cgroup: Path = PROC_SELF_CGROUP) -> Resources:
+    """The CPUs and memory this process may use: its cgroup limits, or the whole machine where there are none."""
+    cpus = float(os.process_cpu_count() or 1)
+    memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+    cpu_limits, memory_limits = [], []
+    for directory in _cgroup_v2_directories(root, proc_self_cgroup):
+        if (cpu_max := _read(directory / "cpu.max")) is not None:
+            cpu_limits.append(parse_cpu_max(cpu_max))
+        if (memory_max := _read(directory / "memory.max")) is not None:
+            memory_limits.append(parse_memory_max(memory_max))
+    # cgroup v1 has no ancestors to look at, a container sees its own limits at the root
+    quota, period = _read(root / "cpu/cpu.cfs_quota_us"), _read(root / "cpu/cpu.cfs_period_us")
+    if quota is not None and period is not None and int(quota) > 0:
+        cpu_limits.append(int(quota) / int(period))
+    if (limit_in_bytes := _read(root / "memory/memory.limit_in_bytes")) is not None:
+        memory_limits.append(parse_memory_max(limit_in_bytes))
+
+    return Resources(
+        cpus=min([cpus, *(limit for limit in cpu_limits if limit is not None)]),
+        memory=min([memory, *(limit for limit in memory_limits if limit is not None)]),
+    )
+
+
+def budget_from_config(config: pytest.Config) -> Resources:
+    budget = cgroup_budget()
+    cpus, memory = config.getoption("--budget-cpus"), config.getoption("--budget-memory")
+    return Resources(
+        cpus=budget.cpus if cpus is None else cpus,
+        memory=budget.memory if memory is None else int(memory * GiB),
+    )
+
+
+def worker_count(budget: Resources, images: int) -> int:
+    """How many workers ``-n auto`` starts: as many as light images fit into the budget, and no more than images.
+
+    >>> worker_count(Resources(cpus=8, memory=12 * GiB), images=10)
+    6
+    >>> worker_count(Resources(cpus=0.5, memory=1 * GiB), images=3)
+    1
+    """
+    fit = min(budget.cpus // LIGHT_IMAGE.cpus, budget.memory // LIGHT_IMAGE.memory)
+    return max(1, min(int(fit), images))
+
+
+def image_of(nodeid: str, images: Iterable[str]) -> str | None:
+    """The ``--image`` a test is parametrized with, from its node id.
+
+    >>> images = ["quay.io/a/image:tag", "quay.io/a/image:tag-cuda"]
+    >>> image_of("tests/containers/base_image_test.py::TestBaseImage::test_oc[quay.io/a/image:tag-cuda]", images)
+    'quay.io/a/image:tag-cuda'
+    >>> image_of("tests/containers/params_env_validation_test.py::test_params_env", images) is None
+    True
+    """
+    _, _, params = nodeid.partition("[")
+    return max((image for image in images if image in params), key=len, default=None)
+
+
+@dataclasses.dataclass
+class WorkerUtilization:
+    tests: int = 0
+    # seconds spent in tests, including the setup and teardown of their containers
+    busy: float = 0
+    scopes: list[str] = dataclasses.field(default_factory=list)
+
+
+class ImageScheduling(LoadScopeScheduling):
+    """``--dist=loadscope`` with all tests of an image as one scope, started only when its cost fits the budget.
+
+    A worker gets the next scope only when it is idle, so that the scopes assigned to workers are the ones that
+    are running. A worker holds back its last test until it gets more tests or is shut down, it needs to know the
+    next test to tear fixtures down in time; so a worker with a single pending test counts as idle. When nothing
+    is running, the next scope starts even if it exceeds the budget.
+    """
+
+    def __init__(
+        self,
+        config: pytest.Config,
+        log: Producer | None,
+        *,
+        images: Sequence[str],
+        budget: Resources,
+        cost: Callable[[str], Resources],
+    ) -> None:
+        super().__init__(config, log)
+        self.images = images
+        self.budget = budget
+        self.cost = cost
+        self.started = time.monotonic()
+        self.utilization: dict[str, WorkerUtilization] = {}
+
+    def schedule(self) -> None:
+        if self.collection is None:
+            # utilization is reported over the time the workers had tests to run
+            self.started = time.monotonic()
+        super().schedule()
+
+    def _split_scope(self, nodeid: str) -> str:
+        return image_of(nodeid, self.images) or super()._split_scope(nodeid)
+
+    def _scope_cost(self, scope: str) -> Resources:
+        return self.cost(scope) if scope in self.images else LIGHT_IMAGE
+
+    def _idle(self, node: WorkerController) -> bool:
+        return self._pending_of(self.assigned_work[node]) <= 1
+
+    def _running(self) -> list[str]:
+        return [
+            scope
+            for node, workload in self.assigned_work.items()
+            if not self._idle(node)
+            for scope, work_unit in workload.items()
+            if not all(work_unit.values())
+        ]
+
+    def _assign_work_unit(self, node: WorkerController) -> None:
+        running = self._running()
+        in_use = sum((self._scope_cost(scope) for scope in running), start=Resources())
+        # heavy scopes first, they take the longest and the light ones fill in around them
+        candidates = sorted(self.workqueue, key=lambda scope: -self._scope_cost(scope).cpus)
+        scope = next((s for s in candidates if not running or (in_use + self._scope_cost(s)).fits(self.budget)), None)
+        if scope is None:
+            self.log(f"{len(self.workqueue)} scopes wait for resources, {in_use} of {self.budget} in use")
+            return
+
+        work_unit = self.workqueue.pop(scope)
+        self.assigned_work.setdefault(node, {})[scope] = work_unit
+        worker_collection = self.registered_collections[node]
+        node.send_runtest_some([worker_collection.index(nodeid) for nodeid, done in work_unit.items() if not done])
+
+    def _reschedule(self, node: WorkerController) -> None:
+        if node.shutting_down:
+            return
+        if not self.workqueue:
+            node.shutdown()
+            return
+        if self._idle(node):
+            self._assign_work_unit(node)
+
+    def mark_test_complete(self, node: WorkerController, item_index: int, duration: float = 0) -> None:
+        super().mark_test_complete(node, item_index, duration)
+        worker = self.utilization.setdefault(node.gateway.id, WorkerUtilization())
+        worker.tests += 1
+        worker.busy += duration
+
+        scope = self._split_scope(self.registered_collections[node][item_index])
+        pending = list(self.assigned_work[node][scope].values()).count(False)
+        if pending == 0:
+            worker.scopes.append(scope)
+        if pending <= 1:
+            # the resources of the finished scope may let a waiting one start on another idle worker
+            for other in self.nodes:
+                if other is not node:
+                    self._reschedule(other)
+
+    def report(self) -> list[str]:
+        elapsed = time.monotonic() - self.started
+        lines = [f"scheduled by image within {self.budget}, in {elapsed:.1f}s"]
+        for worker_id, worker in sorted(self.utilization.items()):
+            lines.append(
+                f"{worker_id}: {len(worker.scopes)} scopes, {worker.tests} tests,"
+                f" busy {worker.busy:.1f}s ({worker.busy / elapsed:.0%}): {', '.join(worker.scopes)}"
+            )
+        return lines
+
+
+SCHEDULER = pytest.StashKey[ImageScheduling]()
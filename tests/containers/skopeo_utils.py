@@ -38,12 +38,21 @@ class SkopeoConfigLayer(BaseModel):
         return parsed_env
 
 
+class RootFs(BaseModel):
+    """Represents the 'rootfs' dictionary in skopeo output."""
+
+    # digests of the uncompressed layers, base image first; images built on the same base share a prefix
+    diff_ids: list[str] = []
+
+
 class SkopeoInspectResult(BaseModel):
     """Root model for 'skopeo inspect --config'."""
 
     model_config = ConfigDict(populate_by_name=True, extra="ignore")
 
+    architecture: str | None = None
     config: SkopeoConfigLayer | None = None
+    rootfs: RootFs = RootFs()
     history: list[HistoryLayer] = []
 
     # Handle Legacy Labels at root
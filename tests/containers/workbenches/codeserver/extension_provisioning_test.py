@@ -0,0 +1,94 @@
+"""Cost of provisioning code-server's bundled extensions into a user's extensions directory.
+
+``run-code-server.sh`` calls ``provision_extensions`` (``utils/extensions.sh``) on every start, with
+the extensions directory on the user's PVC. This measures a first start on an empty directory, a
+warm start on an already provisioned one, and, for reference, the ``cp -r`` of every bundled
+extension that it replaced. Results are stored and compared against a baseline as described in
+``tests/containers/perf_utils.py``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import textwrap
+
+import pytest
+
+from tests.containers import conftest, docker_utils, perf_utils
+
+LOGGER = logging.getLogger(__name__)
+
+BENCHMARK = "codeserver-extension-provisioning"
+
+IMAGE_EXTENSIONS_DIR = "/opt/app-root/extensions-temp"
+EXTENSIONS_SH = "/opt/app-root/bin/utils/extensions.sh"
+
+# absolute growth tolerated on top of the relative threshold
+_MIN_DELTA = {
+    "first_start_s": 0.2,
+    "warm_start_s": 0.1,
+    "first_start_bytes": 64 * 1024,
+    "warm_start_bytes": 4 * 1024,
+}
+
+# prints the timestamps and sizes as JSON; bash cannot do float arithmetic, Python does that
+_SCRIPT = textwrap.dedent(f"""\
+    set -euo pipefail
+    source {EXTENSIONS_SH}
+    pvc=$(mktemp -d)
+    mkdir -p "$pvc/copied"
+
+    t0=$EPOCHREALTIME
+    provision_extensions {IMAGE_EXTENSIONS_DIR} "$pvc/linked" > /dev/null
+    t1=$EPOCHREALTIME
+    first_bytes=$(du -sb "$pvc/linked" | cut -f1)
+    provision_extensions {IMAGE_EXTENSIONS_DIR} "$pvc/linked" > /dev/null
+    t2=$EPOCHREALTIME
+    warm_bytes=$(du -sb "$pvc/linked" | cut -f1)
+    cp -r {IMAGE_EXTENSIONS_DIR}/*/ "$pvc/copied"
+    t3=$EPOCHREALTIME
+    copy_bytes=$(du -sb "$pvc/copied" | cut -f1)
+
+    linked=$(code-server --list-extensions --extensions-dir "$pvc/linked" | sort | paste -sd,)
+    copied=$(code-server --list-extensions --extensions-dir "$pvc/copied" | sort | paste -sd,)
+    printf 'RESULT>{{"t": [%s, %s, %s, %s], "bytes": [%s, %s, %s], "linked": "%s", "copied": "%s"}}\\n' \\
+        "$t0" "$t1" "$t2" "$t3" "$first_bytes" "$warm_bytes" "$copy_bytes" "$linked" "$copied"
+""")
+
+
+@pytest.mark.performance
+def test_extension_provisioning(
+    request: pytest.FixtureRequest, codeserver_image: conftest.Image, perf_options: perf_utils.PerfOptions
+) -> None:
+    with docker_utils.running_container(codeserver_image.name) as container:
+        exit_code, output = container.exec(["bash", "-c", _SCRIPT])
+    text = output.decode(errors="replace")
+    assert exit_code == 0, f"Provisioning benchmark failed:\n{text}"
+    (line,) = (line for line in text.splitlines() if line.startswith("RESULT>"))
+    sample = json.loads(line.removeprefix("RESULT>"))
+    (t0, t1, t2, t3), (first_bytes, warm_bytes, copy_bytes) = sample["t"], sample["bytes"]
+
+    # code-server sees exactly the extensions the copy would have given it
+    assert sample["linked"], f"No extensions found in {IMAGE_EXTENSIONS_DIR}"
+    assert sample["linked"] == sample["copied"]
+
+    result = perf_utils.PerfResult(
+        benchmark=BENCHMARK,
+        image=codeserver_image.labels["name"],
+        digest=perf_utils.image_digest(codeserver_image.name),
+        metrics={
+            "first_start_s": t1 - t0,
+            "warm_start_s": t2 - t1,
+            "first_start_bytes": first_bytes,
+            "warm_start_bytes": warm_bytes - first_bytes,
+        },
+        details={"copy_s": t3 - t2, "copy_bytes": copy_bytes, "extensions": sample["linked"].split(",")},
+    )
+    LOGGER.info(f"{result.image} extension provisioning: {result.metrics} {result.details}")
+
+    # a warm start writes nothing, and a first start writes links, not extension files
+    assert warm_bytes == first_bytes
+    assert first_bytes < copy_bytes / 100
+    regressions = perf_utils.record_and_check(request, perf_options, result, _MIN_DELTA)
+    assert not regressions, f"Extension provisioning of {result.image} regressed:\n" + "\n".join(regressions)
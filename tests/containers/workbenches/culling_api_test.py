@@ -3,7 +3,6 @@ from __future__ import annotations
 import json
 import re
 import shlex
-import time
 from datetime import datetime
 from typing import TYPE_CHECKING, Any
 
@@ -11,7 +10,7 @@ import allure
 import pytest
 
 from tests import PROJECT_ROOT
-from tests.containers import conftest, docker_utils
+from tests.containers import conftest, docker_utils, readiness
 from tests.containers.workbenches.workbench_image_test import WorkbenchContainer
 
 if TYPE_CHECKING:
@@ -53,20 +52,14 @@ def _healthz_url(*, nb_prefix: str | None = None) -> str:
 
 
 def _wait_for_healthz(container: WorkbenchContainer, *, nb_prefix: str | None = None, timeout: float = 120) -> None:
-    """Poll code-server readiness via the platform probe path inside the container."""
+    """Wait for code-server readiness via the platform probe path inside the container."""
     healthz_url = _healthz_url(nb_prefix=nb_prefix)
-    deadline = time.monotonic() + timeout
-
-    while time.monotonic() < deadline:
-        container.get_wrapped_container().reload()
-        assert container.get_wrapped_container().status != "exited", "codeserver container exited during startup"
 
+    def check() -> bool:
         exit_code, _ = container.exec(["curl", "-sS", "-f", "-L", "-o", "/dev/null", "--max-time", "2", healthz_url])
-        if exit_code == 0:
-            return
-        time.sleep(2)
+        return exit_code == 0
 
-    raise TimeoutError(f"code-server healthz did not become ready at {healthz_url} within {timeout}s")
+    readiness.wait_until_ready(container, check, name="codeserver-healthz", timeout=timeout)
 
 
 def _fetch_healthz(container: WorkbenchContainer, *, nb_prefix: str | None = None) -> dict[str, Any]:
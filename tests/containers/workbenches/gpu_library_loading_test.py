@@ -6,6 +6,11 @@ including lazily-loaded CUDA/ROCm modules that aren't caught by static ldd check
 The tests can run without actual GPU hardware - they verify library loading,
 not GPU computation. They use CPU fallback or catch expected "no GPU" errors
 while still validating that libraries are properly installed.
+
+Starting a container costs more than most of the checks, so all tests of an image share one
+container (the ``gpu_container`` fixture) and run each check as an exec in it.
+``TestBatchedLibraryProbe`` checks every library and framework of an image in a single exec,
+and reports the per-library load time as a performance metric.
 """
 
 from __future__ import annotations
@@ -19,11 +24,14 @@ from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
     import types
+    from collections.abc import Generator, Iterable
+
+    import testcontainers.core.container
 
 import pydantic
 import pytest
 
-from tests.containers import conftest, docker_utils
+from tests.containers import conftest, docker_utils, perf_utils
 
 
 class SymlinkCheckResult(pydantic.BaseModel):
@@ -52,8 +60,63 @@ class RocmLibCheckResult(pydantic.BaseModel):
     rocm_lib: str
 
 
+class ProbeResult(pydantic.BaseModel):
+    kind: str
+    name: str
+    found: bool = True
+    path: str | None = None
+    version: str | None = None
+    seconds: float | None = None
+    error: str | None = None
+
+
 LOGGER = logging.getLogger(__name__)
 
+PROBE_BENCHMARK = "gpu-library-load"
+
+# library name -> glob patterns, searched in order; `{purelib}` is the image's site-packages and
+# `{rocm}` is $ROCM_PATH, the unversioned `.so` (shortest name) of the first match is loaded
+CUDA_LIBRARIES: dict[str, list[str]] = {
+    name: [f"{{purelib}}/nvidia/*/lib/{name}.so*", f"/usr/local/cuda/lib64/{name}.so*", f"/usr/lib64/{name}.so*"]
+    for name in [
+        "libcudart",
+        "libcublas",
+        "libcublasLt",
+        "libcudnn",
+        "libcufft",
+        "libcurand",
+        "libcusolver",
+        "libcusparse",
+        "libnccl",
+        "libnvrtc",
+    ]
+}
+ROCM_LIBRARIES: dict[str, list[str]] = {
+    name: [f"{{rocm}}/lib/{name}.so*", f"{{rocm}}/core-*/lib/{name}.so*"]
+    for name in [
+        "libamdhip64",
+        "libhipblaslt",
+        "libhipblas",
+        "libMIOpen",
+        "librocblas",
+        "librocsolver",
+        "librocfft",
+        "librocrand",
+        "librocsparse",
+        "librccl",
+    ]
+}
+# ROCm libraries are installed as a whole, so each of them must be present (see test_rocm_critical_library_loading);
+# of the CUDA libraries, the runtime, cuBLAS and cuDNN are in every CUDA image (from the CUDA base image's packages
+# or the framework's pip wheels), the others depend on what the image installs, so only the found ones must load
+REQUIRED_LIBRARIES = {"cuda": {"libcudart", "libcublas", "libcublasLt", "libcudnn"}, "rocm": set(ROCM_LIBRARIES)}
+FRAMEWORKS = ["torch", "torchvision", "torchaudio", "tensorflow"]
+# for the execs that import TensorFlow, to keep its C++ warnings out of their output
+TENSORFLOW_ENV = {"TF_CPP_MIN_LOG_LEVEL": "2"}
+
+# absolute growth tolerated on top of the relative threshold
+_MIN_DELTA_S = {"library": 0.05, "import": 0.5}
+
 
 def encode_python_function(python: str, function: types.FunctionType, *args: Any) -> list[str]:
     """Returns a cli command that will run the given Python function encoded inline."""
@@ -71,6 +134,36 @@ def encode_python_function(python: str, function: types.FunctionType, *args: Any
     return [python, "-c", program]
 
 
+@pytest.fixture(scope="module")
+def gpu_container(image: str) -> Generator[testcontainers.core.container.DockerContainer]:
+    """The container of a CUDA or ROCm image that all tests in this module exec their checks in."""
+    if "-rocm-" not in conftest.get_image_metadata(image).labels["name"]:
+        conftest.skip_if_not_cuda_image(image)
+    with docker_utils.running_container(image, user=1001) as container:
+        yield container
+
+
+def run_in_container(
+    container: testcontainers.core.container.DockerContainer,
+    test_fn: types.FunctionType,
+    env: dict[str, str] | None = None,
+) -> dict[str, Any]:
+    """Run a test function as an exec in the container and return its result."""
+    cmd = encode_python_function("/opt/app-root/bin/python3", test_fn)
+    execution = docker_utils.container_exec(container.get_wrapped_container(), cmd, environment=env)
+    output_str = execution.output.decode()
+    ecode = execution.poll()
+    if ecode != 0:
+        pytest.fail(f"Container command failed with exit code {ecode}:\n{output_str}")
+
+    for line in output_str.splitlines():
+        LOGGER.debug(line)
+        if line.startswith("RESULT>"):
+            return json.loads(line[len("RESULT>") :])
+
+    pytest.fail(f"Test function did not return a result. Exit code: {ecode}, Output: {output_str}")
+
+
 class TestGPULibraryLoading:
     """Tests that verify GPU libraries can be loaded at runtime.
 
@@ -78,26 +171,14 @@ class TestGPULibraryLoading:
     catching issues that static ldd checks would miss (e.g., when CUDA_MODULE_LOADING=LAZY).
     """
 
-    def _run_in_container(
-        self, image: str, test_fn: types.FunctionType, env: dict[str, str] | None = None
-    ) -> dict[str, Any]:
-        """Run a test function inside a container and return its result."""
-        with docker_utils.running_container(image, user=1001, env=env) as container:
-            cmd = encode_python_function("/opt/app-root/bin/python3", test_fn)
-            ecode, output = container.exec(cmd)
-            output_str = output.decode()
-            if ecode != 0:
-                pytest.fail(f"Container command failed with exit code {ecode}:\n{output_str}")
-
-            for line in output_str.splitlines():
-                LOGGER.debug(line)
-                if line.startswith("RESULT>"):
-                    return json.loads(line[len("RESULT>") :])
-
-            pytest.fail(f"Test function did not return a result. Exit code: {ecode}, Output: {output_str}")
-
     @pytest.mark.parametrize("loading_mode", ["LAZY", "EAGER"])
-    def test_pytorch_cuda_library_loading(self, cuda_image: str, subtests: pytest.Subtests, loading_mode: str):
+    def test_pytorch_cuda_library_loading(
+        self,
+        cuda_image: str,
+        gpu_container: testcontainers.core.container.DockerContainer,
+        subtests: pytest.Subtests,
+        loading_mode: str,
+    ):
         """Test that PyTorch CUDA libraries can be loaded."""
         image_metadata = conftest.get_image_metadata(cuda_image)
         if "-pytorch-" not in image_metadata.labels.get("name", ""):
@@ -207,7 +288,7 @@ class TestGPULibraryLoading:
             return results
 
         env = {"CUDA_MODULE_LOADING": loading_mode}
-        result = self._run_in_container(cuda_image, check_pytorch_cuda_libs, env=env)
+        result = run_in_container(gpu_container, check_pytorch_cuda_libs, env=env)
 
         with subtests.test(f"torch import ({loading_mode})"):
             assert result["imports"].get("torch") is True, f"torch import failed: {result.get('errors')}"
@@ -227,7 +308,9 @@ class TestGPULibraryLoading:
             if any(x in lib for x in ["cuda", "cublas", "cudnn", "nccl", "nvrtc", "torch"]):
                 LOGGER.info(f"  GPU-related lib: {lib}")
 
-    def test_pytorch_rocm_library_loading(self, rocm_image: str, subtests: pytest.Subtests):
+    def test_pytorch_rocm_library_loading(
+        self, rocm_image: str, gpu_container: testcontainers.core.container.DockerContainer, subtests: pytest.Subtests
+    ):
         """Test that PyTorch ROCm libraries can be loaded."""
         image_metadata = conftest.get_image_metadata(rocm_image)
         if "-pytorch-" not in image_metadata.labels.get("name", ""):
@@ -315,7 +398,7 @@ class TestGPULibraryLoading:
 
             return results
 
-        result = self._run_in_container(rocm_image, check_pytorch_rocm_libs)
+        result = run_in_container(gpu_container, check_pytorch_rocm_libs)
 
         with subtests.test("torch import"):
             assert result["imports"].get("torch") is True, f"torch import failed: {result.get('errors')}"
@@ -335,7 +418,9 @@ class TestGPULibraryLoading:
             if any(x in lib for x in ["hip", "rocm", "roc", "mio", "amd", "torch"]):
                 LOGGER.info(f"  ROCm-related lib: {lib}")
 
-    def test_tensorflow_cuda_library_loading(self, cuda_image: str, subtests: pytest.Subtests):
+    def test_tensorflow_cuda_library_loading(
+        self, cuda_image: str, gpu_container: testcontainers.core.container.DockerContainer, subtests: pytest.Subtests
+    ):
         """Test that TensorFlow CUDA libraries can be loaded."""
         image_metadata = conftest.get_image_metadata(cuda_image)
         if "-tensorflow-" not in image_metadata.labels.get("name", ""):
@@ -343,10 +428,6 @@ class TestGPULibraryLoading:
 
         def check_tensorflow_cuda_libs():
             """Check TensorFlow CUDA library loading - runs inside container."""
-            import os
-
-            os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"  # Suppress TF warnings
-
             results = {
                 "imports": {},
                 "operations": {},
@@ -398,7 +479,7 @@ class TestGPULibraryLoading:
 
             return results
 
-        result = self._run_in_container(cuda_image, check_tensorflow_cuda_libs)
+        result = run_in_container(gpu_container, check_tensorflow_cuda_libs, env=TENSORFLOW_ENV)
 
         with subtests.test("tensorflow import"):
             assert result["imports"].get("tensorflow") is True, f"TensorFlow import failed: {result.get('errors')}"
@@ -414,7 +495,9 @@ class TestGPULibraryLoading:
 
         LOGGER.info(f"TensorFlow devices: {result.get('devices')}")
 
-    def test_tensorflow_rocm_library_loading(self, rocm_image: str, subtests: pytest.Subtests):
+    def test_tensorflow_rocm_library_loading(
+        self, rocm_image: str, gpu_container: testcontainers.core.container.DockerContainer, subtests: pytest.Subtests
+    ):
         """Test that TensorFlow ROCm libraries can be loaded."""
         image_metadata = conftest.get_image_metadata(rocm_image)
         if "-tensorflow-" not in image_metadata.labels.get("name", ""):
@@ -422,10 +505,6 @@ class TestGPULibraryLoading:
 
         def check_tensorflow_rocm_libs():
             """Check TensorFlow ROCm library loading - runs inside container."""
-            import os
-
-            os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
-
             results = {
                 "imports": {},
                 "operations": {},
@@ -474,7 +553,7 @@ class TestGPULibraryLoading:
 
             return results
 
-        result = self._run_in_container(rocm_image, check_tensorflow_rocm_libs)
+        result = run_in_container(gpu_container, check_tensorflow_rocm_libs, env=TENSORFLOW_ENV)
 
         with subtests.test("tensorflow import"):
             assert result["imports"].get("tensorflow") is True, f"TensorFlow import failed: {result.get('errors')}"
@@ -487,7 +566,9 @@ class TestGPULibraryLoading:
 
         LOGGER.info(f"TensorFlow devices: {result.get('devices')}")
 
-    def test_rocm_critical_library_loading(self, rocm_image: str, subtests: pytest.Subtests):
+    def test_rocm_critical_library_loading(
+        self, rocm_image: str, gpu_container: testcontainers.core.container.DockerContainer, subtests: pytest.Subtests
+    ):
         """Verify critical ROCm compute libraries can be loaded via ctypes.
 
         Uses ctypes.cdll.LoadLibrary to attempt loading each critical ROCm library.
@@ -564,7 +645,7 @@ class TestGPULibraryLoading:
 
             return results
 
-        raw = self._run_in_container(rocm_image, check_rocm_libs)
+        raw = run_in_container(gpu_container, check_rocm_libs)
         result = RocmLibCheckResult.model_validate(raw)
 
         with subtests.test("all critical ROCm libs found"):
@@ -594,7 +675,9 @@ class TestGPULibraryLoading:
 class TestLibrarySymlinks:
     """Tests that verify library symlinks are correctly set up."""
 
-    def test_rocm_devendor_symlinks(self, rocm_image: str, subtests: pytest.Subtests):
+    def test_rocm_devendor_symlinks(
+        self, rocm_image: str, gpu_container: testcontainers.core.container.DockerContainer, subtests: pytest.Subtests
+    ):
         """Verify that PyTorch's de-vendored ROCm libraries are correctly symlinked."""
         image_metadata = conftest.get_image_metadata(rocm_image)
         if "-pytorch-" not in image_metadata.labels.get("name", ""):
@@ -663,32 +746,161 @@ class TestLibrarySymlinks:
 
             return results
 
-        with docker_utils.running_container(rocm_image, user=1001) as container:
-            cmd = encode_python_function("/opt/app-root/bin/python3", check_symlinks)
-            ecode, output = container.exec(cmd)
-            if ecode != 0:
-                pytest.fail(f"Symlink check failed with exit code {ecode}:\n{output.decode()}")
-
-            result = None
-            for line in output.decode().splitlines():
-                if line.startswith("RESULT>"):
-                    result = SymlinkCheckResult.model_validate(json.loads(line[len("RESULT>") :]))
-                    break
-
-            if result is None:
-                pytest.fail(f"Failed to get symlink check result: {output.decode()}")
-                return  # unreachable, but helps type narrowing
-
-            with subtests.test("no broken symlinks"):
-                assert len(result.broken) == 0, f"Broken symlinks: {result.broken}"
-
-            with subtests.test("key symlinks present"):
-                # Allow some libraries to be missing if they're optional
-                critical_libs = ["libamdhip64.so", "librocblas.so", "libMIOpen.so", "libhipblaslt.so"]
-                critical_missing = [lib for lib in critical_libs if lib in result.missing]
-                assert len(critical_missing) == 0, f"Critical symlinks missing: {critical_missing}"
-
-            LOGGER.info(f"Symlinks checked: {len(result.symlinks)}")
-            LOGGER.info(f"Missing (may be optional): {result.missing}")
-            if result.hipsparselt_in_rocm:
-                LOGGER.warning("hipsparselt exists in ROCm but not symlinked to torch/lib")
+        result = SymlinkCheckResult.model_validate(run_in_container(gpu_container, check_symlinks))
+
+        with subtests.test("no broken symlinks"):
+            assert len(result.broken) == 0, f"Broken symlinks: {result.broken}"
+
+        with subtests.test("key symlinks present"):
+            # Allow some libraries to be missing if they're optional
+            critical_libs = ["libamdhip64.so", "librocblas.so", "libMIOpen.so", "libhipblaslt.so"]
+            critical_missing = [lib for lib in critical_libs if lib in result.missing]
+            assert len(critical_missing) == 0, f"Critical symlinks missing: {critical_missing}"
+
+        LOGGER.info(f"Symlinks checked: {len(result.symlinks)}")
+        LOGGER.info(f"Missing (may be optional): {result.missing}")
+        if result.hipsparselt_in_rocm:
+            LOGGER.warning("hipsparselt exists in ROCm but not symlinked to torch/lib")
+
+
+class TestBatchedLibraryProbe:
+    """Checks all libraries and frameworks of an image with one exec in the shared container.
+
+    ``probe_libraries`` runs every check in the same exec, each in a freshly forked child of
+    a bare interpreter. That keeps the load times independent of the order of the checks
+    (nothing is loaded yet when a check starts) and turns a crash in ``dlopen`` into a failed
+    check instead of a lost exec. Results are streamed back as they complete and expanded
+    into one subtest per library and framework.
+    """
+
+    def test_batched_library_probe(
+        self,
+        request: pytest.FixtureRequest,
+        subtests: pytest.Subtests,
+        image: str,
+        gpu_container: testcontainers.core.container.DockerContainer,
+        perf_options: perf_utils.PerfOptions,
+    ):
+        image_metadata = conftest.get_image_metadata(image)
+        accelerator = "rocm" if "-rocm-" in image_metadata.labels["name"] else "cuda"
+        libraries = ROCM_LIBRARIES if accelerator == "rocm" else CUDA_LIBRARIES
+
+        cmd = encode_python_function("/opt/app-root/bin/python3", probe_libraries, libraries, FRAMEWORKS)
+        # the probe imports TensorFlow too
+        execution = docker_utils.container_exec(
+            gpu_container.get_wrapped_container(), cmd, stream=True, environment=TENSORFLOW_ENV
+        )
+        results, output = _read_probe_results(execution.output)
+        ecode = execution.poll()
+        assert ecode == 0, f"Library probe failed with exit code {ecode}:\n{output}"
+        assert len(results) == len(libraries) + len(FRAMEWORKS), f"Library probe did not finish:\n{output}"
+
+        metrics: dict[str, float] = {}
+        for result in results:
+            with subtests.test(f"{result.kind} {result.name}"):
+                if not result.found:
+                    if result.kind == "library" and result.name in REQUIRED_LIBRARIES[accelerator]:
+                        pytest.fail(f"{result.name} not found in {image}")
+                    pytest.skip(f"{result.name} is not installed")
+                assert result.error is None, f"{result.kind} {result.name} ({result.path}): {result.error}"
+                assert result.seconds is not None
+                metrics[f"{result.kind}/{result.name}"] = result.seconds
+
+        perf_result = perf_utils.PerfResult(
+            benchmark=PROBE_BENCHMARK,
+            image=image_metadata.labels["name"],
+            digest=perf_utils.image_digest(image),
+            metrics=metrics,
+            details={r.name: r.path or r.version for r in results if r.found and r.error is None},
+        )
+        regressions = perf_utils.record_and_check(
+            request,
+            perf_options,
+            perf_result,
+            min_delta={name: _MIN_DELTA_S[name.partition("/")[0]] for name in metrics},
+        )
+        assert not regressions, f"Library load time of {perf_result.image} regressed:\n" + "\n".join(regressions)
+
+
+def _read_probe_results(chunks: Iterable[bytes]) -> tuple[list[ProbeResult], str]:
+    """Collect the ``PROBE>`` lines of a streamed ``probe_libraries`` exec, logging each as it arrives."""
+    results = []
+    lines = []
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        for line in (c.decode(errors="replace") for c in complete):
+            lines.append(line)
+            if line.startswith("PROBE>"):
+                result = ProbeResult.model_validate_json(line.removeprefix("PROBE>"))
+                LOGGER.info(f"  {result.kind} {result.name}: {result.error or result.seconds}")
+                results.append(result)
+            else:
+                LOGGER.debug(line)
+    lines.append(buffer.decode(errors="replace"))
+    return results, "\n".join(lines)
+
+
+def probe_libraries(libraries: dict, frameworks: list) -> int:
+    """Runs inside the container: dlopen every library and import every framework, each in a forked child.
+
+    Prints one ``PROBE>`` JSON line per check as soon as it completes and returns the number of checks.
+    Must stay self-contained and runnable by the image's Python (see ``encode_python_function``);
+    in particular, signature annotations are evaluated there, so they can only use builtins.
+    """
+    import ctypes
+    import glob
+    import importlib
+    import importlib.util
+    import json
+    import os
+    import sysconfig
+    import time
+
+    placeholders = {"purelib": sysconfig.get_paths()["purelib"], "rocm": os.environ.get("ROCM_PATH", "/opt/rocm")}
+
+    def load_library(patterns: list) -> dict:
+        for pattern in patterns:
+            matches = sorted(glob.glob(pattern.format(**placeholders)), key=lambda path: (len(path), path))
+            if matches:
+                break
+        else:
+            return {"found": False}
+        started = time.perf_counter()
+        ctypes.CDLL(matches[0], mode=os.RTLD_NOW | os.RTLD_GLOBAL)
+        return {"path": matches[0], "seconds": time.perf_counter() - started}
+
+    def import_framework(name: str) -> dict:
+        if importlib.util.find_spec(name) is None:
+            return {"found": False}
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        return {"version": str(getattr(module, "__version__", "")), "seconds": time.perf_counter() - started}
+
+    checks = [("library", name, load_library, patterns) for name, patterns in libraries.items()]
+    checks += [("import", name, import_framework, name) for name in frameworks]
+    for kind, name, check, argument in checks:
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            try:
+                result = check(argument)
+            except BaseException as e:
+                result = {"error": f"{type(e).__name__}: {e}"}
+            with os.fdopen(write_end, "w") as f:
+                json.dump(result, f)
+            os._exit(0)
+        os.close(write_end)
+        with os.fdopen(read_end) as f:
+            payload = f.read()
+        _, status = os.waitpid(pid, 0)
+        if payload:
+            result = json.loads(payload)
+        elif os.WIFSIGNALED(status):
+            result = {"error": f"killed by signal {os.WTERMSIG(status)}"}
+        else:
+            result = {"error": f"exited with {os.WEXITSTATUS(status)} without a result"}
+        print("PROBE>" + json.dumps({"kind": kind, "name": name, **result}), flush=True)
+    return len(checks)
@@ -0,0 +1,162 @@
+"""Python import-time profile of images.
+
+Every interpreter start pays for the ``.pth`` hooks in site-packages (the Jupyter images install
+``jupyter/utils/usercustomize.pth``, which imports ``monkey_patch_protobuf_6x``), and every kernel
+start additionally pays for ``ipykernel`` and whatever frameworks the notebook imports. This test
+runs ``python3 -X importtime`` in the image for each of these scenarios, parses the import tree
+into per-module cumulative times, and fails when the total or any of the slowest modules regress
+against a baseline (see ``tests/containers/perf_utils.py``). That catches new ``.pth`` hooks,
+broken lazy imports, and bytecode that is missing or cannot be written.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+import re
+
+import pytest
+
+from tests.containers import conftest, docker_utils, perf_utils
+
+LOGGER = logging.getLogger(__name__)
+
+BENCHMARK = "import-time"
+
+# scenario name -> module to import; `None` is the bare interpreter start
+SCENARIOS: dict[str, str | None] = {
+    "interpreter": None,
+    # ipykernel_launcher itself only starts the kernel under `__main__`, the kernel application is what it imports
+    "kernel-launcher": "ipykernel.kernelapp",
+    "pandas": "pandas",
+    "torch": "torch",
+    "tensorflow": "tensorflow",
+}
+
+# each scenario runs this many times and the fastest run counts, which takes the
+# page cache out of the picture but still catches bytecode that is never cached
+REPEATS = 3
+# slowest modules (by cumulative time) of each scenario that are compared to the baseline
+TOP_N = 10
+# absolute growth tolerated on top of the relative threshold
+_MIN_DELTA_S = 0.05
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    # 0 for modules imported directly by the scenario (or by site), 1 for their imports, ...
+    depth: int
+
+
+def parse_importtime(output: str) -> list[ImportTime]:
+    """Parse the ``-X importtime`` report, ignoring any other output; top-level imports have no indent.
+
+    >>> report = '''import time: self [us] | cumulative | imported package
+    ... import time:       226 |        226 |       _json
+    ... import time:       532 |        757 |     json.scanner
+    ... import time:       477 |       9031 |   json.decoder
+    ... some warning
+    ... import time:       519 |        519 |   json.encoder
+    ... import time:       322 |       9871 | json'''
+    >>> [(i.module, i.cumulative_us, i.depth) for i in parse_importtime(report)]
+    [('_json', 226, 3), ('json.scanner', 757, 2), ('json.decoder', 9031, 1), ('json.encoder', 519, 1), ('json', 9871, 0)]
+    """
+    entries = []
+    for line in output.splitlines():
+        if match := _IMPORTTIME_LINE.match(line):
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append(ImportTime(module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def cumulative_seconds(entries: list[ImportTime]) -> dict[str, float]:
+    """Per-module cumulative import time in seconds, plus the ``total`` of the top-level imports.
+
+    >>> cumulative_seconds([ImportTime("a.b", 200, 200, 1), ImportTime("a", 700, 900, 0), ImportTime("c", 100, 100, 0)])
+    {'a.b': 0.0002, 'a': 0.0009, 'c': 0.0001, 'total': 0.001}
+    """
+    report = {entry.module: entry.cumulative_us / 1e6 for entry in entries}
+    report["total"] = sum(entry.cumulative_us for entry in entries if entry.depth == 0) / 1e6
+    return report
+
+
+def fastest(reports: list[dict[str, float]]) -> dict[str, float]:
+    """Combine several runs by taking the minimum time of every module.
+
+    >>> fastest([{"a": 2.0, "total": 3.0}, {"a": 1.0, "total": 4.0}])
+    {'a': 1.0, 'total': 3.0}
+    """
+    combined: dict[str, float] = {}
+    for report in reports:
+        for module, seconds in report.items():
+            combined[module] = min(seconds, combined.get(module, seconds))
+    return combined
+
+
+def top_modules(report: dict[str, float], n: int) -> dict[str, float]:
+    """The ``n`` modules with the highest cumulative time, without the ``total``.
+
+    >>> top_modules({"a": 1.0, "b": 3.0, "c": 2.0, "total": 6.0}, 2)
+    {'b': 3.0, 'c': 2.0}
+    """
+    modules = sorted((item for item in report.items() if item[0] != "total"), key=lambda item: -item[1])
+    return dict(modules[:n])
+
+
+@pytest.mark.performance
+def test_import_time(
+    request: pytest.FixtureRequest, subtests: pytest.Subtests, image: str, perf_options: perf_utils.PerfOptions
+) -> None:
+    image_metadata = conftest.get_image_metadata(image)
+    metrics: dict[str, float] = {}
+    details: dict[str, dict[str, float]] = {}
+
+    with docker_utils.running_container(image, env={"TF_CPP_MIN_LOG_LEVEL": "2"}) as container:
+        modules = [module for module in SCENARIOS.values() if module is not None]
+        # find_spec of a submodule imports its parent package, and fails when that is not installed
+        find_specs = (
+            "import importlib.util, json; print(json.dumps("
+            f"{{m: importlib.util.find_spec(m.partition('.')[0]) is not None for m in {modules!r}}}))"
+        )
+        exit_code, output = container.exec(["python3", "-c", find_specs])
+        if exit_code != 0:
+            pytest.skip(f"Image {image} has no usable python3: {output.decode(errors='replace')}")
+        available: dict[str, bool] = json.loads(output.decode().splitlines()[-1])
+
+        for scenario, module in SCENARIOS.items():
+            with subtests.test(scenario):
+                if module is not None and not available[module]:
+                    pytest.skip(f"{module} is not installed")
+                command = ["python3", "-X", "importtime", "-c", f"import {module}" if module else "pass"]
+                reports = []
+                for _ in range(REPEATS):
+                    exit_code, output = container.exec(command)
+                    text = output.decode(errors="replace")
+                    assert exit_code == 0, f"{' '.join(command)} failed:\n{text}"
+                    reports.append(cumulative_seconds(parse_importtime(text)))
+                report = fastest(reports)
+
+                top = top_modules(report, TOP_N)
+                details[scenario] = top
+                metrics[f"{scenario}/total"] = report["total"]
+                metrics.update({f"{scenario}/{name}": seconds for name, seconds in top.items()})
+                slowest = "\n".join(f"  {seconds * 1000:9.1f} ms  {name}" for name, seconds in top.items())
+                LOGGER.info(f"{scenario}: {report['total']:.3f} s, slowest modules:\n{slowest}")
+
+    result = perf_utils.PerfResult(
+        benchmark=BENCHMARK,
+        image=image_metadata.labels["name"],
+        digest=perf_utils.image_digest(image),
+        metrics=metrics,
+        details=details,
+    )
+    regressions = perf_utils.record_and_check(
+        request, perf_options, result, min_delta=dict.fromkeys(metrics, _MIN_DELTA_S)
+    )
+    assert not regressions, f"Import time of {result.image} regressed:\n" + "\n".join(regressions)
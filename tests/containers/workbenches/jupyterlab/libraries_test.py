@@ -1,51 +1,156 @@
 from __future__ import annotations
 
+import logging
 import pathlib
 from typing import TYPE_CHECKING
 
-from tests.containers import docker_utils
+import pydantic
+import pytest
+
+from tests.containers import docker_utils, perf_utils
 from tests.containers.workbenches.workbench_image_test import WorkbenchContainer, grab_and_check_logs
 
 if TYPE_CHECKING:
-    import pytest
+    from collections.abc import Iterable, Iterator
+
+    from docker.models.containers import Container
 
     from tests.containers.conftest import Image
 
+LOGGER = logging.getLogger(__name__)
+
+BENCHMARK = "jupyterlab-library-testunits"
+
+CONTAINER_SRC_DIR = "/opt/app-root/src"
+TESTUNITS = ("libraries_testunits.py", "protobuf_testunits.py")
+RUNNER = "testunits_runner.py"
+
+# absolute growth tolerated on top of the relative threshold
+_MIN_DELTA = {"duration_s": 1.0, "import_s": 0.5, "peak_rss_bytes": 64 * 1024**2}
+
+
+class UnitResult(pydantic.BaseModel):
+    """A ``TESTUNIT>`` line of testunits_runner.py."""
+
+    id: str
+    status: str
+    message: str = ""
+    output: str = ""
+    # missing when the test's process died
+    duration_s: float | None = None
+    import_s: float | None = None
+    peak_rss_bytes: int | None = None
+
 
 class TestWorkbenchImage:
     """Tests for workbench images in this repository.
     A workbench image is an image running a web IDE that listens on port 8888."""
 
-    def test_image_entrypoint_starts(self, subtests: pytest.Subtests, jupyterlab_datascience_image: Image) -> None:
+    def test_image_entrypoint_starts(
+        self,
+        subtests: pytest.Subtests,
+        jupyterlab_datascience_image: Image,
+    ) -> None:
         with WorkbenchContainer(image=jupyterlab_datascience_image.name, user=1000, group_add=[0]) as container:
             try:
                 container.start()
                 # check explicitly that we can connect to the ide running in the workbench
                 with subtests.test("Attempting to connect to the workbench..."):
                     container._connect()
-                src_dir = pathlib.Path(__file__).parent
-                for script in ("libraries_testunits.py", "protobuf_testunits.py"):
-                    docker_utils.container_cp(
-                        container.get_wrapped_container(),
-                        src_dir / script,
-                        "/opt/app-root/src/",
-                    )
-                ecode, stdout = container.exec(
-                    [
-                        "env",
-                        f"IMAGE={jupyterlab_datascience_image.labels['name']}",
-                        # Force UPB before any google.protobuf import (see protobuf_testunits.py).
-                        "PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=upb",
-                        "bash",
-                        "-c",
-                        (
-                            "python3 /opt/app-root/src/libraries_testunits.py"
-                            " && python3 /opt/app-root/src/protobuf_testunits.py"
-                        ),
-                    ]
-                )
-                stdout_decoded = stdout.decode()
-                print(stdout_decoded)
-                assert ecode == 0, stdout_decoded
+                # every test unit runs in its own process, concurrently, and is reported as a subtest when it finishes
+                execution = _exec_testunits_runner(container.get_wrapped_container(), jupyterlab_datascience_image)
+                plan: list[str] = []
+                output: list[str] = []
+                results = {}
+                for result in _stream_testunit_results(execution.output, plan, output):
+                    results[result.id] = result
+                    with subtests.test(result.id):
+                        if result.status == "skipped":
+                            pytest.skip(result.message)
+                        assert result.status == "passed", f"{result.message}\n{result.output}"
+                ecode = execution.poll()
+                assert plan, "\n".join(output)
+                assert results.keys() == set(plan), "Test units did not finish:\n" + "\n".join(output)
+                assert ecode == 0, "\n".join(output)
             finally:
                 grab_and_check_logs(subtests, container)
+
+    @pytest.mark.performance
+    def test_testunit_durations(
+        self,
+        request: pytest.FixtureRequest,
+        jupyterlab_datascience_image: Image,
+        perf_options: perf_utils.PerfOptions,
+    ) -> None:
+        """Records the duration, import time and peak RSS of every test unit and compares them against a baseline.
+
+        The units run one at a time here; the concurrent run above shares the CPUs and the disk cache between
+        them, which makes its numbers depend on the machine and on which units happened to overlap."""
+        with docker_utils.running_container(jupyterlab_datascience_image.name, user=1000) as container:
+            execution = _exec_testunits_runner(
+                container.get_wrapped_container(), jupyterlab_datascience_image, "--workers", "1"
+            )
+            output: list[str] = []
+            results = list(_stream_testunit_results(execution.output, [], output))
+            assert execution.poll() == 0, "\n".join(output)
+
+        metrics = {
+            f"{name}/{r.id}": value
+            for r in results
+            if r.status == "passed"
+            for name, value in (
+                ("duration_s", r.duration_s),
+                ("import_s", r.import_s),
+                ("peak_rss_bytes", r.peak_rss_bytes),
+            )
+            if value is not None
+        }
+        perf_result = perf_utils.PerfResult(
+            benchmark=BENCHMARK,
+            image=jupyterlab_datascience_image.labels["name"],
+            digest=perf_utils.image_digest(jupyterlab_datascience_image.name),
+            metrics=metrics,
+        )
+        regressions = perf_utils.record_and_check(
+            request, perf_options, perf_result, min_delta={name: _MIN_DELTA[name.partition("/")[0]] for name in metrics}
+        )
+        assert not regressions, f"Test units of {perf_result.image} regressed:\n" + "\n".join(regressions)
+
+
+def _exec_testunits_runner(container: Container, image: Image, *runner_args: str) -> docker_utils.ContainerExec:
+    """Copy testunits_runner.py and the test units into ``container`` and start the runner on them, streamed."""
+    src_dir = pathlib.Path(__file__).parent
+    for script in (RUNNER, *TESTUNITS):
+        docker_utils.container_cp(container, src_dir / script, CONTAINER_SRC_DIR)
+    return docker_utils.container_exec(
+        container,
+        ["python3", f"{CONTAINER_SRC_DIR}/{RUNNER}", *runner_args, *(f"{CONTAINER_SRC_DIR}/{t}" for t in TESTUNITS)],
+        stream=True,
+        environment={
+            "IMAGE": image.labels["name"],
+            # Force UPB before any google.protobuf import (see protobuf_testunits.py).
+            "PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION": "upb",
+        },
+    )
+
+
+def _stream_testunit_results(chunks: Iterable[bytes], plan: list[str], output: list[str]) -> Iterator[UnitResult]:
+    """Yield the ``TESTUNIT>`` lines of a streamed testunits_runner.py exec as they arrive.
+
+    The ``PLAN>`` test ids are added to ``plan``; all lines, results included, to ``output``.
+    """
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        for line in (c.decode(errors="replace") for c in complete):
+            output.append(line)
+            if line.startswith("PLAN>"):
+                plan.extend(pydantic.TypeAdapter(list[str]).validate_json(line.removeprefix("PLAN>")))
+            elif line.startswith("TESTUNIT>"):
+                result = UnitResult.model_validate_json(line.removeprefix("TESTUNIT>"))
+                LOGGER.info(f"  {result.id}: {result.status} in {result.duration_s}s (imports {result.import_s}s)")
+                yield result
+            else:
+                LOGGER.debug(line)
+    output.append(buffer.decode(errors="replace"))
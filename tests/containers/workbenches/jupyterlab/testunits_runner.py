@@ -0,0 +1,174 @@
+"""Runs the unittest tests of the given files concurrently, each in a fresh Python process.
+
+This is run inside images by libraries_test.py, with the image's python3, so it must stay stdlib-only and
+runnable by the oldest Python in the images. It first prints a ``PLAN>`` JSON line with the ids of all tests,
+then one ``TESTUNIT>`` JSON line per test as soon as that test finishes: its status, message and output, how
+long it took, how much of that was spent importing modules, and the peak RSS of its process. As every test
+gets its own interpreter, import times do not depend on which test happened to import a library first, and a
+test that crashes the interpreter fails alone instead of hiding the rest. Concurrent tests compete for the CPUs
+and the disk, so timings meant to be compared between runs are taken with ``--workers 1``.
+
+    python3 testunits_runner.py [--workers N] libraries_testunits.py protobuf_testunits.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import builtins
+import concurrent.futures
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+def load_module(path: str):
+    spec = importlib.util.spec_from_file_location(Path(path).stem, path)
+    assert spec is not None and spec.loader is not None, f"Cannot load {path}"
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def list_tests(path: str) -> list[str]:
+    """Ids of the tests in ``path``, in the order unittest would run them."""
+
+    def flatten(suite):
+        for test in suite:
+            if isinstance(test, unittest.TestSuite):
+                yield from flatten(test)
+            else:
+                yield test
+
+    return [test.id() for test in flatten(unittest.defaultTestLoader.loadTestsFromModule(load_module(path)))]
+
+
+class ImportTimer:
+    """Replaces ``builtins.__import__`` and adds up the time spent in outermost imports.
+
+    >>> timer = ImportTimer()
+    >>> with timer:
+    ...     import json
+    >>> 0 < timer.seconds < 1
+    True
+    """
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self._depth = 0
+        self._import = builtins.__import__
+
+    def __enter__(self):
+        builtins.__import__ = self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        builtins.__import__ = self._import
+
+    def __call__(self, *args, **kwargs):
+        if self._depth:
+            return self._import(*args, **kwargs)
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return self._import(*args, **kwargs)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self._depth -= 1
+
+
+def outcome(result: unittest.TestResult) -> tuple[str, str]:
+    """The status of a single test run, and the traceback or skip reason that goes with it."""
+    if result.errors:
+        return "error", result.errors[0][1]
+    if result.failures:
+        return "failed", result.failures[0][1]
+    if result.unexpectedSuccesses:
+        return "failed", "unexpected success"
+    if result.skipped:
+        return "skipped", result.skipped[0][1]
+    if not result.testsRun:
+        return "error", "no test ran"
+    return "passed", ""
+
+
+def run_test(path: str, test_id: str) -> dict:
+    """Runs one test in this process; the class and module fixtures around it run as well."""
+    result = unittest.TestResult()
+    started = time.perf_counter()
+    with ImportTimer() as timer:
+        module = load_module(path)
+        name = test_id.removeprefix(f"{module.__name__}.")
+        unittest.TestSuite([unittest.defaultTestLoader.loadTestsFromName(name, module)]).run(result)
+    status, message = outcome(result)
+    return {
+        "status": status,
+        "message": message,
+        "duration_s": time.perf_counter() - started,
+        "import_s": timer.seconds,
+        # kilobytes on Linux
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def run_test_process(path: str, test_id: str) -> dict:
+    """Runs one test in a child process of this script and collects its result and output."""
+    fd, result_file = tempfile.mkstemp(prefix="testunit-", suffix=".json")
+    os.close(fd)
+    try:
+        process = subprocess.run(
+            [sys.executable, "-u", __file__, "--run", path, test_id, "--result-file", result_file],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            check=False,
+        )
+        payload = Path(result_file).read_text()
+    finally:
+        os.unlink(result_file)
+
+    if payload:
+        result = json.loads(payload)
+    elif process.returncode < 0:
+        result = {"status": "error", "message": f"killed by signal {-process.returncode}"}
+    else:
+        result = {"status": "error", "message": f"exited with {process.returncode} without a result"}
+    return {"id": test_id, **result, "output": process.stdout.decode(errors="replace")}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="files with unittest test cases")
+    parser.add_argument("--workers", type=int, default=len(os.sched_getaffinity(0)), help="concurrent tests")
+    parser.add_argument("--run", nargs=2, metavar=("FILE", "TEST_ID"), help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        result = run_test(*args.run)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        Path(args.result_file).write_text(json.dumps(result))
+        return 0
+
+    tests = [(path, test_id) for path in args.files for test_id in list_tests(path)]
+    print("PLAN>" + json.dumps([test_id for _, test_id in tests]), flush=True)
+    started = time.perf_counter()
+    failed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(run_test_process, path, test_id) for path, test_id in tests]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            failed += result["status"] in ("failed", "error")
+            print("TESTUNIT>" + json.dumps(result), flush=True)
+    print(f"{len(tests)} tests in {time.perf_counter() - started:.1f}s with {args.workers} workers, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
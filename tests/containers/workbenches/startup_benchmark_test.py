@@ -0,0 +1,283 @@
+"""Cold-start latency of workbench images.
+
+The workbench is started the way the image would start it (its entrypoint and command), but
+wrapped by a small sampler: the sampler is the container's command, and starts the image's
+entrypoint as its child, so that it can time the startup phases:
+
+* ``create_to_exec_s``: from creating the container until the sampler executes the entrypoint,
+  that is the container start plus the sampler's Python startup; both timestamps come from the
+  clock of the container host (the container's ``Created`` time and ``time.time()`` in the sampler),
+* ``exec_to_listen_s``: until something listens on the notebook port,
+* ``listen_to_probe_s``: until the readiness probe first succeeds; the probe has the semantics of
+  ``probe_once`` in ``codeserver/ubi9-python-3.12/test/probe_check.py`` (GET with a 1 s timeout,
+  2xx/3xx is success), but is retried every ``_SAMPLE_INTERVAL`` seconds instead of every
+  ``PERIOD`` seconds, to measure the server and not the kubelet schedule.
+
+The sampler also reports the peak RSS and the CPU seconds of the entrypoint's process tree
+(``start-notebook.sh`` or ``run-code-server.sh`` and everything they start) until readiness.
+Results are stored and compared against a baseline as described in ``tests/containers/perf_utils.py``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import pydantic
+import pytest
+import testcontainers.core.docker_client
+
+from tests.containers import conftest, docker_utils, perf_utils
+from tests.containers.workbenches.gpu_library_loading_test import encode_python_function
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+LOGGER = logging.getLogger(__name__)
+
+BENCHMARK = "workbench-startup"
+
+NOTEBOOK_PORT = 8888
+PROBE_NAMESPACE = "benchmark"
+PROBE_NAME = "startup"
+STARTUP_TIMEOUT = 300
+# inside the container
+STARTUP_LOG = "/tmp/startup-benchmark.log"  # ruff: ignore[hardcoded-temp-file]
+
+# readiness probe of the odh-dashboard Deployment, same as in probe_check.py
+PROBE_INITIAL_DELAY = 10
+PROBE_PERIOD = 5
+
+_SAMPLE_INTERVAL = 0.05
+
+# absolute growth tolerated on top of the relative threshold, to keep noise on small values from failing
+_MIN_DELTA = {
+    "create_to_exec_s": 0.5,
+    "exec_to_listen_s": 0.5,
+    "listen_to_probe_s": 0.5,
+    "startup_s": 1.0,
+    "cpu_seconds": 1.0,
+    "peak_rss_bytes": 32 * 1024 * 1024,
+}
+
+
+class StartupSample(pydantic.BaseModel):
+    # time.time() in the container when the entrypoint was executed
+    exec_at: float
+    exec_to_listen_s: float | None = None
+    listen_to_probe_s: float | None = None
+    peak_rss_bytes: int = 0
+    cpu_seconds: float = 0.0
+    probe_status: str = ""
+    error: str | None = None
+    # tail of the entrypoint's output, when it failed
+    log: str = ""
+
+
+@pytest.mark.performance
+def test_workbench_startup_latency(
+    request: pytest.FixtureRequest, workbench_image: str, perf_options: perf_utils.PerfOptions
+) -> None:
+    image_metadata = conftest.get_image_metadata(workbench_image)
+    client = testcontainers.core.docker_client.DockerClient().client
+    config = client.images.get(workbench_image).attrs["Config"]
+    command = [*(config.get("Entrypoint") or []), *(config.get("Cmd") or [])]
+    assert command, f"Image {workbench_image} has neither an entrypoint nor a command"
+
+    nb_prefix = f"/notebook/{PROBE_NAMESPACE}/{PROBE_NAME}"
+    sampler = encode_python_function(
+        "python3",
+        measure_startup,
+        command,
+        NOTEBOOK_PORT,
+        f"{nb_prefix}/api",
+        STARTUP_TIMEOUT,
+        _SAMPLE_INTERVAL,
+        STARTUP_LOG,
+    )
+
+    with docker_utils.running_container(
+        workbench_image, env=_platform_env(nb_prefix), entrypoint=sampler[0], command=sampler[1:]
+    ) as container:
+        wrapped = container.get_wrapped_container()
+        wrapped.reload()
+        created = _docker_timestamp(wrapped.attrs["Created"])
+        # the container exits once the sampler is done, which ends the stream
+        sample = StartupSample.model_validate(json.loads(_read_sampler_output(wrapped.logs(stream=True, follow=True))))
+    if sample.error is not None:
+        LOGGER.error(f"{command} output:\n{sample.log}")
+    assert sample.error is None, sample.error
+    assert sample.exec_to_listen_s is not None and sample.listen_to_probe_s is not None
+
+    create_to_exec_s = sample.exec_at - created
+    startup_s = create_to_exec_s + sample.exec_to_listen_s + sample.listen_to_probe_s
+    result = perf_utils.PerfResult(
+        benchmark=BENCHMARK,
+        image=image_metadata.labels["name"],
+        digest=perf_utils.image_digest(workbench_image),
+        metrics={
+            "create_to_exec_s": create_to_exec_s,
+            "exec_to_listen_s": sample.exec_to_listen_s,
+            "listen_to_probe_s": sample.listen_to_probe_s,
+            "startup_s": startup_s,
+            "peak_rss_bytes": sample.peak_rss_bytes,
+            "cpu_seconds": sample.cpu_seconds,
+        },
+        details={
+            "command": command,
+            "probe_status": sample.probe_status,
+            "kubelet_ready_s": _kubelet_ready_s(startup_s),
+        },
+    )
+    LOGGER.info(f"{result.image} startup: {result.metrics} {result.details}")
+
+    regressions = perf_utils.record_and_check(request, perf_options, result, _MIN_DELTA)
+    assert not regressions, f"Startup of {result.image} regressed:\n" + "\n".join(regressions)
+
+
+def _platform_env(nb_prefix: str) -> dict[str, str]:
+    """The env notebook-controller injects for a workbench served under ``nb_prefix``."""
+    notebook_args = " ".join(
+        [
+            f"--ServerApp.port={NOTEBOOK_PORT}",
+            "--ServerApp.token=''",
+            "--ServerApp.password=''",
+            f"--ServerApp.base_url={nb_prefix}",
+            "--ServerApp.quit_button=False",
+        ]
+    )
+    return {"NB_PREFIX": nb_prefix, "NOTEBOOK_ARGS": notebook_args}
+
+
+def _read_sampler_output(chunks: Iterable[bytes]) -> str:
+    """Return the sampler's result from the container output."""
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.startswith(b"RESULT>"):
+                return line.removeprefix(b"RESULT>").decode()
+    raise AssertionError(f"The sampler exited without a result: {buffer.decode(errors='replace')}")
+
+
+def _docker_timestamp(timestamp: str) -> float:
+    """Parse an RFC 3339 timestamp with nanoseconds, as Docker and Podman report them.
+
+    >>> _docker_timestamp("2025-03-01T12:00:00.123456789Z")
+    1740830400.123456
+    """
+    return datetime.fromisoformat(re.sub(r"(\.\d{6})\d+", r"\1", timestamp).replace("Z", "+00:00")).timestamp()
+
+
+def _kubelet_ready_s(startup_s: float) -> float:
+    """When the kubelet would first see the workbench Ready, given the probe's initial delay and period.
+
+    >>> _kubelet_ready_s(3.0), _kubelet_ready_s(10.0), _kubelet_ready_s(12.5)
+    (10, 10, 15)
+    """
+    return PROBE_INITIAL_DELAY + PROBE_PERIOD * max(0, math.ceil((startup_s - PROBE_INITIAL_DELAY) / PROBE_PERIOD))
+
+
+def measure_startup(
+    command: list[str], port: int, probe_path: str, timeout: float, interval: float, log_file: str
+) -> dict:
+    """Runs as the container's command: start ``command`` and sample it until the readiness probe passes.
+
+    Must stay self-contained and runnable by the image's Python (see ``encode_python_function``);
+    in particular, signature annotations are evaluated there, so they can only use builtins.
+    """
+    import http.client
+    import os
+    import subprocess
+    import time
+
+    result: dict = {"peak_rss_bytes": 0, "exec_at": time.time()}
+    started = time.monotonic()
+    with open(log_file, "wb") as log:
+        process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    clock_ticks = os.sysconf("SC_CLK_TCK")
+    port_hex = f"{port:04X}"
+    cpu_ticks: dict[int, int] = {}
+
+    def sample() -> None:
+        """Add up RSS and CPU time of the process tree rooted at the entrypoint."""
+        parents, stats = {}, {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    stat = f.read()
+            except OSError:
+                continue
+            # fields after "pid (comm) ", so field N of proc_pid_stat(5) is at index N - 3
+            fields = stat[stat.rindex(")") + 2 :].split()
+            parents[int(entry)] = int(fields[1])
+            stats[int(entry)] = fields
+        tree = {process.pid}
+        grown = True
+        while grown:
+            children = {pid for pid, ppid in parents.items() if ppid in tree} - tree
+            tree |= children
+            grown = bool(children)
+        rss = 0
+        for pid in tree & stats.keys():
+            fields = stats[pid]
+            cpu_ticks[pid] = int(fields[11]) + int(fields[12])
+            rss += int(fields[21]) * page_size
+        result["peak_rss_bytes"] = max(result["peak_rss_bytes"], rss)
+        result["cpu_seconds"] = sum(cpu_ticks.values()) / clock_ticks
+
+    def listening() -> bool:
+        for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+            try:
+                with open(table) as f:
+                    next(f)
+                    for line in f:
+                        fields = line.split()
+                        if fields[3] == "0A" and fields[1].rsplit(":", 1)[1] == port_hex:
+                            return True
+            except OSError:
+                continue
+        return False
+
+    def probe_once() -> tuple[bool, str]:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        try:
+            conn.request("GET", probe_path)
+            status = conn.getresponse().status
+            return 200 <= status < 400, str(status)
+        except Exception as e:
+            return False, str(e)
+        finally:
+            conn.close()
+
+    def failed(error: str) -> dict:
+        result["error"] = error
+        with open(log_file, "rb") as f:
+            result["log"] = f.read()[-64 * 1024 :].decode(errors="replace")
+        return result
+
+    listen_at = None
+    while time.monotonic() - started < timeout:
+        sample()
+        if process.poll() is not None:
+            return failed(f"{command} exited with {process.returncode} before it became ready")
+        if listen_at is None and listening():
+            listen_at = time.monotonic()
+            result["exec_to_listen_s"] = listen_at - started
+        if listen_at is not None:
+            ok, result["probe_status"] = probe_once()
+            if ok:
+                result["listen_to_probe_s"] = time.monotonic() - listen_at
+                sample()
+                return result
+        time.sleep(interval)
+    return failed(f"{command} did not become ready within {timeout} s")
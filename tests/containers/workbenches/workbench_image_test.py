@@ -7,7 +7,6 @@ import pathlib
 import platform
 import tempfile
 import time
-import urllib.error
 import urllib.request
 from typing import TYPE_CHECKING, Self
 
@@ -17,9 +16,8 @@ import pytest
 import testcontainers.core.container
 import testcontainers.core.docker_client
 import testcontainers.core.network
-import testcontainers.core.waiting_utils
 
-from tests.containers import docker_utils, kubernetes_utils, podman_machine_utils
+from tests.containers import docker_utils, kubernetes_utils, podman_machine_utils, readiness
 
 if TYPE_CHECKING:
     from types import TracebackType
@@ -205,43 +203,39 @@ class WorkbenchContainer(testcontainers.core.container.DockerContainer):
         self.port = port
         self.with_exposed_ports(self.port)
 
-    @testcontainers.core.waiting_utils.wait_container_is_ready(urllib.error.URLError)
     def _connect(
-        self, container_host: str | None = None, container_port: int | None = None, base_url: str = ""
+        self,
+        container_host: str | None = None,
+        container_port: int | None = None,
+        base_url: str = "",
+        timeout: float = 120,
     ) -> None:
         """
         :param container_host: overrides the container host IP in connection check to use direct access
         :param container_port: overrides the container port
         :param base_url: needs to be with a leading /
+        :param timeout: seconds to wait for the IDE to answer
         """
-        # are we still alive?
-        self.get_wrapped_container().reload()
-        assert self.get_wrapped_container().status != "exited"
-
-        # connect
         host = container_host or self.get_container_host_ip()
         # Podman publishes IPv4 ports; connecting to "localhost" may resolve to ::1 first.
         if host == "localhost":
             host = "127.0.0.1"
         port = container_port or self.get_exposed_port(self.port)
-        try:
-            # host may be an ipv6 address, need to be careful with formatting this
-            host_for_url = f"[{host}]" if ":" in host else host
-            # /api redirects to /codeserver/healthz/ and avoids the / -> /codeserver/ hop
-            # (absolute redirects on / previously broke Podman port-forward readiness checks).
-            probe_path = base_url or "/api"
-            result = urllib.request.urlopen(
-                urllib.request.Request(f"http://{host_for_url}:{port}{probe_path}"), timeout=1
-            )
-        except urllib.error.URLError as e:
-            raise e
+        # host may be an ipv6 address, need to be careful with formatting this
+        host_for_url = f"[{host}]" if ":" in host else host
+        # /api redirects to /codeserver/healthz/ and avoids the / -> /codeserver/ hop
+        # (absolute redirects on / previously broke Podman port-forward readiness checks).
+        probe_path = base_url or "/api"
+        url = f"http://{host_for_url}:{port}{probe_path}"
+
+        def check() -> bool:
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url), timeout=1) as result:
+                    return result.status == 200
+            except OSError, http.client.HTTPException:
+                return False
 
-        # get /
-        try:
-            if result.status != 200:
-                raise ConnectionError(f"Failed to connect to container, {result.status=}")
-        finally:
-            result.close()
+        readiness.wait_until_ready(self, check, name="workbench", timeout=timeout)
 
     def __enter__(self) -> Self:
         return self
@@ -284,20 +278,14 @@ class WorkbenchContainer(testcontainers.core.container.DockerContainer):
 
 
 def _wait_for_http_inside_container(container: WorkbenchContainer, port: int = 8888, timeout: float = 120) -> None:
-    """Poll HTTP readiness from inside the container (for network-isolated containers where port publishing is unavailable)."""
+    """Wait for HTTP readiness from inside the container (for network-isolated containers where port publishing is unavailable)."""
     check_script = f"import urllib.request; urllib.request.urlopen('http://localhost:{port}', timeout=2)"
-    deadline = time.monotonic() + timeout
-    while True:
-        container.get_wrapped_container().reload()
-        status = container.get_wrapped_container().status
-        assert status != "exited", f"Container exited unexpectedly (status={status})"
 
+    def check() -> bool:
         exit_code, _ = container.exec(["python", "-c", check_script])
-        if exit_code == 0:
-            return
-        if time.monotonic() > deadline:
-            raise TimeoutError(f"HTTP server on port {port} did not become ready within {timeout}s")
-        time.sleep(2)
+        return exit_code == 0
+
+    readiness.wait_until_ready(container, check, name="workbench-inside", timeout=timeout)
 
 
 def grab_and_check_logs(
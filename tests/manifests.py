@@ -3,7 +3,8 @@ from __future__ import annotations
 
 import dataclasses
 import enum
-import shlex
+import functools
+import re
 import shutil
 import subprocess
 import sys
@@ -13,7 +14,7 @@ from pathlib import Path
 import pytest
 
 if typing.TYPE_CHECKING:
-    from collections.abc import Generator, Iterable
+    from collections.abc import Generator
 
 ROOT_DIR = Path(__file__).parent.parent
 
@@ -32,6 +33,30 @@ CODESERVER_NOTEBOOK_ID = "codeserver"
 
 MAKE = shutil.which("gmake") or shutil.which("make")
 
+SHELL_SCRIPT_PATH = ROOT_DIR / "scripts/test_jupyter_with_papermill.sh"
+
+_CALL_IMAGE_RECIPE = re.compile(r"^\t\$\(call image,\$@,(?P<dockerfile>.+)\)$", re.MULTILINE)
+_MAKE_VARIABLE = re.compile(r"\$\((\w+)\)")
+
+# Runs the shell implementation for every target passed as an argument, in a single bash process. Every target
+# gets a subshell that sources the script for it, as `test_jupyter_with_papermill.sh <target>` would, and prints
+# "<target>\t<notebook id>\t<manifest path>", or "<target>\tERROR\t<output>" when a function fails.
+_SHELL_BATCH = r"""
+script=$1
+shift
+for target in "$@"; do
+    (
+        set -- "$target" && source "$script" && set --
+        notebook_workload_name=$target
+        notebook_id=$(_get_notebook_id) || { printf '%s\tERROR\t%s\n' "$target" "$notebook_id"; exit; }
+        filepath=$(_get_source_of_truth_filepath "$notebook_id") || { printf '%s\tERROR\t%s\n' "$target" "$filepath"; exit; }
+        printf '%s\t%s\t%s\n' "$target" "$notebook_id" "$filepath"
+    )
+    # sourcing may exit without a trailing newline, keep the next target on its own line
+    echo
+done
+"""
+
 
 @enum.unique
 class NotebookType(enum.Enum):
@@ -195,6 +220,99 @@ def get_source_of_truth_filepath(
     return manifests_directory / "base" / filename
 
 
+@dataclasses.dataclass(frozen=True)
+class MakefileTarget:
+    """An image target of the Makefile and the Dockerfile it builds, relative to ROOT_DIR."""
+
+    name: str
+    dockerfile: Path
+
+    @property
+    def directory(self) -> Path:
+        return self.dockerfile.parent
+
+
+def parse_makefile_targets(database: str, variables: dict[str, str]) -> dict[str, MakefileTarget]:
+    r"""
+    Parses the `all-images` targets and their Dockerfiles out of `make --print-data-base` output.
+
+    Recipes are printed unexpanded, so make variables in the Dockerfile path are expanded from `variables`.
+
+    >>> database = '''all-images: a-3.12 b-3.12
+    ...
+    ... # Not a target:
+    ... a-3.12:
+    ... #  recipe to execute (from 'Makefile', line 190):
+    ... \t$(call image,$@,jupyter/a/ubi9-python-$(V)/Dockerfile.konflux.cpu)
+    ...
+    ... b-3.12:
+    ... \t$(call image,$@,b/ubi9-python-$(V)/Dockerfile.konflux.cuda)'''
+    >>> targets = parse_makefile_targets(database, {"V": "3.12"})
+    >>> list(targets), targets["a-3.12"].directory
+    (['a-3.12', 'b-3.12'], PosixPath('jupyter/a/ubi9-python-3.12'))
+    """
+    all_images = re.search(r"^all-images:\s+([^#]*)$", database, re.MULTILINE)
+    if all_images is None:
+        raise ValueError("No 'all-images' target in the Makefile database")
+    names = all_images.group(1).split()
+
+    targets = {}
+    for entry in database.split("\n\n"):
+        lines = [line for line in entry.splitlines() if line and not line.startswith("#")]
+        if not lines or (recipe := _CALL_IMAGE_RECIPE.search(entry)) is None:
+            continue
+        name = lines[0].partition(":")[0]
+        dockerfile = _MAKE_VARIABLE.sub(lambda m: variables[m.group(1)], recipe["dockerfile"])
+        targets[name] = MakefileTarget(name=name, dockerfile=Path(dockerfile))
+
+    if missing := [name for name in names if name not in targets]:
+        raise ValueError(f"No `$(call image,...)` recipe for Makefile targets {missing}")
+    return {name: targets[name] for name in names}
+
+
+@functools.cache
+def makefile_targets(release_python_version: str) -> dict[str, MakefileTarget]:
+    """The image targets of the Makefile, from a single `make` run per session."""
+    # TODO(jdanek): should systematize import paths to avoid this hack
+    sys.path.insert(0, str(ROOT_DIR / "ci/cached-builds"))
+    from ci.cached_builds import makefile_helper  # ruff: ignore[import-outside-top-level]
+
+    variables = {"RELEASE_PYTHON_VERSION": release_python_version}
+    database = makefile_helper.dry_run_makefile(target="all-images", makefile_dir=ROOT_DIR, env=variables)
+    return parse_makefile_targets(database, variables)
+
+
+@dataclasses.dataclass(frozen=True)
+class ShellResults:
+    # target -> (notebook id, source of truth filepath)
+    results: dict[str, tuple[str, str]]
+    # everything the script printed, for diagnostics
+    output: str
+
+
+def run_shell_implementation(targets: list[str]) -> ShellResults:
+    """Runs `_get_notebook_id` and `_get_source_of_truth_filepath` for all `targets` in a single bash process."""
+    process = subprocess.run(
+        ["/bin/bash", "-c", _SHELL_BATCH, "bash", str(SHELL_SCRIPT_PATH), *targets],
+        env={},
+        stdout=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    results = {}
+    for line in process.stdout.splitlines():
+        target, _, rest = line.partition("\t")
+        notebook_id, _, filepath = rest.partition("\t")
+        if target in targets and notebook_id != "ERROR":
+            results[target] = (notebook_id, filepath)
+    return ShellResults(results=results, output=process.stdout)
+
+
+@pytest.fixture(scope="session")
+def shell_results() -> ShellResults:
+    return run_shell_implementation([target for target, _ in TestManifests.get_targets()])
+
+
 class TestManifests:
     def test_jupyter_path(self):
         metadata = extract_metadata_from_path(Path("notebooks/jupyter/rocm/tensorflow/ubi9-python-3.12"))
@@ -249,37 +367,9 @@ class TestManifests:
         path = get_source_of_truth_filepath(manifests_directory=_TEST_MANIFESTS_ODH_DIR, metadata=metadata)
         assert path == _TEST_MANIFESTS_ODH_DIR / "base" / "jupyter-rocm-tensorflow-notebook-imagestream.yaml"
 
-    def run_shell_function(
-        self,
-        shell_script_path: Path,
-        shell_function_name: str,
-        script_args: Iterable[str] = (),
-        function_args: Iterable[str] = (),
-        env: dict[str, str] | None = None,
-    ) -> str:
-        env = env or {}
-        script_args_str = " ".join(shlex.quote(arg) for arg in script_args)
-        function_args_str = " ".join(shlex.quote(arg) for arg in function_args)
-        shell_notebook_id = subprocess.run(
-            # set temporary positional parameters for the `source`ing
-            f"""set -- {script_args_str} && source {shell_script_path} && set -- && {shell_function_name} {function_args_str}""",
-            shell=True,
-            executable="/bin/bash",
-            env=env,
-            stdout=subprocess.PIPE,
-            text=True,
-            check=True,
-        )
-        return shell_notebook_id.stdout.rstrip()
-
     @staticmethod
     def get_targets() -> Generator[tuple[str, Path]]:
-        # TODO(jdanek): should systematize import paths to avoid this hack
-        sys.path.insert(0, str(ROOT_DIR / "ci/cached-builds"))
-        from ci.cached_builds import gen_gha_matrix_jobs  # ruff: ignore[import-outside-top-level]
-
-        python_312 = gen_gha_matrix_jobs.extract_image_targets(ROOT_DIR, env={"RELEASE_PYTHON_VERSION": "3.12"})
-        targets = python_312
+        targets = makefile_targets("3.12")
         # TODO(jdanek): this is again duplicating knowledge, but, what can I do?
         expected_manifest_paths = {
             "jupyter-minimal-ubi9-python-3.12": MANIFESTS_ODH_DIR
@@ -345,22 +435,15 @@ class TestManifests:
                 raise ValueError(f"Missing expected manifest path for target '{target}'") from e
             yield target, expected_manifest_path
 
+    def test_makefile_targets_have_build_directories(self):
+        for target in makefile_targets("3.12").values():
+            assert (ROOT_DIR / target.directory).is_dir(), f"{target.name}: no directory {target.directory}"
+
     @pytest.mark.parametrize("target,expected_manifest_path", get_targets())
-    def test_compare_with_shell_implementation(self, target: str, expected_manifest_path: Path):
-        shell_script_path = ROOT_DIR / "scripts/test_jupyter_with_papermill.sh"
-
-        notebook_id = self.run_shell_function(
-            shell_script_path,
-            "_get_notebook_id",
-            script_args=[target],
-            env={"notebook_workload_name": target},
-        )
+    def test_compare_with_shell_implementation(
+        self, shell_results: ShellResults, target: str, expected_manifest_path: Path
+    ):
+        assert target in shell_results.results, f"Shell implementation failed for {target}:\n{shell_results.output}"
+        notebook_id, source_of_truth_filepath = shell_results.results[target]
         assert notebook_id
-
-        source_of_truth_filepath = self.run_shell_function(
-            shell_script_path,
-            "_get_source_of_truth_filepath",
-            script_args=[target],
-            function_args=[notebook_id],
-        )
         assert source_of_truth_filepath == str(expected_manifest_path)
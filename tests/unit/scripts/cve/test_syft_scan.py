@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+import gzip
+import hashlib
+import io
+import json
+import tarfile
+from pathlib import Path
 from typing import TYPE_CHECKING
 
-from scripts.cve.syft_scan import Artifact, Location, SyftOutput, filter_artifacts
+from scripts.cve import syft_scan
+from scripts.cve.syft_scan import Artifact, LayerScan, Location, SyftOutput, filter_artifacts, merge_layers
 
 if TYPE_CHECKING:
+    import pytest
     from pytest import Subtests
 
 
@@ -166,3 +174,120 @@ def test_filter_artifacts_regex_metacharacters_treated_literally() -> None:
 
 def test_filter_artifacts_empty_list() -> None:
     assert filter_artifacts([], package="anything") == []
+
+
+# ── layer-aware image scanning ────────────────────────────────────────
+
+
+def _artifact(name: str, path: str) -> Artifact:
+    return Artifact(name=name, type="python", locations=[Location(path=path)])
+
+
+def _visible(artifacts: list[Artifact]) -> list[tuple[str, list[str | None]]]:
+    return [(a.name, [loc.path for loc in a.locations]) for a in artifacts]
+
+
+def test_merge_layers_applies_whiteouts_and_replacements() -> None:
+    base = LayerScan(
+        artifacts=[
+            _artifact("kept", "/site-packages/kept/METADATA"),
+            _artifact("removed", "/site-packages/removed/METADATA"),
+            _artifact("cleared", "/opt/cleared/METADATA"),
+            Artifact(name="openssl", type="rpm", locations=[Location(path="/var/lib/rpm/rpmdb.sqlite")]),
+        ]
+    )
+    top = LayerScan(
+        artifacts=[
+            _artifact("readded", "/opt/readded/METADATA"),
+            Artifact(name="openssl-fixed", type="rpm", locations=[Location(path="/var/lib/rpm/rpmdb.sqlite")]),
+        ],
+        whiteouts=["/site-packages/removed"],
+        opaque_dirs=["/opt"],
+    )
+
+    merged = merge_layers([("sha256:base", base), ("sha256:top", top)])
+
+    assert _visible(merged) == [
+        ("kept", ["/site-packages/kept/METADATA"]),
+        ("readded", ["/opt/readded/METADATA"]),
+        ("openssl-fixed", ["/var/lib/rpm/rpmdb.sqlite"]),
+    ]
+    assert [loc.model_extra for a in merged for loc in a.locations] == [
+        {"layerID": "sha256:base"},
+        {"layerID": "sha256:top"},
+        {"layerID": "sha256:top"},
+    ]
+
+
+class _OciLayout:
+    """Writes gzipped layers and single-platform images into an OCI layout directory."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.manifests: list[dict] = []
+        (root / "blobs" / "sha256").mkdir(parents=True)
+        (root / "oci-layout").write_text('{"imageLayoutVersion": "1.0.0"}')
+
+    def blob(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        (self.root / "blobs" / "sha256" / digest).write_bytes(data)
+        return f"sha256:{digest}"
+
+    def layer(self, files: dict[str, bytes]) -> str:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for name, content in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        return self.blob(gzip.compress(buffer.getvalue(), mtime=0))
+
+    def image(self, tag: str, layers: list[str]) -> None:
+        manifest = {
+            "schemaVersion": 2,
+            "mediaType": "application/vnd.oci.image.manifest.v1+json",
+            "config": {"mediaType": "application/vnd.oci.image.config.v1+json", "digest": self.blob(b"{}"), "size": 2},
+            "layers": [{"mediaType": "application/vnd.oci.image.layer.v1.tar+gzip", "digest": d} for d in layers],
+        }
+        self.manifests.append(
+            {
+                "mediaType": "application/vnd.oci.image.manifest.v1+json",
+                "digest": self.blob(json.dumps(manifest).encode()),
+                "annotations": {"org.opencontainers.image.ref.name": tag},
+            }
+        )
+        (self.root / "index.json").write_text(json.dumps({"schemaVersion": 2, "manifests": self.manifests}))
+
+
+def test_scan_image_scans_each_distinct_layer_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    scanned: list[set[str]] = []
+
+    def fake_syft(repo_root: Path, *, use_config: bool = True, source: str | None = None) -> SyftOutput:
+        """Reports a python package for every METADATA file in the scanned directory."""
+        assert source is not None and not use_config
+        rootfs = Path(source.removeprefix("dir:"))
+        found = {"/" + str(p.relative_to(rootfs)) for p in rootfs.rglob("METADATA")}
+        scanned.append(found)
+        return SyftOutput(artifacts=[_artifact(Path(path).parent.name, path) for path in sorted(found)])
+
+    monkeypatch.setattr(syft_scan, "run_syft", fake_syft)
+    monkeypatch.setattr(syft_scan, "syft_version", lambda: "1.0.0")
+    monkeypatch.setenv("SYFT_LAYER_CACHE_DIR", str(tmp_path / "cache"))
+
+    layout = _OciLayout(tmp_path / "oci")
+    base = layout.layer({"usr/lib/base/METADATA": b"", "usr/lib/old/METADATA": b""})
+    layout.image("cpu", [base, layout.layer({"usr/lib/cpu/METADATA": b"", "usr/lib/.wh.old": b""})])
+    layout.image("cuda", [base, layout.layer({"usr/lib/cuda/METADATA": b""})])
+
+    cpu = syft_scan.scan_image(tmp_path, f"{layout.root}:cpu")
+    cuda = syft_scan.scan_image(tmp_path, f"{layout.root}:cuda")
+    syft_scan.scan_image(tmp_path, f"{layout.root}:cuda")
+
+    assert sorted(a.name for a in cpu.artifacts) == ["base", "cpu"]
+    assert sorted(a.name for a in cuda.artifacts) == ["base", "cuda", "old"]
+    # the shared base layer is scanned once, the rescan of cuda is served from the cache
+    assert scanned == [
+        {"/usr/lib/base/METADATA", "/usr/lib/old/METADATA"},
+        {"/usr/lib/cpu/METADATA"},
+        {"/usr/lib/cuda/METADATA"},
+    ]
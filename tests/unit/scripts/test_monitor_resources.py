@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+
+import scripts.monitor_resources as mr
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def write_cgroup(root: Path, *, mem: int, cpu_usec: int, rbytes: int, wbytes: int, mem_some_usec: int = 0) -> None:
+    root.mkdir(exist_ok=True)
+    (root / "cgroup.controllers").write_text("cpu io memory\n")
+    (root / "memory.current").write_text(f"{mem}\n")
+    (root / "cpu.stat").write_text(f"usage_usec {cpu_usec}\nuser_usec 1\nsystem_usec 1\n")
+    (root / "io.stat").write_text(
+        f"8:0 rbytes={rbytes} wbytes={wbytes} rios=1 wios=1 dbytes=0 dios=0\n8:16 rbytes=0 wbytes=0\n"
+    )
+    (root / "memory.pressure").write_text(
+        f"some avg10=0.00 avg60=0.00 avg300=0.00 total={mem_some_usec}\nfull avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+    )
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def proc(tmp_path: Path) -> Path:
+    proc = tmp_path / "proc"
+    (proc / "pressure").mkdir(parents=True)
+    (proc / "pressure" / "cpu").write_text("some avg10=12.50 avg60=0.00 avg300=0.00 total=125\n")
+    (proc / "pressure" / "io").write_text(
+        "some avg10=3.00 avg60=0.00 avg300=0.00 total=30\nfull avg10=1.00 avg60=0.00 avg300=0.00 total=10\n"
+    )
+    (proc / "meminfo").write_text("MemTotal:       16000 kB\nMemFree:         1000 kB\nMemAvailable:    6000 kB\n")
+    (proc / "stat").write_text("cpu  100 0 50 1000 20 0 0 0 0 0\ncpu0 100 0 50 1000 20 0 0 0 0 0\n")
+    (proc / "vmstat").write_text("pgpgin 10\npgpgout 20\n")
+    return proc
+
+
+def test_reader_prefers_cgroup_v2(tmp_path: Path, proc: Path) -> None:
+    cgroup = tmp_path / "cgroup"
+    write_cgroup(cgroup, mem=4096, cpu_usec=2_000_000, rbytes=100, wbytes=300, mem_some_usec=75)
+    reader = mr.ResourceReader(cgroup=cgroup, proc=proc)
+
+    assert reader.cgroup_v2
+    assert reader.memory_bytes() == 4096
+    assert reader.cpu_usec() == 2_000_000
+    assert reader.io_bytes() == (100, 300)
+    # memory comes from the cgroup, cpu and io from the system-wide /proc/pressure
+    assert reader.psi_total_usec() == (125, 75, 0, 30, 10)
+
+
+def test_reader_falls_back_to_proc(tmp_path: Path, proc: Path) -> None:
+    reader = mr.ResourceReader(cgroup=tmp_path / "no-cgroup", proc=proc)
+
+    assert not reader.cgroup_v2
+    assert reader.memory_bytes() == 10000 * 1024
+    assert reader.cpu_usec() == 150 * 1_000_000 // mr._CLK_TCK
+    assert reader.io_bytes() == (10 * 1024, 20 * 1024)
+    assert reader.disk_used_bytes([str(tmp_path), str(tmp_path / "missing")])[1] is None
+
+
+def test_paths_on_one_filesystem_are_reported(tmp_path: Path) -> None:
+    (tmp_path / "storage").mkdir()
+    paths = [str(tmp_path), str(tmp_path / "storage"), str(tmp_path / "missing")]
+
+    assert mr.ResourceReader.same_filesystem_as(paths) == {str(tmp_path / "storage"): str(tmp_path)}
+
+
+def test_phase_marker_rereads_on_change(tmp_path: Path) -> None:
+    marker_file = tmp_path / "phase"
+    marker = mr.PhaseMarker(marker_file)
+    assert marker.read() == mr.DEFAULT_PHASE
+
+    marker_file.write_text("build\n")
+    assert marker.read() == "build"
+
+    mtime_ns = marker_file.stat().st_mtime_ns
+    marker_file.write_text("test\n")
+    os.utime(marker_file, ns=(mtime_ns, mtime_ns))
+    assert marker.read() == "build", "unchanged mtime should not trigger a re-read"
+    marker.force = True
+    assert marker.read() == "test"
+
+
+def test_monitor_tracks_peaks_per_phase(tmp_path: Path, proc: Path) -> None:
+    cgroup = tmp_path / "cgroup"
+    marker_file = tmp_path / "phase"
+    marker_file.write_text("build")
+    write_cgroup(cgroup, mem=0, cpu_usec=0, rbytes=0, wbytes=0)
+    clock = FakeClock()
+    monitor = mr.ResourceMonitor(
+        mr.ResourceReader(cgroup=cgroup, proc=proc),
+        mr.PhaseMarker(marker_file),
+        [str(tmp_path)],
+        capacity=2,
+        clock=clock,
+    )
+
+    readings = [
+        ("build", 100, 0, 0, 0, 0),
+        ("build", 500, 1_000_000, 1000, 0, 400_000),  # 2 cores, 2000 B/s read, 80% memory stall over 0.5s
+        ("test", 200, 1_250_000, 1000, 4000, 450_000),  # 0.5 cores, 8000 B/s write, 10% memory stall
+    ]
+    for phase, mem, cpu, rbytes, wbytes, mem_some_usec in readings:
+        write_cgroup(cgroup, mem=mem, cpu_usec=cpu, rbytes=rbytes, wbytes=wbytes, mem_some_usec=mem_some_usec)
+        if marker_file.read_text() != phase:
+            marker_file.write_text(phase)
+            monitor.phase.force = True
+        monitor.sample()
+        clock.now += 0.5
+
+    # the ring buffer evicted the first sample, but the phase peaks still include it
+    assert len(monitor.samples) == 2
+    build, test = monitor.phases["build"], monitor.phases["test"]
+    assert build.samples == 2
+    assert build.peak_mem_bytes == 500
+    assert build.peak_cpu_cores == pytest.approx(2.0)
+    assert build.peak_io_read_bps == pytest.approx(2000)
+    assert build.peak_psi_stall_pct[1] == pytest.approx(80.0)
+    assert test.peak_psi_stall_pct[1] == pytest.approx(10.0)
+    assert test.peak_cpu_cores == pytest.approx(0.5)
+    assert test.peak_io_write_bps == pytest.approx(8000)
+    assert build.disk_growth_bytes()[0] is not None
+
+    data = json.loads(json.dumps(monitor.to_json()))
+    assert data["phase_names"] == ["build", "test"]
+    assert data["columns"]["phase"] == [0, 1]
+    assert data["columns"]["mem_bytes"] == [500, 200]
+    assert [stalls[1] for stalls in data["columns"]["psi_stall_usec"]] == [0, 50_000]
+    assert data["phases"]["build"]["peak_mem_bytes"] == 500
+
+    summary = monitor.summary_markdown()
+    assert "| build | 0s |" in summary
+    assert "| test |" in summary
+
+
+def test_main_writes_output_and_step_summary(tmp_path: Path, proc: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    summary = tmp_path / "summary.md"
+    output = tmp_path / "out.json"
+    monkeypatch.setenv("GITHUB_STEP_SUMMARY", str(summary))
+    monkeypatch.setattr(mr, "CGROUP_ROOT", tmp_path / "no-cgroup")
+    monkeypatch.setattr(mr, "PROC_ROOT", proc)
+    monkeypatch.setattr(mr, "PATHS_TO_MONITOR", [str(tmp_path)])
+
+    monitor_sample = mr.ResourceMonitor.sample
+
+    def sample_once(self: mr.ResourceMonitor) -> mr.Sample:
+        result = monitor_sample(self)
+        os.kill(os.getpid(), mr.signal.SIGTERM)
+        return result
+
+    monkeypatch.setattr(mr.ResourceMonitor, "sample", sample_once)
+    handlers = {sig: mr.signal.getsignal(sig) for sig in (mr.signal.SIGTERM, mr.signal.SIGINT, mr.signal.SIGUSR1)}
+    try:
+        mr.main(["--interval", "0.01", "--output", str(output)])
+    finally:
+        for sig, handler in handlers.items():
+            mr.signal.signal(sig, handler)
+
+    assert json.loads(output.read_text())["phase_names"] == [mr.DEFAULT_PHASE]
+    assert f"| {mr.DEFAULT_PHASE} |" in summary.read_text()
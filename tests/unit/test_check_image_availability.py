@@ -0,0 +1,203 @@
+"""Tests for the result cache and the registry manifest ``HEAD`` in ci/check-image-availability.py."""
+
+from __future__ import annotations
+
+import doctest
+import http.server
+import importlib.util
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from types import ModuleType
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+_CHECK_IMAGE_AVAILABILITY_PATH = _REPO_ROOT / "ci/check-image-availability.py"
+
+DIGEST = "sha256:" + "a" * 64
+
+
+def _load_check_image_availability() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("check_image_availability", _CHECK_IMAGE_AVAILABILITY_PATH)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    # dataclasses look up their module
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+check = _load_check_image_availability()
+
+
+class StubRegistry(http.server.ThreadingHTTPServer):
+    """A registry serving the manifests in ``digests``, behind an anonymous token when ``token`` is set.
+
+    The token endpoint hands out ``issued``, which defaults to the accepted ``token``."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubRegistryHandler)
+        self.digests: dict[str, str | None] = {}
+        self.token: str | None = None
+        self.issued: str | None = None
+        self.requests: list[tuple[str, str, str | None]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubRegistryHandler(http.server.BaseHTTPRequestHandler):
+    server: StubRegistry
+
+    def do_HEAD(self) -> None:
+        authorization = self.headers.get("Authorization")
+        with self.server.lock:
+            self.server.requests.append(("HEAD", self.path, authorization))
+        if self.server.token is not None and authorization != f"Bearer {self.server.token}":
+            self.send_response(401)
+            self.send_header(
+                "WWW-Authenticate",
+                f'Bearer realm="{self.server.url}/token",service="stub-registry",scope="repository:org/repo:pull"',
+            )
+            self.end_headers()
+            return
+        reference = self.path.rsplit("/", 1)[-1]
+        if reference not in self.server.digests:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if digest := self.server.digests[reference]:
+            self.send_header("Docker-Content-Digest", digest)
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.requests.append(("GET", self.path, None))
+        body = json.dumps({"token": self.server.issued or self.server.token}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def registry(monkeypatch: pytest.MonkeyPatch) -> Generator[StubRegistry]:
+    server = StubRegistry()
+    monkeypatch.setattr(check, "_registry_url", lambda registry: server.url)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_doctests() -> None:
+    # ci/conftest.py does not collect the script, its name is not importable
+    results = doctest.testmod(check)
+    assert results.attempted
+    assert not results.failed
+
+
+def test_head_resolves_a_tag_to_its_digest(registry: StubRegistry) -> None:
+    registry.digests["2025a"] = DIGEST
+
+    assert check.head_manifest_digest(check.parse_image_reference("quay.io/org/repo:2025a")) == DIGEST
+    assert registry.requests == [("HEAD", "/v2/org/repo/manifests/2025a", None)]
+
+
+def test_head_looks_up_digest_references_by_digest(registry: StubRegistry) -> None:
+    registry.digests[DIGEST] = DIGEST
+
+    assert check.head_manifest_digest(check.parse_image_reference(f"quay.io/org/repo:2025a@{DIGEST}")) == DIGEST
+    assert registry.requests == [("HEAD", f"/v2/org/repo/manifests/{DIGEST}", None)]
+
+
+def test_unknown_manifest_is_none(registry: StubRegistry) -> None:
+    assert check.head_manifest_digest(check.parse_image_reference("quay.io/org/repo:gone")) is None
+
+
+def test_missing_digest_header_raises(registry: StubRegistry) -> None:
+    registry.digests["2025a"] = None
+
+    with pytest.raises(ValueError, match="Docker-Content-Digest"):
+        check.head_manifest_digest(check.parse_image_reference("quay.io/org/repo:2025a"))
+
+
+def test_anonymous_token_is_fetched_on_401(registry: StubRegistry) -> None:
+    registry.digests["2025a"] = DIGEST
+    registry.token = "anonymous"  # ruff: ignore[hardcoded-password-string]
+
+    assert check.head_manifest_digest(check.parse_image_reference("docker.io/org/repo:2025a")) == DIGEST
+    assert [(method, urlsplit(path).path, auth) for method, path, auth in registry.requests] == [
+        ("HEAD", "/v2/org/repo/manifests/2025a", None),
+        ("GET", "/token", None),
+        ("HEAD", "/v2/org/repo/manifests/2025a", "Bearer anonymous"),
+    ]
+    # the service and scope of the challenge are passed on to the token endpoint
+    assert parse_qs(urlsplit(registry.requests[1][1]).query) == {
+        "service": ["stub-registry"],
+        "scope": ["repository:org/repo:pull"],
+    }
+
+
+def test_rejected_token_raises(registry: StubRegistry) -> None:
+    registry.digests["2025a"] = DIGEST
+    registry.token = "anonymous"  # ruff: ignore[hardcoded-password-string]
+    registry.issued = "expired"
+
+    with pytest.raises(HTTPError) as excinfo:
+        check.head_manifest_digest(check.parse_image_reference("quay.io/org/repo:2025a"))
+    assert excinfo.value.code == 401
+    # one retry with the token, not a loop
+    assert [method for method, _, _ in registry.requests] == ["HEAD", "GET", "HEAD"]
+
+
+def test_challenge_without_bearer_realm_needs_no_token() -> None:
+    assert check._anonymous_token(None) is None
+    assert check._anonymous_token('Basic realm="registry"') is None
+    assert check._anonymous_token('Bearer service="registry"') is None
+
+
+def test_cache_keeps_only_entries_used_in_the_run(tmp_path: Path) -> None:
+    path = tmp_path / "cache" / "image-availability.json"
+    cache = check.ImageResultCache.load(path)
+    assert len(cache) == 0
+
+    cache.put("quay.io/org/repo@sha256:1", None)
+    cache.put("quay.io/org/repo@sha256:2", None)
+    cache.save()
+
+    cache = check.ImageResultCache.load(path)
+    assert len(cache) == 2
+    assert cache.get("quay.io/org/repo@sha256:1") is not None
+    assert cache.get("quay.io/org/repo@sha256:3") is None
+    cache.save()
+
+    data = json.loads(path.read_text())
+    assert data["version"] == check.CACHE_VERSION
+    assert data["images"].keys() == {"quay.io/org/repo@sha256:1"}
+
+
+@pytest.mark.parametrize("content", ["{not json", json.dumps({"version": 0, "images": {"a@sha256:1": {}}})])
+def test_unreadable_or_outdated_cache_is_ignored(tmp_path: Path, content: str) -> None:
+    path = tmp_path / "image-availability.json"
+    path.write_text(content)
+
+    assert len(check.ImageResultCache.load(path)) == 0
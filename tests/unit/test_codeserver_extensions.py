@@ -0,0 +1,149 @@
+"""Tests for ``provision_extensions`` in code-server's utils/extensions.sh, run with the local bash."""
+
+from __future__ import annotations
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+_EXTENSIONS_SH = [
+    _REPO_ROOT / "codeserver/ubi9-python-3.12/utils/extensions.sh",
+    _REPO_ROOT / "codeserver-baseline/ubi9-python-3.12/utils/extensions.sh",
+]
+
+
+def _bash_major_version() -> int:
+    if shutil.which("bash") is None:
+        return 0
+    version = subprocess.run(["bash", "-c", "echo ${BASH_VERSINFO[0]}"], capture_output=True, text=True, check=True)
+    return int(version.stdout)
+
+
+# associative arrays, macOS still ships bash 3.2
+pytestmark = pytest.mark.skipif(_bash_major_version() < 4, reason="extensions.sh needs bash 4 or newer")
+
+
+class Extensions:
+    """An image's extensions directory and a user's extensions directory that it is provisioned into."""
+
+    def __init__(self, script: Path, tmp_path: Path) -> None:
+        self.script = script
+        self.image_dir = tmp_path / "extensions-temp"
+        self.user_dir = tmp_path / "pvc" / "extensions"
+
+    def ship(self, *extensions: str) -> None:
+        """Replaces the image's extensions with ``extensions``, as an image upgrade does."""
+        shutil.rmtree(self.image_dir, ignore_errors=True)
+        for extension in extensions:
+            (self.image_dir / extension).mkdir(parents=True)
+            (self.image_dir / extension / "package.json").write_text("{}")
+
+    def provision(self) -> str:
+        result = subprocess.run(
+            [
+                "bash",
+                "-c",
+                'set -euo pipefail; source "$0"; provision_extensions "$1" "$2"',
+                self.script,
+                self.image_dir,
+                self.user_dir,
+            ],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        assert result.returncode == 0, result.stdout + result.stderr
+        return result.stdout
+
+    def links(self) -> dict[str, Path]:
+        """The linked extensions by name, with the image folder each link points to.
+
+        Fails on a dangling link, code-server would not load that extension."""
+        return {p.name: p.resolve(strict=True) for p in self.user_dir.iterdir() if p.is_symlink()}
+
+    def manifest(self) -> list[str]:
+        return (self.user_dir / ".image-extensions").read_text().splitlines()
+
+
+@pytest.fixture(params=_EXTENSIONS_SH, ids=lambda p: p.parts[-4])
+def extensions(request: pytest.FixtureRequest, tmp_path: Path) -> Extensions:
+    return Extensions(request.param, tmp_path)
+
+
+def test_first_start_links_every_image_extension(extensions: Extensions) -> None:
+    extensions.ship("ms-python.python-1.0.0", "ms-toolsai.jupyter-1.0.0")
+
+    extensions.provision()
+
+    assert extensions.links() == {
+        "ms-python.python-1.0.0": extensions.image_dir / "ms-python.python-1.0.0",
+        "ms-toolsai.jupyter-1.0.0": extensions.image_dir / "ms-toolsai.jupyter-1.0.0",
+    }
+    assert extensions.manifest() == ["ms-python.python-1.0.0", "ms-toolsai.jupyter-1.0.0"]
+
+
+def test_unchanged_manifest_is_a_noop(extensions: Extensions) -> None:
+    extensions.ship("ms-python.python-1.0.0")
+    extensions.provision()
+
+    assert "up to date" in extensions.provision()
+    assert extensions.links().keys() == {"ms-python.python-1.0.0"}
+
+
+def test_image_upgrade_replaces_and_removes_extensions(extensions: Extensions) -> None:
+    extensions.ship("ms-python.python-1.0.0", "ms-toolsai.jupyter-1.0.0", "ms-vscode.js-debug-1.0.0")
+    extensions.provision()
+    # installed by the user, and copied by an image from before extensions were linked
+    (extensions.user_dir / "redhat.vscode-yaml-1.0.0").mkdir()
+    (extensions.user_dir / "ms-vscode.js-debug-0.9.0").mkdir()
+
+    # python is upgraded, jupyter is dropped from the image, js-debug is unchanged, and a new extension is added
+    extensions.ship("ms-python.python-2.0.0", "ms-vscode.js-debug-1.0.0", "ms-vscode.js-profile-table-1.0.0")
+    extensions.provision()
+
+    assert extensions.links() == {
+        "ms-python.python-2.0.0": extensions.image_dir / "ms-python.python-2.0.0",
+        "ms-vscode.js-debug-1.0.0": extensions.image_dir / "ms-vscode.js-debug-1.0.0",
+        "ms-vscode.js-profile-table-1.0.0": extensions.image_dir / "ms-vscode.js-profile-table-1.0.0",
+    }
+    assert not (extensions.user_dir / "ms-python.python-1.0.0").is_symlink()
+    assert not (extensions.user_dir / "ms-toolsai.jupyter-1.0.0").is_symlink()
+    assert (extensions.user_dir / "redhat.vscode-yaml-1.0.0").is_dir()
+    assert (extensions.user_dir / "ms-vscode.js-debug-0.9.0").is_dir()
+    assert extensions.manifest() == [
+        "ms-python.python-2.0.0",
+        "ms-vscode.js-debug-1.0.0",
+        "ms-vscode.js-profile-table-1.0.0",
+    ]
+
+
+def test_uninstalled_extension_returns_only_with_a_new_version(extensions: Extensions) -> None:
+    extensions.ship("ms-python.python-1.0.0", "ms-toolsai.jupyter-1.0.0")
+    extensions.provision()
+    (extensions.user_dir / "ms-toolsai.jupyter-1.0.0").unlink()
+
+    # an upgrade of another extension does not bring the uninstalled one back
+    extensions.ship("ms-python.python-2.0.0", "ms-toolsai.jupyter-1.0.0")
+    assert "uninstalled by the user" in extensions.provision()
+    assert extensions.links().keys() == {"ms-python.python-2.0.0"}
+
+    extensions.ship("ms-python.python-2.0.0", "ms-toolsai.jupyter-2.0.0")
+    extensions.provision()
+    assert extensions.links().keys() == {"ms-python.python-2.0.0", "ms-toolsai.jupyter-2.0.0"}
+
+
+def test_extension_updated_by_the_user_is_kept(extensions: Extensions) -> None:
+    extensions.ship("ms-python.python-1.0.0")
+    extensions.provision()
+    # code-server installs the update as a real directory next to the link it replaces
+    (extensions.user_dir / "ms-python.python-1.0.0").unlink()
+    (extensions.user_dir / "ms-python.python-1.5.0").mkdir()
+
+    extensions.ship("ms-python.python-2.0.0")
+    extensions.provision()
+
+    assert (extensions.user_dir / "ms-python.python-1.5.0").is_dir()
+    assert extensions.links().keys() == {"ms-python.python-2.0.0"}
@@ -0,0 +1,177 @@
+"""Tests for code-server's kernels-api.py against a stub code-server /healthz."""
+
+from __future__ import annotations
+
+import concurrent.futures
+import datetime
+import http.client
+import http.server
+import importlib.util
+import json
+import logging
+import socket
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from types import ModuleType
+
+LOGGER = logging.getLogger(__name__)
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+_KERNELS_API_PATH = _REPO_ROOT / "codeserver/ubi9-python-3.12/kernels-api.py"
+
+
+def _load_kernels_api() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("codeserver_kernels_api", _KERNELS_API_PATH)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+kernels_api = _load_kernels_api()
+
+
+class StubHealthz(http.server.ThreadingHTTPServer):
+    """Answers ``GET /healthz`` with ``payload`` and counts the requests."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubHealthzHandler)
+        self.payload: dict[str, Any] = {"status": "expired", "lastHeartbeat": 0}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/healthz"
+
+
+class StubHealthzHandler(http.server.BaseHTTPRequestHandler):
+    server: StubHealthz
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.requests += 1
+        body = json.dumps(self.server.payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def _serve[T: http.server.HTTPServer](server: T) -> Generator[T]:
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def healthz() -> Generator[StubHealthz]:
+    yield from _serve(StubHealthz())
+
+
+@pytest.fixture
+def kernels_server(healthz: StubHealthz) -> Generator[Any]:
+    yield from _serve(kernels_api.KernelsApiServer(("127.0.0.1", 0), kernels_api.HeartbeatCache(healthz.url, ttl=60)))
+
+
+def _get(port: int, path: str = "/api/kernels/") -> tuple[int, bytes]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def test_serves_access_cgi_response(healthz: StubHealthz, kernels_server: Any) -> None:
+    port = kernels_server.server_address[1]
+    before = datetime.datetime.now().astimezone().replace(microsecond=0)
+    status, body = _get(port)
+    after = datetime.datetime.now().astimezone()
+
+    assert status == 200
+    # same bytes as the CGI's `echo '[{...}]'`
+    assert body.endswith(b"}]\n") and b", " not in body
+    (kernel,) = json.loads(body)
+    assert kernel.keys() == {"id", "name", "last_activity", "execution_state", "connections"}
+    assert (kernel["id"], kernel["name"], kernel["execution_state"], kernel["connections"]) == (
+        "code-server",
+        "code-server",
+        "idle",
+        1,
+    )
+    # a fresh pod reports lastHeartbeat=0, which is replaced by the time of the poll
+    assert before <= datetime.datetime.fromisoformat(kernel["last_activity"]) <= after
+
+    assert _get(port, "/api/other")[0] == 404
+
+
+def test_heartbeat_is_cached_for_ttl(healthz: StubHealthz) -> None:
+    cache = kernels_api.HeartbeatCache(healthz.url, ttl=60)
+    healthz.payload = {"status": "alive", "lastHeartbeat": 1742345025123}
+    (kernel,) = kernels_api.kernels(cache.get())
+    assert kernel["execution_state"] == "busy"
+    assert datetime.datetime.fromisoformat(kernel["last_activity"]).timestamp() == 1742345025
+
+    healthz.payload = {"status": "expired", "lastHeartbeat": 1742345025123}
+    assert cache.get()["status"] == "alive"
+    assert healthz.requests == 1
+
+    cache.ttl = 0
+    assert cache.get()["status"] == "expired"
+    assert healthz.requests == 2
+
+
+def test_unreachable_healthz_means_busy() -> None:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    cache = kernels_api.HeartbeatCache(f"http://127.0.0.1:{port}/healthz", ttl=60, timeout=1)
+    assert cache.get() == {}
+    assert kernels_api.kernels(cache.get())[0]["execution_state"] == "busy"
+
+
+def test_concurrent_polls(healthz: StubHealthz, kernels_server: Any) -> None:
+    """Many pods' worth of culler polls in flight all get a correct response; latency is only logged."""
+    port = kernels_server.server_address[1]
+    kernels_server.heartbeat.ttl = 1.0
+    concurrency, requests = 32, 2000
+
+    def poll(_: int) -> float:
+        started = time.perf_counter()
+        status, body = _get(port)
+        assert status == 200
+        (kernel,) = json.loads(body)
+        assert (kernel["id"], kernel["execution_state"]) == ("code-server", "idle")
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(poll, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    assert len(latencies) == requests
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    LOGGER.info(
+        f"{requests / elapsed:.0f} requests/s, p50 {statistics.median(latencies) * 1000:.2f} ms,"
+        f" p99 {p99 * 1000:.2f} ms, {healthz.requests} healthz fetches"
+    )
+    # the heartbeat is fetched once per TTL, not once per poll
+    assert healthz.requests <= elapsed / kernels_server.heartbeat.ttl + 1
@@ -0,0 +1,153 @@
+"""Tests for the ``--schedule-by-image`` pytest-xdist scheduler in tests/containers/scheduling.py, with fake workers."""
+
+from __future__ import annotations
+
+import doctest
+import types
+
+from tests.containers import scheduling
+from tests.containers.scheduling import HEAVY_IMAGE, LIGHT_IMAGE, GiB, ImageScheduling, Resources
+
+TESTS_PER_IMAGE = 3
+
+
+class FakeConfig:
+    """The parts of ``pytest.Config`` that ``LoadScopeScheduling`` reads."""
+
+    def __init__(self, workers: int) -> None:
+        self.option = types.SimpleNamespace(loadscopereorder=True)
+        self._tx = [f"{workers}*popen"]
+
+    def getvalue(self, name: str) -> list[str]:
+        assert name == "tx"
+        return self._tx
+
+
+class FakeNode:
+    """A ``WorkerController`` that records the tests it was sent instead of running them."""
+
+    def __init__(self, gateway_id: str) -> None:
+        self.gateway = types.SimpleNamespace(id=gateway_id)
+        self.shutting_down = False
+        self.sent: list[int] = []
+
+    def send_runtest_some(self, indices: list[int]) -> None:
+        self.sent.extend(indices)
+
+    def shutdown(self) -> None:
+        self.shutting_down = True
+
+
+def collection(images: list[str]) -> list[str]:
+    return [
+        f"tests/containers/base_image_test.py::test_{i}[{image}]" for image in images for i in range(TESTS_PER_IMAGE)
+    ]
+
+
+def start(images: list[str], budget: Resources, workers: int) -> tuple[ImageScheduling, list[FakeNode], list[str]]:
+    """Schedules ``images`` on ``workers`` fake nodes, as pytest-xdist does once the workers collected the tests."""
+    scheduler = ImageScheduling(
+        FakeConfig(workers),  # pyright: ignore[reportArgumentType]
+        None,
+        images=images,
+        budget=budget,
+        cost=scheduling.image_cost,
+    )
+    nodes = [FakeNode(f"gw{i}") for i in range(workers)]
+    tests = collection(images)
+    for node in nodes:
+        scheduler.add_node(node)  # pyright: ignore[reportArgumentType]
+        scheduler.add_node_collection(node, tests)  # pyright: ignore[reportArgumentType]
+    scheduler.schedule()
+    return scheduler, nodes, tests
+
+
+def images_sent(node: FakeNode, tests: list[str], images: list[str]) -> list[str]:
+    """The images whose tests ``node`` was sent, in order."""
+    sent = [scheduling.image_of(tests[index], images) for index in node.sent]
+    return [image for i, image in enumerate(sent) if image is not None and image not in sent[:i]]
+
+
+def finish(scheduler: ImageScheduling, node: FakeNode, count: int) -> None:
+    """Completes the next ``count`` tests that ``node`` was sent."""
+    tests = scheduler.registered_collections[node]  # pyright: ignore[reportArgumentType]
+    done = {
+        nodeid
+        for work_unit in scheduler.assigned_work[node].values()  # pyright: ignore[reportArgumentType]
+        for nodeid, completed in work_unit.items()
+        if completed
+    }
+    for index in [index for index in node.sent if tests[index] not in done][:count]:
+        scheduler.mark_test_complete(node, index, duration=1.0)  # pyright: ignore[reportArgumentType]
+
+
+def test_heavy_images_start_first_within_the_budget() -> None:
+    images = ["quay.io/a:light-1", "quay.io/a:cuda-1", "quay.io/a:cuda-2", "quay.io/a:light-2"]
+    # room for one heavy and one light image
+    budget = HEAVY_IMAGE + LIGHT_IMAGE
+
+    scheduler, (gw0, gw1, gw2), tests = start(images, budget, workers=3)
+
+    assert images_sent(gw0, tests, images) == ["quay.io/a:cuda-1"]
+    # the second heavy image does not fit next to the first one, a light one does
+    assert images_sent(gw1, tests, images) == ["quay.io/a:light-1"]
+    assert images_sent(gw2, tests, images) == []
+    assert not gw2.shutting_down
+    assert list(scheduler.workqueue) == ["quay.io/a:cuda-2", "quay.io/a:light-2"]
+
+
+def test_finished_scope_lets_waiting_scopes_start_on_other_workers() -> None:
+    images = ["quay.io/a:cuda-1", "quay.io/a:light-1", "quay.io/a:light-2"]
+    # a heavy image takes it all, or two light ones
+    budget = Resources(cpus=2, memory=6 * GiB)
+
+    scheduler, (gw0, gw1, gw2), tests = start(images, budget, workers=3)
+    assert images_sent(gw0, tests, images) == ["quay.io/a:cuda-1"]
+    assert gw1.sent == gw2.sent == []
+
+    # gw0 holds back its last test, with one pending test it counts as idle and gets the next scope
+    finish(scheduler, gw0, TESTS_PER_IMAGE - 1)
+    assert images_sent(gw0, tests, images) == ["quay.io/a:cuda-1", "quay.io/a:light-1"]
+    # the held back test is still to run, so the heavy image keeps its share of the budget
+    assert gw1.sent == []
+
+    finish(scheduler, gw0, 1)
+    assert images_sent(gw1, tests, images) == ["quay.io/a:light-2"]
+    assert gw2.sent == []
+    assert not scheduler.workqueue
+
+
+def test_scope_over_budget_starts_when_nothing_runs() -> None:
+    images = ["quay.io/a:cuda-1", "quay.io/a:cuda-2"]
+    budget = Resources(cpus=1, memory=1 * GiB)
+
+    scheduler, (gw0, gw1), tests = start(images, budget, workers=2)
+    assert images_sent(gw0, tests, images) == ["quay.io/a:cuda-1"]
+    assert gw1.sent == []
+
+    finish(scheduler, gw0, TESTS_PER_IMAGE - 1)
+    assert images_sent(gw0, tests, images) == ["quay.io/a:cuda-1", "quay.io/a:cuda-2"]
+    assert gw1.sent == []
+
+
+def test_workers_shut_down_when_the_queue_is_empty() -> None:
+    images = ["quay.io/a:light-1", "quay.io/a:light-2"]
+
+    scheduler, (gw0, gw1), _ = start(images, LIGHT_IMAGE + LIGHT_IMAGE, workers=2)
+    finish(scheduler, gw0, TESTS_PER_IMAGE)
+    finish(scheduler, gw1, TESTS_PER_IMAGE)
+
+    assert gw0.shutting_down
+    assert gw1.shutting_down
+    assert scheduler.tests_finished
+    assert {worker: (u.tests, u.scopes) for worker, u in scheduler.utilization.items()} == {
+        "gw0": (TESTS_PER_IMAGE, ["quay.io/a:light-1"]),
+        "gw1": (TESTS_PER_IMAGE, ["quay.io/a:light-2"]),
+    }
+
+
+def test_doctests() -> None:
+    # make test-unit does not collect tests/containers, so its doctests would not run otherwise
+    results = doctest.testmod(scheduling)
+    assert results.attempted
+    assert not results.failed
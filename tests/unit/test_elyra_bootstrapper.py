@@ -0,0 +1,264 @@
+"""Unit tests for the vendored Elyra KFP bootstrapper's object storage transfers."""
+
+from __future__ import annotations
+
+import importlib.metadata
+import importlib.util
+import io
+import logging
+import tarfile
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    from types import ModuleType
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+_BOOTSTRAPPER_PATH = _REPO_ROOT / "prefetch-input/elyra-v4.3.1/elyra/kfp/bootstrapper.py"
+
+
+def _load_bootstrapper() -> ModuleType:
+    spec = importlib.util.spec_from_file_location("elyra_kfp_bootstrapper", _BOOTSTRAPPER_PATH)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+bootstrapper = _load_bootstrapper()
+
+
+class _StubResponse(io.BytesIO):
+    """Mimics the urllib3 response returned by ``Minio.get_object``."""
+
+    def release_conn(self) -> None:
+        pass
+
+
+class StubMinio:
+    """In-memory stand-in for the subset of the ``minio.Minio`` API used by the bootstrapper."""
+
+    def __init__(self, objects: dict[str, bytes] | None = None) -> None:
+        self.objects: dict[str, bytes] = dict(objects or {})
+        self.put_kwargs: dict[str, dict] = {}
+        self.threads: set[str] = set()
+        self._lock = threading.Lock()
+
+    def _record_thread(self) -> None:
+        with self._lock:
+            self.threads.add(threading.current_thread().name)
+
+    def fget_object(self, bucket_name: str, object_name: str, file_path: str) -> None:
+        self._record_thread()
+        Path(file_path).write_bytes(self.objects[f"{bucket_name}/{object_name}"])
+
+    def get_object(self, bucket_name: str, object_name: str) -> _StubResponse:
+        self._record_thread()
+        return _StubResponse(self.objects[f"{bucket_name}/{object_name}"])
+
+    def fput_object(self, bucket_name: str, object_name: str, file_path: str, **kwargs) -> None:
+        self._record_thread()
+        data = Path(file_path).read_bytes()
+        with self._lock:
+            self.objects[f"{bucket_name}/{object_name}"] = data
+            self.put_kwargs[object_name] = kwargs
+
+
+def _make_archive(files: dict[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def _make_file_op(cos_client: StubMinio, **input_params: str):
+    """Build a PythonFileOp without going through ``__init__``, which needs real minio credentials."""
+    file_op = bootstrapper.PythonFileOp.__new__(bootstrapper.PythonFileOp)
+    file_op.filepath = "node.py"
+    file_op.input_params = {"cos-directory": "run", **input_params}
+    file_op.cos_bucket = "bucket"
+    file_op.cos_client = cos_client
+    return file_op
+
+
+class TestProcessDependencies:
+    def test_streams_archive_and_downloads_inputs(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.chdir(tmp_path)
+        cos = StubMinio(
+            {
+                "bucket/run/deps.tar.gz": _make_archive({"node.py": b"print(1)\n", "lib/helper.py": b"x = 1\n"}),
+                "bucket/run/a.csv": b"a",
+                "bucket/run/b.csv": b"b",
+            }
+        )
+        file_op = _make_file_op(cos, **{"cos-dependencies-archive": "deps.tar.gz", "inputs": "a.csv; b.csv"})
+
+        file_op.process_dependencies()
+
+        assert (tmp_path / "node.py").read_bytes() == b"print(1)\n"
+        assert (tmp_path / "lib/helper.py").read_bytes() == b"x = 1\n"
+        assert (tmp_path / "a.csv").read_bytes() == b"a"
+        assert (tmp_path / "b.csv").read_bytes() == b"b"
+        # the archive is extracted from the object stream, never written to disk
+        assert not (tmp_path / "deps.tar.gz").exists()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["a.csv", "b.csv", "lib", "node.py"]
+
+    def test_archive_members_take_precedence_over_inputs(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.chdir(tmp_path)
+        cos = StubMinio(
+            {
+                "bucket/run/deps.tar.gz": _make_archive({"node.py": b"", "data.csv": b"from archive"}),
+                "bucket/run/data.csv": b"from input",
+            }
+        )
+        file_op = _make_file_op(cos, **{"cos-dependencies-archive": "deps.tar.gz", "inputs": "data.csv"})
+
+        file_op.process_dependencies()
+
+        assert (tmp_path / "data.csv").read_bytes() == b"from archive"
+        assert not list(tmp_path.glob("*.elyra-download"))
+
+    def test_per_file_timing_is_logged(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(bootstrapper, "enable_pipeline_info", True)
+        cos = StubMinio({"bucket/run/deps.tar.gz": _make_archive({"node.py": b""}), "bucket/run/a.csv": b"a"})
+        file_op = _make_file_op(cos, **{"cos-dependencies-archive": "deps.tar.gz", "inputs": "a.csv"})
+
+        with caplog.at_level(logging.INFO, logger="elyra"):
+            file_op.process_dependencies()
+
+        messages = [r.getMessage() for r in caplog.records]
+        assert any("downloaded and extracted deps.tar.gz" in m and "secs)" in m for m in messages)
+        assert any("downloaded a.csv" in m and "secs)" in m for m in messages)
+
+
+class TestProcessOutputs:
+    def test_uploads_wildcards_and_directories_concurrently(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(bootstrapper, "max_transfer_workers", 4)
+        (tmp_path / "out").mkdir()
+        for i in range(8):
+            (tmp_path / "out" / f"part-{i}.txt").write_text(str(i))
+        (tmp_path / "model.bin").write_bytes(b"m")
+        (tmp_path / "report.csv").write_bytes(b"r")
+        cos = StubMinio()
+        file_op = _make_file_op(cos, outputs="out;*.bin;report.csv")
+
+        file_op.process_outputs()
+
+        expected = {f"bucket/run/out/part-{i}.txt" for i in range(8)} | {
+            "bucket/run/model.bin",
+            "bucket/run/report.csv",
+        }
+        assert set(cos.objects) == expected
+        assert cos.objects["bucket/run/out/part-3.txt"] == b"3"
+        assert all(name.startswith("ThreadPoolExecutor") for name in cos.threads)
+
+    def test_large_files_use_parallel_multipart_upload(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(bootstrapper, "multipart_threshold", 10)
+        (tmp_path / "small.txt").write_bytes(b"0123456789")
+        (tmp_path / "large.txt").write_bytes(b"0123456789+")
+        cos = StubMinio()
+        file_op = _make_file_op(cos, outputs="small.txt;large.txt")
+
+        file_op.process_outputs()
+
+        assert cos.put_kwargs["run/small.txt"] == {}
+        assert cos.put_kwargs["run/large.txt"] == {
+            "part_size": bootstrapper.multipart_part_size,
+            "num_parallel_uploads": bootstrapper.multipart_parallel_uploads,
+        }
+
+
+def test_run_transfers_finishes_all_transfers_before_raising() -> None:
+    done: list[int] = []
+
+    def failing() -> None:
+        raise OSError("boom")
+
+    transfers = [failing] + [lambda i=i: done.append(i) for i in range(5)]
+
+    with pytest.raises(OSError, match="boom"):
+        bootstrapper.FileOpBase.run_transfers(transfers)
+    assert sorted(done) == list(range(5))
+
+
+class TestPackageInstall:
+    @pytest.fixture
+    def subprocess_calls(self, monkeypatch: pytest.MonkeyPatch) -> list[list[str]]:
+        calls: list[list[str]] = []
+        monkeypatch.setattr(bootstrapper.subprocess, "run", lambda args, **_kwargs: calls.append(args))
+        return calls
+
+    @pytest.fixture(autouse=True)
+    def _workdir(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(
+            bootstrapper.OpUtil, "determine_elyra_requirements", classmethod(lambda cls: "requirements-elyra.txt")
+        )
+        monkeypatch.setattr(bootstrapper, "requirements_stamp_file", str(tmp_path / "elyra-requirements.stamp"))
+        monkeypatch.setattr(bootstrapper, "debug_package_install", False)
+
+    def test_satisfied_pins_skip_pip_entirely(self, tmp_path: Path, subprocess_calls: list[list[str]]) -> None:
+        packaging_version = importlib.metadata.version("packaging")
+        (tmp_path / "requirements-elyra.txt").write_text(f"packaging=={packaging_version}\npytest==1.0\n")
+
+        # no requirements-current.txt: the fast path must not need the freeze file
+        bootstrapper.OpUtil.package_install(user_volume_path=None)
+
+        assert subprocess_calls == []
+
+    def test_freeze_is_logged_when_debugging(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, subprocess_calls: list[list[str]]
+    ) -> None:
+        monkeypatch.setattr(bootstrapper, "debug_package_install", True)
+        (tmp_path / "requirements-elyra.txt").write_text("pytest==1.0\n")
+
+        bootstrapper.OpUtil.package_install(user_volume_path=None)
+
+        assert [call[-1] for call in subprocess_calls] == ["freeze"]
+
+    def test_missing_package_falls_back_to_pip_install(self, tmp_path: Path, subprocess_calls: list[list[str]]) -> None:
+        (tmp_path / "requirements-elyra.txt").write_text("pytest==1.0\nnot-a-real-package-xyz==2.0\n")
+        (tmp_path / "requirements-current.txt").write_text("pytest==99.0\n")
+
+        bootstrapper.OpUtil.package_install(user_volume_path=None)
+
+        assert len(subprocess_calls) == 1
+        assert subprocess_calls[0][-3:] == ["pip", "install", "not-a-real-package-xyz==2.0"]
+
+    def test_build_time_stamp_short_circuits(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        requirements = tmp_path / "requirements-elyra.txt"
+        requirements.write_text("pytest==1.0\n")
+        bootstrapper.OpUtil.write_requirements_stamp(str(requirements), bootstrapper.requirements_stamp_file)
+
+        def fail(*_args, **_kwargs):
+            raise AssertionError("environment should not be inspected when the stamp matches")
+
+        monkeypatch.setattr(bootstrapper.OpUtil, "unsatisfied_requirements", classmethod(fail))
+        bootstrapper.OpUtil.package_install(user_volume_path=None)
+
+        # a different requirements file invalidates the stamp
+        requirements.write_text("pytest==2.0\n")
+        assert not bootstrapper.OpUtil.requirements_stamp_matches(
+            str(requirements), bootstrapper.requirements_stamp_file
+        )
+
+    def test_stamp_refuses_unsatisfied_environment(self, tmp_path: Path) -> None:
+        requirements = tmp_path / "requirements-elyra.txt"
+        requirements.write_text("not-a-real-package-xyz==2.0\n")
+
+        with pytest.raises(RuntimeError, match="not-a-real-package-xyz"):
+            bootstrapper.OpUtil.write_requirements_stamp(str(requirements), bootstrapper.requirements_stamp_file)
+        assert not Path(bootstrapper.requirements_stamp_file).exists()